@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from ner_ontology_utils import iter_jsonl, json_dumps, write_jsonl
+
+
+STORE_SCHEMA_VERSION = "annotation_store_v1"
+
+# Indexed row fields; the full row is kept verbatim in row_json so export is lossless.
+INDEXED_FIELDS = (
+    "mention_id",
+    "work_slug",
+    "passage_urn",
+    "token_start",
+    "token_end",
+    "provisional_type",
+    "mvo_type",
+    "entity_id",
+    "annotator_id",
+    "certainty",
+    "surface_norm",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS mentions (
+    dataset TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    mention_id TEXT,
+    work_slug TEXT,
+    passage_urn TEXT,
+    token_start INTEGER,
+    token_end INTEGER,
+    provisional_type TEXT,
+    mvo_type TEXT,
+    entity_id TEXT,
+    annotator_id TEXT,
+    certainty TEXT,
+    surface_norm TEXT,
+    row_json TEXT NOT NULL,
+    PRIMARY KEY (dataset, line_no)
+);
+CREATE INDEX IF NOT EXISTS idx_mentions_span ON mentions (work_slug, passage_urn, token_start, token_end);
+CREATE INDEX IF NOT EXISTS idx_mentions_dataset_passage ON mentions (dataset, passage_urn, token_start, token_end);
+CREATE INDEX IF NOT EXISTS idx_mentions_mention_id ON mentions (mention_id);
+CREATE INDEX IF NOT EXISTS idx_mentions_entity_id ON mentions (entity_id);
+CREATE INDEX IF NOT EXISTS idx_mentions_annotator_id ON mentions (annotator_id);
+"""
+
+# Upper bound for prefix range scans over passage_urn (keeps the span index usable).
+PREFIX_END = "\U0010ffff"
+
+
+def _column_value(row: dict[str, Any], field: str) -> Any:
+    value = row.get(field)
+    if value is None:
+        return None
+    if field in {"token_start", "token_end"}:
+        return int(value)
+    return str(value)
+
+
+class AnnotationStore:
+    """Embedded SQLite store holding annotation JSONL states as named datasets."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (STORE_SCHEMA_VERSION,))
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> AnnotationStore:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def import_rows(self, dataset: str, rows: Iterable[dict[str, Any]]) -> int:
+        # Replaces the dataset wholesale; line order is kept for export.
+        def records() -> Iterator[tuple[Any, ...]]:
+            for line_no, row in enumerate(rows, start=1):
+                yield (dataset, line_no, *[_column_value(row, f) for f in INDEXED_FIELDS], json_dumps(row))
+
+        placeholders = ", ".join("?" for _ in range(len(INDEXED_FIELDS) + 3))
+        with self.conn:
+            self.conn.execute("DELETE FROM mentions WHERE dataset = ?", (dataset,))
+            cur = self.conn.executemany(
+                f"INSERT INTO mentions (dataset, line_no, {', '.join(INDEXED_FIELDS)}, row_json) VALUES ({placeholders})",
+                records(),
+            )
+        # Fresh statistics so per-passage lookups pick the passage index over the primary key.
+        self.conn.execute("ANALYZE")
+        return cur.rowcount
+
+    def import_jsonl(self, dataset: str, path: Path) -> int:
+        return self.import_rows(dataset, iter_jsonl(path))
+
+    def passage_urns(self, dataset: str) -> list[str]:
+        cur = self.conn.execute("SELECT DISTINCT passage_urn FROM mentions WHERE dataset = ? ORDER BY passage_urn", (dataset,))
+        return [urn for (urn,) in cur]
+
+    def datasets(self) -> dict[str, int]:
+        cur = self.conn.execute("SELECT dataset, COUNT(*) FROM mentions GROUP BY dataset ORDER BY dataset")
+        return {name: n for name, n in cur}
+
+    def rows(
+        self,
+        dataset: str | None = None,
+        *,
+        work_slug: str | None = None,
+        passage_urn: str | None = None,
+        passage_prefix: str | None = None,
+        mention_id: str | None = None,
+        entity_id: str | None = None,
+        annotator_id: str | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        # Every filter maps onto one of the indexes; results come back in dataset line order.
+        clauses: list[str] = []
+        params: list[Any] = []
+        for column, value in (
+            ("dataset", dataset),
+            ("work_slug", work_slug),
+            ("passage_urn", passage_urn),
+            ("mention_id", mention_id),
+            ("entity_id", entity_id),
+            ("annotator_id", annotator_id),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if passage_prefix is not None:
+            clauses.append("passage_urn >= ? AND passage_urn < ?")
+            params.extend([passage_prefix, passage_prefix + PREFIX_END])
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        cur = self.conn.execute(f"SELECT row_json FROM mentions {where} ORDER BY dataset, line_no", params)
+        for (row_json,) in cur:
+            yield json.loads(row_json)
+
+    def overlapping(self, dataset: str, work_slug: str, passage_urn: str, token_start: int, token_end: int) -> Iterator[dict[str, Any]]:
+        # Mentions in one passage whose [start, end) intersects the given span.
+        cur = self.conn.execute(
+            "SELECT row_json FROM mentions WHERE work_slug = ? AND passage_urn = ? AND token_start < ? AND token_end > ? "
+            "AND dataset = ? ORDER BY token_start, token_end, line_no",
+            (work_slug, passage_urn, int(token_end), int(token_start), dataset),
+        )
+        for (row_json,) in cur:
+            yield json.loads(row_json)
+
+    def disagreements(
+        self, dataset_a: str, dataset_b: str, *, work_slug: str | None = None, passage_prefix: str | None = None
+    ) -> Iterator[dict[str, Any]]:
+        # Exact-span comparison (IAA --match exact): type mismatches plus spans missing on either side.
+        scope = ""
+        params: list[Any] = []
+        if work_slug is not None:
+            scope += " AND {t}.work_slug = ?"
+            params.append(work_slug)
+        if passage_prefix is not None:
+            scope += " AND {t}.passage_urn >= ? AND {t}.passage_urn < ?"
+            params.extend([passage_prefix, passage_prefix + PREFIX_END])
+        join = "x.work_slug = y.work_slug AND x.passage_urn = y.passage_urn AND x.token_start = y.token_start AND x.token_end = y.token_end"
+        queries = [
+            (
+                "type_mismatch",
+                f"SELECT x.row_json, y.row_json FROM mentions x JOIN mentions y ON {join} AND y.dataset = ? "
+                f"WHERE x.dataset = ? AND x.provisional_type IS NOT y.provisional_type{scope.format(t='x')}",
+                [dataset_b, dataset_a, *params],
+            ),
+            (
+                "missing_in_B",
+                f"SELECT x.row_json, NULL FROM mentions x WHERE x.dataset = ?{scope.format(t='x')} "
+                f"AND NOT EXISTS (SELECT 1 FROM mentions y WHERE y.dataset = ? AND {join})",
+                [dataset_a, *params, dataset_b],
+            ),
+            (
+                "missing_in_A",
+                f"SELECT NULL, x.row_json FROM mentions x WHERE x.dataset = ?{scope.format(t='x')} "
+                f"AND NOT EXISTS (SELECT 1 FROM mentions y WHERE y.dataset = ? AND {join})",
+                [dataset_b, *params, dataset_a],
+            ),
+        ]
+        out: list[dict[str, Any]] = []
+        for reason, sql, qparams in queries:
+            for a_json, b_json in self.conn.execute(sql, qparams):
+                a = json.loads(a_json) if a_json else None
+                b = json.loads(b_json) if b_json else None
+                out.append({"passage_urn": (a or b)["passage_urn"], "a": a, "b": b, "reason": reason})
+        out.sort(key=lambda d: (d["passage_urn"], d["reason"], int((d["a"] or d["b"])["token_start"])))
+        yield from out
+
+
+def open_dataset(db: Path, dataset: str) -> AnnotationStore:
+    # Read side for scripts taking --store/--dataset instead of --in (never creates a store).
+    if not db.exists():
+        raise SystemExit(f"Annotation store not found: {db}")
+    store = AnnotationStore(db)
+    if dataset not in store.datasets():
+        store.close()
+        raise SystemExit(f"Unknown dataset in {db}: {dataset}")
+    return store
+
+
+def add_input_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--in", dest="inp", help="Mention JSONL (or use --store with --dataset).")
+    ap.add_argument("--store", help="Annotation store SQLite (scripts/annotation_store.py) to read --dataset from.")
+    ap.add_argument("--dataset", help="Dataset name in --store (e.g., gold_v0, auto_galen_smt).")
+
+
+def input_rows(args: argparse.Namespace) -> Iterator[dict[str, Any]]:
+    # Rows from --in, or from a store dataset in its original line order.
+    if args.store:
+        if not args.dataset:
+            raise SystemExit("--store requires --dataset")
+        with open_dataset(Path(args.store), args.dataset) as store:
+            yield from store.rows(args.dataset)
+    elif args.inp:
+        yield from iter_jsonl(Path(args.inp))
+    else:
+        raise SystemExit("Provide --in or --store with --dataset.")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="SQLite annotation store: import/export JSONL states and run indexed queries.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ap_import = sub.add_parser("import", help="Load (or replace) a dataset from JSONL.")
+    ap_import.add_argument("--db", required=True)
+    ap_import.add_argument("--dataset", required=True, help="Dataset name (e.g., open_coding_A, gold_v0, reviewed_galen_smt).")
+    ap_import.add_argument("--jsonl", required=True)
+
+    ap_export = sub.add_parser("export", help="Write a dataset back to JSONL in its original line order.")
+    ap_export.add_argument("--db", required=True)
+    ap_export.add_argument("--dataset", required=True)
+    ap_export.add_argument("--out", required=True)
+
+    ap_query = sub.add_parser("query", help="Indexed lookup; writes matching rows as JSONL.")
+    ap_query.add_argument("--db", required=True)
+    ap_query.add_argument("--dataset")
+    ap_query.add_argument("--work-slug")
+    ap_query.add_argument("--passage-urn")
+    ap_query.add_argument("--passage-prefix", help="passage_urn prefix, e.g. '<work_urn>:3.' for book 3.")
+    ap_query.add_argument("--mention-id")
+    ap_query.add_argument("--entity-id")
+    ap_query.add_argument("--annotator-id")
+    ap_query.add_argument("--out", required=True)
+
+    ap_dis = sub.add_parser("disagreements", help="Exact-span disagreements between two datasets.")
+    ap_dis.add_argument("--db", required=True)
+    ap_dis.add_argument("--a", required=True, help="Dataset name for annotator A.")
+    ap_dis.add_argument("--b", required=True, help="Dataset name for annotator B.")
+    ap_dis.add_argument("--work-slug")
+    ap_dis.add_argument("--passage-prefix")
+    ap_dis.add_argument("--out", required=True)
+
+    args = ap.parse_args()
+
+    with AnnotationStore(Path(args.db)) as store:
+        if args.cmd == "import":
+            n = store.import_jsonl(args.dataset, Path(args.jsonl))
+            print(f"OK: {args.dataset} ({n} rows)")
+        elif args.cmd == "export":
+            if args.dataset not in store.datasets():
+                raise SystemExit(f"Unknown dataset: {args.dataset}")
+            write_jsonl(Path(args.out), store.rows(args.dataset))
+        elif args.cmd == "query":
+            write_jsonl(
+                Path(args.out),
+                store.rows(
+                    args.dataset,
+                    work_slug=args.work_slug,
+                    passage_urn=args.passage_urn,
+                    passage_prefix=args.passage_prefix,
+                    mention_id=args.mention_id,
+                    entity_id=args.entity_id,
+                    annotator_id=args.annotator_id,
+                ),
+            )
+        else:
+            write_jsonl(
+                Path(args.out),
+                store.disagreements(args.a, args.b, work_slug=args.work_slug, passage_prefix=args.passage_prefix),
+            )
+
+
+if __name__ == "__main__":
+    main()
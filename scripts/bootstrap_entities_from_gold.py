@@ -8,7 +8,7 @@ from collections import Counter, defaultdict
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import PROVISIONAL_TO_MVO, iter_jsonl, normalize_greek
+from ner_ontology_utils import PROVISIONAL_TO_MVO, iter_jsonl, normalize_greek, sha256_file, write_json, write_jsonl
 
 
 TYPE_TO_FILE = {
@@ -20,6 +20,10 @@ TYPE_TO_FILE = {
     "MEASURE": "measures.tsv",
     "PERSON_GROUP": "person_groups.tsv",
 }
+ENTITY_FIELDS = ["entity_id", "mvo_type", "preferred_label", "preferred_label_norm", "notes"]
+# Merges ledger next to the registries (written by dedup_entities.py apply); not a *.tsv so
+# registry globs skip it. Merged entities stay merged across bootstrap and lexicon rebuilds.
+MERGES_LEDGER = "merges.jsonl"
 
 
 def entity_id(mvo_type: str, preferred_norm: str) -> str:
@@ -27,28 +31,28 @@ def entity_id(mvo_type: str, preferred_norm: str) -> str:
     return "ent_" + mvo_type.lower() + "_" + hashlib.sha1(raw).hexdigest()[:12]
 
 
-def main() -> None:
-    ap = argparse.ArgumentParser(description="Bootstrap entity registries from gold mention JSONL.")
-    ap.add_argument("--gold", required=True)
-    ap.add_argument("--out-dir", required=True)
-    args = ap.parse_args()
+def write_registry(path: Path, rows: list[dict[str, Any]], fieldnames: list[str]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t")
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
 
-    out_dir = Path(args.out_dir)
-    out_dir.mkdir(parents=True, exist_ok=True)
 
-    # Always overwrite all expected registries so reruns don't leave stale categories.
-    for fname in TYPE_TO_FILE.values():
-        path = out_dir / fname
-        with path.open("w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(
-                f, fieldnames=["entity_id", "mvo_type", "preferred_label", "preferred_label_norm", "notes"], delimiter="\t"
-            )
-            w.writeheader()
+def read_registry(path: Path) -> tuple[list[dict[str, Any]], list[str]]:
+    with path.open("r", encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        rows = list(reader)
+        # Curator-added columns are kept after the standard ones.
+        fieldnames = ENTITY_FIELDS + [c for c in (reader.fieldnames or []) if c not in ENTITY_FIELDS]
+    return rows, fieldnames
 
+
+def gold_entities(gold_path: Path) -> dict[str, list[dict[str, Any]]]:
     # Group by (mvo_type, surface_norm); pick most common surface as preferred label.
     buckets: dict[tuple[str, str], Counter[str]] = defaultdict(Counter)
 
-    for row in iter_jsonl(Path(args.gold)):
+    for row in iter_jsonl(gold_path):
         ptype = str(row.get("provisional_type"))
         mvo_type = PROVISIONAL_TO_MVO.get(ptype)
         if not mvo_type:
@@ -72,18 +76,93 @@ def main() -> None:
                 "notes": "",
             }
         )
+    for rows in by_type.values():
+        rows.sort(key=lambda r: r["entity_id"])
+    return by_type
+
+
+def read_merges(entities_dir: Path) -> list[dict[str, Any]]:
+    path = entities_dir / MERGES_LEDGER
+    return list(iter_jsonl(path)) if path.exists() else []
+
+
+def write_merges(entities_dir: Path, rows: list[dict[str, Any]]) -> None:
+    write_jsonl(entities_dir / MERGES_LEDGER, sorted(rows, key=lambda r: r["entity_id"]))
+
+
+def known_variants(lexicons_dir: Path, fname: str) -> set[str]:
+    # variant_norm values already in a lexicon (e.g. moved there by dedup_entities.py apply).
+    path = lexicons_dir / fname
+    if not path.exists():
+        return set()
+    with path.open("r", encoding="utf-8") as f:
+        return {(r.get("variant_norm") or "").strip() for r in csv.DictReader(f, delimiter="\t")}
 
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Bootstrap entity registries from gold mention JSONL.")
+    ap.add_argument("--gold", required=True)
+    ap.add_argument("--out-dir", required=True)
+    ap.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep existing registry rows (and notes) as they are; only append entities whose (mvo_type, norm) is new.",
+    )
+    ap.add_argument("--lexicons", help="With --incremental: also skip norms already present as a lexicon variant_norm.")
+    ap.add_argument("--changes", help="Write a JSON report of added entity ids and changed registry files.")
+    args = ap.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    by_type = gold_entities(Path(args.gold))
+    # Entities merged away by dedup_entities.py are not recreated from their gold surfaces.
+    merges = read_merges(out_dir)
+    merged_ids = {m["entity_id"] for m in merges}
+    merged_keys = {(m["mvo_type"], m["preferred_label_norm"]) for m in merges}
     for mvo_type, rows in by_type.items():
-        fname = TYPE_TO_FILE[mvo_type]
+        by_type[mvo_type] = [r for r in rows if r["entity_id"] not in merged_ids and (mvo_type, r["preferred_label_norm"]) not in merged_keys]
+
+    added: dict[str, list[str]] = {}
+    existing_counts: dict[str, int] = {}
+    for mvo_type, fname in sorted(TYPE_TO_FILE.items()):
         path = out_dir / fname
-        rows.sort(key=lambda r: r["entity_id"])
-        with path.open("w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(
-                f, fieldnames=["entity_id", "mvo_type", "preferred_label", "preferred_label_norm", "notes"], delimiter="\t"
-            )
-            w.writeheader()
-            for r in rows:
-                w.writerow(r)
+        new_rows = by_type.get(mvo_type, [])
+        if not args.incremental:
+            # Always overwrite all expected registries so reruns don't leave stale categories.
+            write_registry(path, new_rows, ENTITY_FIELDS)
+            added[fname] = [r["entity_id"] for r in new_rows]
+            existing_counts[fname] = 0
+            continue
+
+        rows, fieldnames = read_registry(path) if path.exists() else ([], ENTITY_FIELDS)
+        variants = known_variants(Path(args.lexicons), fname) if args.lexicons else set()
+        ids = {r.get("entity_id") for r in rows}
+        keys = {(r.get("mvo_type") or mvo_type, r.get("preferred_label_norm") or normalize_greek(r.get("preferred_label") or "")) for r in rows}
+        fresh = [
+            r
+            for r in new_rows
+            if r["entity_id"] not in ids and (mvo_type, r["preferred_label_norm"]) not in keys and r["preferred_label_norm"] not in variants
+        ]
+        existing_counts[fname] = len(rows)
+        added[fname] = [r["entity_id"] for r in fresh]
+        # Unchanged registries are not rewritten (mtime and bytes stay as they are).
+        if fresh or not path.exists():
+            write_registry(path, rows + fresh, fieldnames)
+
+    changed = sorted(f for f, ids in added.items() if ids or not args.incremental)
+    if args.changes:
+        write_json(
+            Path(args.changes),
+            {
+                "mode": "incremental" if args.incremental else "full",
+                "gold_sha256": sha256_file(Path(args.gold)),
+                "added": {f: ids for f, ids in sorted(added.items()) if ids},
+                "existing": existing_counts,
+                "changed_files": changed,
+            },
+        )
+    n_added = sum(len(ids) for ids in added.values())
+    print(f"OK: {n_added} entities added, {len(changed)} registries changed, {sum(existing_counts.values())} existing rows kept")
 
 
 if __name__ == "__main__":
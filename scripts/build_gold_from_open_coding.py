@@ -7,7 +7,7 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import iter_jsonl, write_jsonl
+from ner_ontology_utils import Mention, iter_mentions, write_mentions
 
 
 FIXED_TS = "2000-01-01T00:00:00Z"
@@ -24,8 +24,8 @@ def stable_gold_mention_id(work_slug: str, passage_urn: str, token_start: int, t
     return "g_" + hashlib.sha1(raw).hexdigest()[:12]
 
 
-def key_for(row: dict[str, Any]) -> tuple[str, int, int]:
-    return (str(row["passage_urn"]), int(row["token_start"]), int(row["token_end"]))
+def key_for(m: Mention) -> tuple[str, int, int]:
+    return (m.passage_urn, m.token_start, m.token_end)
 
 
 def main() -> None:
@@ -37,35 +37,31 @@ def main() -> None:
     ap.add_argument("--annotator-id", default="ADJUDICATOR_MERGE")
     args = ap.parse_args()
 
-    a_rows = list(iter_jsonl(Path(args.a)))
-    b_rows = list(iter_jsonl(Path(args.b)))
-    adj_rows = list(iter_jsonl(Path(args.adjudicated_queue)))
-
-    by_key_a: dict[tuple[str, int, int], list[dict[str, Any]]] = defaultdict(list)
-    by_key_b: dict[tuple[str, int, int], list[dict[str, Any]]] = defaultdict(list)
-    for r in a_rows:
-        by_key_a[key_for(r)].append(r)
-    for r in b_rows:
-        by_key_b[key_for(r)].append(r)
+    by_key_a: dict[tuple[str, int, int], list[Mention]] = defaultdict(list)
+    by_key_b: dict[tuple[str, int, int], list[Mention]] = defaultdict(list)
+    for m in iter_mentions(Path(args.a)):
+        by_key_a[key_for(m)].append(m)
+    for m in iter_mentions(Path(args.b)):
+        by_key_b[key_for(m)].append(m)
 
     # Adjudicated decisions indexed by span key.
-    by_key_adj: dict[tuple[str, int, int], dict[str, Any]] = {}
-    for r in adj_rows:
-        by_key_adj[key_for(r)] = r
+    by_key_adj: dict[tuple[str, int, int], Mention] = {}
+    for m in iter_mentions(Path(args.adjudicated_queue)):
+        by_key_adj[key_for(m)] = m
 
-    gold: list[dict[str, Any]] = []
+    gold: list[Mention] = []
     keys = sorted(set(by_key_a.keys()) | set(by_key_b.keys()))
 
     for k in keys:
-        aa = sorted(by_key_a.get(k, []), key=lambda r: (-certainty_rank(r.get("certainty")), r.get("annotator_id", "")))
-        bb = sorted(by_key_b.get(k, []), key=lambda r: (-certainty_rank(r.get("certainty")), r.get("annotator_id", "")))
+        aa = sorted(by_key_a.get(k, []), key=lambda m: (-certainty_rank(m.certainty), m.get("annotator_id", "")))
+        bb = sorted(by_key_b.get(k, []), key=lambda m: (-certainty_rank(m.certainty), m.get("annotator_id", "")))
 
         # If there is an adjudicated decision for this span, take it.
         if k in by_key_adj:
-            chosen = dict(by_key_adj[k])
-            chosen["annotator_id"] = args.annotator_id
-            chosen["timestamp"] = FIXED_TS
-            chosen["notes"] = (chosen.get("notes") or "") + "|ADJ_QUEUE_DECISION"
+            chosen = by_key_adj[k].copy()
+            chosen.annotator_id = args.annotator_id
+            chosen.timestamp = FIXED_TS
+            chosen.notes = (chosen.notes or "") + "|ADJ_QUEUE_DECISION"
             gold.append(chosen)
             continue
 
@@ -73,12 +69,12 @@ def main() -> None:
         if aa and bb:
             ra = aa[0]
             rb = bb[0]
-            if str(ra.get("provisional_type")) == str(rb.get("provisional_type")) and certainty_rank(ra.get("certainty")) > 0 and certainty_rank(rb.get("certainty")) > 0:
-                out = dict(ra)
-                out["mention_id"] = stable_gold_mention_id(out["work_slug"], out["passage_urn"], int(out["token_start"]), int(out["token_end"]))
-                out["annotator_id"] = args.annotator_id
-                out["timestamp"] = FIXED_TS
-                out["notes"] = (out.get("notes") or "") + "|AUTO_AGREED_AB"
+            if str(ra.provisional_type) == str(rb.provisional_type) and certainty_rank(ra.certainty) > 0 and certainty_rank(rb.certainty) > 0:
+                out = ra.copy()
+                out.mention_id = stable_gold_mention_id(out.work_slug, out.passage_urn, out.token_start, out.token_end)
+                out.annotator_id = args.annotator_id
+                out.timestamp = FIXED_TS
+                out.notes = (out.notes or "") + "|AUTO_AGREED_AB"
                 gold.append(out)
                 continue
 
@@ -86,16 +82,16 @@ def main() -> None:
         candidates = aa[:1] + bb[:1]
         if not candidates:
             continue
-        chosen = sorted(candidates, key=lambda r: (-certainty_rank(r.get("certainty")), str(r.get("annotator_id", ""))))[0]
-        out = dict(chosen)
-        out["mention_id"] = stable_gold_mention_id(out["work_slug"], out["passage_urn"], int(out["token_start"]), int(out["token_end"]))
-        out["annotator_id"] = args.annotator_id
-        out["timestamp"] = FIXED_TS
-        out["notes"] = (out.get("notes") or "") + "|AUTO_TIEBREAK"
+        chosen = sorted(candidates, key=lambda m: (-certainty_rank(m.certainty), str(m.get("annotator_id", ""))))[0]
+        out = chosen.copy()
+        out.mention_id = stable_gold_mention_id(out.work_slug, out.passage_urn, out.token_start, out.token_end)
+        out.annotator_id = args.annotator_id
+        out.timestamp = FIXED_TS
+        out.notes = (out.notes or "") + "|AUTO_TIEBREAK"
         gold.append(out)
 
-    gold.sort(key=lambda r: (r["work_slug"], r["passage_urn"], int(r["token_start"]), int(r["token_end"])))
-    write_jsonl(Path(args.out), gold)
+    gold.sort(key=lambda m: (m.work_slug, m.passage_urn, m.token_start, m.token_end))
+    write_mentions(Path(args.out), gold)
 
 
 if __name__ == "__main__":
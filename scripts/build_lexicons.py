@@ -5,13 +5,18 @@ import argparse
 import csv
 from pathlib import Path
 
-from ner_ontology_utils import normalize_greek
+from bootstrap_entities_from_gold import read_merges
+from ner_ontology_utils import normalize_greek, read_json
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Build lexicon TSVs from entity registry TSVs.")
     ap.add_argument("--entities", required=True, help="Directory containing data/entities/*.tsv")
     ap.add_argument("--out-dir", required=True, help="Output directory (data/lexicons)")
+    ap.add_argument(
+        "--changes",
+        help="bootstrap_entities_from_gold.py --changes report: only rebuild lexicons of the registries it lists as changed (and missing ones).",
+    )
     args = ap.parse_args()
 
     entities_dir = Path(args.entities)
@@ -28,15 +33,30 @@ def main() -> None:
         "measures.tsv",
         "person_groups.tsv",
     ]
+    # Decided up front: the header pass below creates missing files.
+    skipped: set[str] = set()
+    if args.changes:
+        changed = set(read_json(Path(args.changes)).get("changed_files") or [])
+        skipped = {p.name for p in out_dir.glob("*.tsv") if p.name not in changed}
+
     for fname in expected:
         path = out_dir / fname
+        if fname in skipped:
+            continue
         with path.open("w", newline="", encoding="utf-8") as f:
             w = csv.DictWriter(
                 f, fieldnames=["entity_id", "preferred_label", "variant", "variant_norm", "notes"], delimiter="\t"
             )
             w.writeheader()
 
+    # Labels of merged entities stay variants of the entity they were merged into.
+    merged_labels: dict[str, list[str]] = {}
+    for m in read_merges(entities_dir):
+        merged_labels.setdefault(m["merged_into"], []).append(m["preferred_label"])
+
     for ent_path in sorted(entities_dir.glob("*.tsv")):
+        if ent_path.name in skipped:
+            continue
         out_path = out_dir / ent_path.name
         with ent_path.open("r", encoding="utf-8") as f:
             rows = list(csv.DictReader(f, delimiter="\t"))
@@ -44,16 +64,20 @@ def main() -> None:
         lex_rows = []
         for r in rows:
             preferred = r.get("preferred_label") or ""
-            variant = preferred
-            lex_rows.append(
-                {
-                    "entity_id": r.get("entity_id") or "",
-                    "preferred_label": preferred,
-                    "variant": variant,
-                    "variant_norm": normalize_greek(variant),
-                    "notes": r.get("notes") or "",
-                }
-            )
+            seen: set[str] = set()
+            for variant in [preferred, *merged_labels.get(r.get("entity_id") or "", [])]:
+                if normalize_greek(variant) in seen:
+                    continue
+                seen.add(normalize_greek(variant))
+                lex_rows.append(
+                    {
+                        "entity_id": r.get("entity_id") or "",
+                        "preferred_label": preferred,
+                        "variant": variant,
+                        "variant_norm": normalize_greek(variant),
+                        "notes": r.get("notes") or "",
+                    }
+                )
 
         lex_rows.sort(key=lambda r: (r["entity_id"], r["variant_norm"], r["variant"]))
         with out_path.open("w", newline="", encoding="utf-8") as f:
@@ -11,8 +11,10 @@ from ner_ontology_utils import (
     build_passages_from_edition,
     extract_work_urn,
     find_edition_div,
+    is_json_path,
     sha256_file,
     write_json,
+    write_passage_table,
 )
 
 
@@ -40,7 +42,7 @@ def main() -> None:
     out_path = Path(args.out)
     if out_path.exists() and out_path.is_dir():
         out_path = out_path / f"{work_slug}.json"
-    elif str(out_path).endswith(("/", "\\")) or out_path.suffix.lower() != ".json":
+    elif str(out_path).endswith(("/", "\\")) or not is_json_path(out_path):
         # Treat as directory path even if it doesn't exist yet.
         out_path = out_path / f"{work_slug}.json"
 
@@ -78,6 +80,7 @@ def main() -> None:
     }
 
     write_json(out_path, payload)
+    write_passage_table(out_path, payload)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import math
+from pathlib import Path
+from typing import Any, Iterable
+
+from ner_ontology_utils import iter_jsonl, mention_key, write_json
+
+
+# Cross-artifact references are checked with compact key sets: each key is stored as a
+# 64-bit blake2b digest (an int) instead of the full string/tuple. --bloom-capacity
+# switches the large sets to Bloom filters with a fixed memory budget.
+
+
+def key_digest(*parts: Any) -> int:
+    raw = "\x1f".join(str(p) for p in parts).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+
+class BloomFilter:
+    # Fixed-size bit array; k probe positions come from one 64-bit digest (double hashing).
+    # A hit means "possibly present"; a miss is certain.
+    def __init__(self, capacity: int, fp_rate: float = 1e-4) -> None:
+        self.n_bits = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.n_bits + 7) // 8)
+
+    def _positions(self, key: int) -> Iterable[int]:
+        h1 = key & 0xFFFFFFFF
+        h2 = (key >> 32) | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, key: int) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def new_key_set(bloom_capacity: int | None) -> set[int] | BloomFilter:
+    return BloomFilter(bloom_capacity) if bloom_capacity else set()
+
+
+def load_entity_types(entities_dir: Path) -> dict[str, str]:
+    # Registries are small next to mention files; entity_id -> mvo_type.
+    out: dict[str, str] = {}
+    for path in sorted(entities_dir.glob("*.tsv")):
+        with path.open("r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                eid = (row.get("entity_id") or "").strip()
+                if eid:
+                    out[eid] = (row.get("mvo_type") or "").strip()
+    return out
+
+
+class Report:
+    def __init__(self, max_examples: int) -> None:
+        self.max_examples = max_examples
+        self.counts: dict[str, int] = {}
+        self.examples: dict[str, list[str]] = {}
+
+    def add(self, kind: str, message: str) -> None:
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        examples = self.examples.setdefault(kind, [])
+        if len(examples) < self.max_examples:
+            examples.append(message)
+
+    def ensure(self, kind: str) -> None:
+        self.counts.setdefault(kind, 0)
+        self.examples.setdefault(kind, [])
+
+
+def check_entity_refs(paths: list[Path], entity_types: dict[str, str], report: Report) -> int:
+    report.ensure("dangling_entity_id")
+    report.ensure("entity_type_mismatch")
+    n = 0
+    for path in paths:
+        for line_no, row in enumerate(iter_jsonl(path), start=1):
+            eid = row.get("entity_id")
+            if not eid:
+                continue
+            n += 1
+            if eid not in entity_types:
+                report.add("dangling_entity_id", f"{path}:{line_no}: entity_id {eid} not in entity registries")
+            elif row.get("mvo_type") and row["mvo_type"] != entity_types[eid]:
+                report.add(
+                    "entity_type_mismatch",
+                    f"{path}:{line_no}: mvo_type {row['mvo_type']} != registry type {entity_types[eid]} for {eid}",
+                )
+    return n
+
+
+def check_adjudicated_keys(a: Path, b: Path, adjudicated: Path, report: Report, bloom_capacity: int | None) -> int:
+    # Same span key as build_gold_from_open_coding: (passage_urn, token_start, token_end).
+    report.ensure("dangling_adjudicated_key")
+    keys = new_key_set(bloom_capacity)
+    for path in (a, b):
+        for row in iter_jsonl(path):
+            keys.add(key_digest(row["passage_urn"], int(row["token_start"]), int(row["token_end"])))
+    n = 0
+    for line_no, row in enumerate(iter_jsonl(adjudicated), start=1):
+        n += 1
+        if key_digest(row["passage_urn"], int(row["token_start"]), int(row["token_end"])) not in keys:
+            report.add(
+                "dangling_adjudicated_key",
+                f"{adjudicated}:{line_no}: span {row['passage_urn']} {row['token_start']}-{row['token_end']} not in A or B",
+            )
+    return n
+
+
+def check_unique_mention_ids(path: Path, report: Report, bloom_capacity: int | None) -> int:
+    # Exact mode: one pass over a 64-bit digest set. Bloom mode: one pass to collect
+    # possible repeats, then a second pass restricted to those candidates to confirm.
+    report.ensure("duplicate_mention_id")
+    seen = new_key_set(bloom_capacity)
+    candidates: set[int] = set()
+    n = 0
+    for line_no, row in enumerate(iter_jsonl(path), start=1):
+        n += 1
+        k = key_digest(mention_key(row))
+        if k in seen:
+            if isinstance(seen, BloomFilter):
+                candidates.add(k)
+            else:
+                report.add("duplicate_mention_id", f"{path}:{line_no}: duplicate mention_id {mention_key(row)}")
+        else:
+            seen.add(k)
+    if candidates:
+        first_seen: set[int] = set()
+        for line_no, row in enumerate(iter_jsonl(path), start=1):
+            k = key_digest(mention_key(row))
+            if k not in candidates:
+                continue
+            if k in first_seen:
+                report.add("duplicate_mention_id", f"{path}:{line_no}: duplicate mention_id {mention_key(row)}")
+            else:
+                first_seen.add(k)
+    return n
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Cross-artifact referential integrity: entity refs, adjudicated keys, unique mention ids.")
+    ap.add_argument("--entities", help="Entity registry dir (data/entities/*.tsv).")
+    ap.add_argument("--linked", nargs="+", default=[], help="Linked/auto/reviewed JSONL whose entity_id must exist with a matching mvo_type.")
+    ap.add_argument("--a", help="Open-coding A JSONL.")
+    ap.add_argument("--b", help="Open-coding B JSONL.")
+    ap.add_argument("--adjudicated-queue", help="Adjudicated decisions JSONL; every span key must exist in A or B.")
+    ap.add_argument("--unique-mention-ids", nargs="+", default=[], help="JSONL files whose mention ids (or derived m_ keys) must be unique.")
+    ap.add_argument(
+        "--bloom-capacity",
+        type=int,
+        help="Use Bloom filters sized for this many keys instead of exact digest sets "
+        "(bounded memory; a false positive can hide a dangling adjudicated key at ~1e-4).",
+    )
+    ap.add_argument("--max-examples", type=int, default=50, help="Reported examples per issue kind (all are counted).")
+    ap.add_argument("--report", help="Write counts and examples as JSON.")
+    args = ap.parse_args()
+
+    if args.linked and not args.entities:
+        raise SystemExit("--linked requires --entities.")
+    if args.adjudicated_queue and not (args.a and args.b):
+        raise SystemExit("--adjudicated-queue requires --a and --b.")
+
+    report = Report(args.max_examples)
+    checked: dict[str, int] = {}
+    if args.linked:
+        checked["entity_refs"] = check_entity_refs([Path(p) for p in args.linked], load_entity_types(Path(args.entities)), report)
+    if args.adjudicated_queue:
+        checked["adjudicated_keys"] = check_adjudicated_keys(
+            Path(args.a), Path(args.b), Path(args.adjudicated_queue), report, args.bloom_capacity
+        )
+    for p in args.unique_mention_ids:
+        checked[f"mention_ids:{p}"] = check_unique_mention_ids(Path(p), report, args.bloom_capacity)
+
+    ok = not any(report.counts.values())
+    if args.report:
+        write_json(
+            Path(args.report),
+            {
+                "ok": ok,
+                "mode": "bloom" if args.bloom_capacity else "exact",
+                "checked": checked,
+                "counts": report.counts,
+                "examples": report.examples,
+            },
+        )
+    if not ok:
+        lines = ["Integrity check failed:"]
+        for kind in sorted(report.counts):
+            if report.counts[kind]:
+                lines.append(f"- {kind}: {report.counts[kind]}")
+                lines.extend(f"  - {m}" for m in report.examples[kind])
+        raise SystemExit("\n".join(lines))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any
+
+from link_mentions import load_lexicons
+from ner_ontology_utils import iter_jsonl, mention_key, write_jsonl
+
+
+# Groups no_match rows of the unlinked queue into clusters of near-identical surface_norm
+# (inflections, variant spellings) so curators resolve a cluster at a time:
+# - char k-shingles of "<norm>" -> MinHash signature (num_bands * band_rows seeded hashes)
+# - LSH banding: surfaces sharing any band bucket become candidate pairs (near-linear)
+# - candidates are kept when their exact shingle Jaccard reaches --threshold; union-find
+#   turns kept pairs into clusters (within one mvo_type)
+# Lexicon variants are hashed into the same buckets (never clustered) to suggest an entity_id.
+MERSENNE_61 = (1 << 61) - 1
+
+
+def shingles(norm: str, k: int) -> frozenset[str]:
+    padded = f"<{norm}>"
+    if len(padded) <= k:
+        return frozenset([padded])
+    return frozenset(padded[i : i + k] for i in range(len(padded) - k + 1))
+
+
+def shingle_hash(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") % MERSENNE_61
+
+
+def make_perms(n: int, seed: int) -> list[tuple[int, int]]:
+    rng = random.Random(seed)
+    return [(rng.randrange(1, MERSENNE_61), rng.randrange(0, MERSENNE_61)) for _ in range(n)]
+
+
+def minhash(sh: frozenset[str], perms: list[tuple[int, int]]) -> list[int]:
+    hs = [shingle_hash(s) for s in sh]
+    return [min((a * x + b) % MERSENNE_61 for x in hs) for a, b in perms]
+
+
+def jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class UnionFind:
+    def __init__(self, n: int) -> None:
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def bucket_pairs(members: list[int], max_bucket: int) -> list[tuple[int, int]]:
+    # All pairs for normal buckets; an oversized bucket (a very common band) only pairs
+    # neighbours in sorted order, which keeps the join linear while still chaining members.
+    if len(members) <= max_bucket:
+        return [(members[i], members[j]) for i in range(len(members)) for j in range(i + 1, len(members))]
+    return list(zip(members, members[1:]))
+
+
+def cluster_id(mvo_type: str, norms: list[str]) -> str:
+    raw = (mvo_type + "|" + "|".join(sorted(norms))).encode("utf-8")
+    return "clu_" + hashlib.sha1(raw).hexdigest()[:12]
+
+
+def build_worklist(
+    unlinked: list[dict[str, Any]],
+    lexicons: dict[str, dict[str, list[str]]],
+    k: int,
+    num_bands: int,
+    band_rows: int,
+    threshold: float,
+    seed: int,
+    max_bucket: int,
+) -> list[dict[str, Any]]:
+    # (mvo_type, surface_norm) -> frequency, surfaces, mention ids
+    freq: Counter[tuple[str, str]] = Counter()
+    surfaces: dict[tuple[str, str], Counter[str]] = defaultdict(Counter)
+    mention_ids: dict[tuple[str, str], list[str]] = defaultdict(list)
+    for item in unlinked:
+        if item.get("reason") != "no_match" or not item.get("surface_norm"):
+            continue
+        key = (str(item["mvo_type"]), str(item["surface_norm"]))
+        row = item.get("row") or {}
+        freq[key] += 1
+        surfaces[key][str(row.get("surface") or key[1])] += 1
+        mention_ids[key].append(str(row.get("mention_id") or mention_key(row)))
+
+    keys = sorted(freq)
+    perms = make_perms(num_bands * band_rows, seed)
+    sh = [shingles(norm, k) for _, norm in keys]
+    buckets: dict[tuple[str, int, tuple[int, ...]], list[int]] = defaultdict(list)
+    for i, (mvo_type, _) in enumerate(keys):
+        sig = minhash(sh[i], perms)
+        for b in range(num_bands):
+            buckets[(mvo_type, b, tuple(sig[b * band_rows : (b + 1) * band_rows]))].append(i)
+
+    uf = UnionFind(len(keys))
+    seen: set[tuple[int, int]] = set()
+    for members in buckets.values():
+        for i, j in bucket_pairs(members, max_bucket):
+            if (i, j) in seen:
+                continue
+            seen.add((i, j))
+            if jaccard(sh[i], sh[j]) >= threshold:
+                uf.union(i, j)
+
+    # Nearest lexicon variant per unlinked surface, via the same band buckets.
+    near: dict[int, tuple[float, str, str]] = {}
+    for mvo_type in sorted({t for t, _ in keys}):
+        for vn, eids in sorted(lexicons.get(mvo_type, {}).items()):
+            if len(set(eids)) != 1:
+                continue
+            vsh = shingles(vn, k)
+            sig = minhash(vsh, perms)
+            hits = {i for b in range(num_bands) for i in buckets.get((mvo_type, b, tuple(sig[b * band_rows : (b + 1) * band_rows])), [])}
+            for i in hits:
+                sim = jaccard(sh[i], vsh)
+                if sim >= threshold and (i not in near or (-sim, vn) < (-near[i][0], near[i][1])):
+                    near[i] = (sim, vn, eids[0])
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for i in range(len(keys)):
+        groups[uf.find(i)].append(i)
+
+    out: list[dict[str, Any]] = []
+    for members in groups.values():
+        mvo_type = keys[members[0]][0]
+        rep = min(members, key=lambda i: (-freq[keys[i]], len(keys[i][1]), keys[i][1]))
+        variants = sorted(({"surface_norm": keys[i][1], "frequency": freq[keys[i]]} for i in members), key=lambda v: (-v["frequency"], v["surface_norm"]))
+        suggestions = sorted((near[i] for i in members if i in near), key=lambda s: (-s[0], s[1]))
+        rep_surface = sorted(surfaces[keys[rep]].items(), key=lambda kv: (-kv[1], kv[0]))[0][0]
+        row: dict[str, Any] = {
+            "cluster_id": cluster_id(mvo_type, [keys[i][1] for i in members]),
+            "mvo_type": mvo_type,
+            "representative": keys[rep][1],
+            "representative_surface": rep_surface,
+            "frequency": sum(freq[keys[i]] for i in members),
+            "variants": variants,
+            "mention_ids": sorted(m for i in members for m in mention_ids[keys[i]]),
+            "suggested_entity_id": suggestions[0][2] if suggestions else "",
+            "suggested_variant_norm": suggestions[0][1] if suggestions else "",
+            "suggestion_similarity": round(suggestions[0][0], 4) if suggestions else 0.0,
+            "decision": "",
+        }
+        out.append(row)
+    out.sort(key=lambda r: (-r["frequency"], r["mvo_type"], r["representative"]))
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Cluster unlinked (no_match) surfaces with MinHash/LSH into a curator worklist.")
+    ap.add_argument("--unlinked", required=True, help="e.g. data/annotations/unlinked_queue.jsonl (scripts/link_mentions.py)")
+    ap.add_argument("--lexicons", required=True, help="data/lexicons (suggested entity_id for clusters near a known variant)")
+    ap.add_argument("--out", required=True, help="e.g. data/annotations/unlinked_clusters.jsonl")
+    ap.add_argument("--shingle", type=int, default=3, help="Character shingle size.")
+    ap.add_argument("--bands", type=int, default=32)
+    ap.add_argument("--band-rows", type=int, default=2)
+    ap.add_argument("--threshold", type=float, default=0.4, help="Minimum shingle Jaccard for a kept pair.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-bucket", type=int, default=200, help="Buckets larger than this only pair sorted neighbours.")
+    args = ap.parse_args()
+
+    if args.shingle < 1 or args.bands < 1 or args.band_rows < 1:
+        raise SystemExit("--shingle, --bands and --band-rows must be >= 1")
+
+    rows = build_worklist(
+        list(iter_jsonl(Path(args.unlinked))),
+        load_lexicons(Path(args.lexicons)),
+        args.shingle,
+        args.bands,
+        args.band_rows,
+        args.threshold,
+        args.seed,
+        args.max_bucket,
+    )
+    write_jsonl(Path(args.out), rows)
+    print(f"OK: {len(rows)} clusters, {sum(len(r['variants']) for r in rows)} surfaces, {sum(1 for r in rows if r['suggested_entity_id'])} with a suggested entity")
+
+
+if __name__ == "__main__":
+    main()
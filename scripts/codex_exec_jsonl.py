@@ -2,10 +2,18 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import os
+import re
 import subprocess
+import sys
 import tempfile
 from pathlib import Path
+from typing import IO, Any, Callable, Iterable
+
+from ner_ontology_utils import Mention, json_dumps, mention_key, normalize_greek, read_json, sha256_file, write_jsonl, write_mentions
+from normalize_annotation_jsonl import repair_mention
 
 
 JSONL_ONLY_SUFFIX = """
@@ -23,19 +31,276 @@ SAFETY
 - Only emit JSONL in the final response.
 """
 
-def validate_jsonl(path: Path) -> None:
-    content = path.read_text(encoding="utf-8").strip()
-    if not content:
-        raise SystemExit(f"Codex returned empty output for {path}.")
+
+def final_prompt(base_prompt: str) -> str:
+    return base_prompt.rstrip() + JSONL_ONLY_SUFFIX
+
+
+def codex_command(last_message: Path, cd: str, effort: str, model: str | None = None, codex_bin: str = "codex") -> list[str]:
+    cmd = [
+        codex_bin,
+        "exec",
+        "--output-last-message",
+        str(last_message),
+        "-C",
+        str(Path(cd)),
+        "-c",
+        f'model_reasoning_effort="{effort}"',
+    ]
+    if model:
+        cmd.extend(["-m", model])
+    return cmd
+
+
+def parse_jsonl_objects(content: str) -> list[dict[str, Any]]:
+    # ValueError names the first offending line.
+    rows: list[dict[str, Any]] = []
     for i, line in enumerate(content.splitlines(), start=1):
         if not line.strip():
             continue
         try:
             obj = json.loads(line)
         except Exception as e:
-            raise SystemExit(f"Invalid JSON on line {i} of Codex output: {e}\nLINE={line!r}")
+            raise ValueError(f"Invalid JSON on line {i} of Codex output: {e}\nLINE={line!r}")
         if not isinstance(obj, dict):
-            raise SystemExit(f"Line {i} is not a JSON object.")
+            raise ValueError(f"Line {i} is not a JSON object.")
+        rows.append(obj)
+    return rows
+
+
+# Content-addressed response cache: the key covers everything that determines a codex answer
+# (final prompt, model, effort and the sha256 of every repo file the prompt names), entries
+# are the captured JSONL, and the least recently used entries go once the cache exceeds its size.
+DEFAULT_CACHE_DIR = ".cache/codex"
+REFERENCED_PATH_RE = re.compile(r"[\w./-]+\.(?:jsonl|json|tsv|yaml|yml|xml|md)\b")
+
+
+def referenced_inputs(prompt: str, cd: Path, exclude: Iterable[Path] = ()) -> dict[str, str]:
+    # Templated paths ({workSlug}) never match; the output file itself is excluded.
+    out: dict[str, str] = {}
+    excluded = {p.resolve() for p in exclude}
+    for ref in sorted(set(REFERENCED_PATH_RE.findall(prompt))):
+        path = cd / ref
+        if path.is_file() and path.resolve() not in excluded:
+            out[ref] = sha256_file(path)
+    return out
+
+
+def cache_key(prompt: str, model: str | None, effort: str, inputs: dict[str, str]) -> str:
+    raw = json_dumps({"prompt": prompt, "model": model, "effort": effort, "inputs": inputs})
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    # The total size is scanned once and then kept as a running counter; eviction (one more
+    # scan) only runs when a write pushes it past max_bytes, and trims to EVICT_TO of the limit
+    # so a cache sitting at its limit is not rescanned on every write.
+    EVICT_TO = 0.9
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._total: int | None = None
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.jsonl"
+
+    def entries(self) -> list[tuple[float, int, Path]]:
+        out = []
+        for p in self.root.glob("*/*.jsonl"):
+            st = p.stat()
+            out.append((st.st_mtime, st.st_size, p))
+        return sorted(out, key=lambda e: (e[0], str(e[2])))
+
+    def total_bytes(self) -> int:
+        if self._total is None:
+            self._total = sum(size for _, size, _ in self.entries())
+        return self._total
+
+    def get(self, key: str) -> str | None:
+        path = self.path(key)
+        if not path.is_file():
+            return None
+        os.utime(path)  # mtime doubles as last use for eviction
+        return path.read_text(encoding="utf-8")
+
+    def put(self, key: str, content: str) -> None:
+        self.put_many({key: content})
+
+    def put_many(self, contents: dict[str, str]) -> None:
+        total = self.total_bytes()
+        for key, content in contents.items():
+            path = self.path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            data = content.encode("utf-8")
+            total -= path.stat().st_size if path.exists() else 0
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            total += len(data)
+        self._total = total
+        if total > self.max_bytes:
+            self.evict(int(self.max_bytes * self.EVICT_TO))
+
+    def evict(self, target: int | None = None) -> None:
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_bytes if target is None else target
+        for _, size, p in entries:
+            if total <= limit:
+                break
+            total -= size
+            p.unlink()
+        self._total = total
+
+
+# Passage-level reuse: rows are cached per (prompt template, model, effort, normalized passage
+# tokens) with passage-local offsets, so an identical normalized passage in another work reuses
+# them rebased onto its own passage (ids, offsets, surfaces recomputed; evidence windows dropped).
+PASSAGE_SPECIFIC_FIELDS = ("work_urn", "passage_urn", "work_slug", "mention_id", "evidence_window", "evidence_window_ref")
+
+
+def passage_cache_key(template_sha256: str, model: str | None, effort: str, tokens_norm: list[str]) -> str:
+    raw = json_dumps({"template": template_sha256, "model": model, "effort": effort, "tokens_norm": tokens_norm})
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def passage_local_rows(rows: list[dict[str, Any]], item: dict[str, Any]) -> list[dict[str, Any]]:
+    lo = int(item["token_start"])
+    out: list[dict[str, Any]] = []
+    for row in rows:
+        local = {k: v for k, v in row.items() if k not in PASSAGE_SPECIFIC_FIELDS}
+        local["token_start"] = int(row["token_start"]) - lo
+        local["token_end"] = int(row["token_end"]) - lo
+        out.append(local)
+    return out
+
+
+def rebase_rows(local_rows: list[dict[str, Any]], item: dict[str, Any]) -> list[dict[str, Any]]:
+    lo = int(item["token_start"])
+    tokens = item.get("tokens") or []
+    out: list[dict[str, Any]] = []
+    for local in local_rows:
+        ts, te = int(local["token_start"]), int(local["token_end"])
+        row = {**local, "work_urn": item["work_urn"], "passage_urn": item["passage_urn"], "work_slug": item["work_slug"]}
+        row["token_start"], row["token_end"] = lo + ts, lo + te
+        if tokens:
+            row["surface"] = " ".join(tokens[ts:te])
+            row["surface_norm"] = normalize_greek(row["surface"])
+        row["mention_id"] = mention_key(row)
+        out.append(row)
+    return out
+
+
+class StreamAborted(Exception):
+    pass
+
+
+class StreamValidator:
+    # Checks JSONL lines one at a time as they arrive: parse, fill defaults, apply the
+    # normalize_annotation_jsonl.py repairs and check the span against its passage bounds.
+    # Lines that fail go to quarantine; once at least min_lines were seen and the rejected
+    # share exceeds max_error_rate, feed() raises StreamAborted so the run can be cut short.
+    def __init__(
+        self,
+        bounds: dict[str, tuple[int, int]],
+        surface_of: Callable[[int, int], str | None],
+        *,
+        defaults: dict[str, Any] | None = None,
+        max_error_rate: float = 0.2,
+        min_lines: int = 20,
+    ) -> None:
+        self.bounds = bounds
+        self.surface_of = surface_of
+        self.defaults = defaults or {}
+        self.max_error_rate = max_error_rate
+        self.min_lines = min_lines
+        self.rows: list[Mention] = []
+        self.quarantine: list[dict[str, Any]] = []
+        self.seen = 0
+
+    @property
+    def error_rate(self) -> float:
+        return len(self.quarantine) / self.seen if self.seen else 0.0
+
+    def check_line(self, text: str) -> Mention:
+        obj = json.loads(text)
+        if not isinstance(obj, dict):
+            raise ValueError("not a JSON object")
+        m = Mention.from_dict({**self.defaults, **obj})
+        if m.token_start is None or m.token_end is None:
+            raise ValueError("token_start/token_end missing")
+        if m.passage_urn not in self.bounds:
+            raise ValueError(f"passage_urn {m.passage_urn!r} not in scope")
+        repair_mention(m, self.surface_of, recompute_mention_id=m.get("annotator_id") is not None)
+        lo, hi = self.bounds[m.passage_urn]
+        if not (lo <= m.token_start < m.token_end <= hi):
+            raise ValueError(f"span {m.token_start}-{m.token_end} outside passage {lo}-{hi}")
+        return m
+
+    def feed(self, line: str) -> None:
+        text = line.strip()
+        if not text:
+            return
+        self.seen += 1
+        try:
+            self.rows.append(self.check_line(text))
+        except (ValueError, TypeError) as e:
+            self.quarantine.append({"line_no": self.seen, "line": text, "error": str(e)})
+        if self.seen >= self.min_lines:
+            self.check_rate()
+
+    def check_rate(self) -> None:
+        if self.error_rate > self.max_error_rate:
+            raise StreamAborted(
+                f"{len(self.quarantine)} of {self.seen} lines rejected (> {self.max_error_rate:.0%}); "
+                f"first: line {self.quarantine[0]['line_no']}: {self.quarantine[0]['error']}"
+            )
+
+    def finish(self) -> None:
+        # End of stream: the threshold applies however few lines arrived; nothing accepted is a failure too.
+        if not self.rows and not self.quarantine:
+            raise StreamAborted("empty output")
+        self.check_rate()
+        if not self.rows:
+            raise StreamAborted("no valid lines")
+
+
+def token_index_validator(token_index: dict[str, Any], **kwargs: Any) -> StreamValidator:
+    tokens: list[str] = token_index.get("tokens") or []
+    bounds = {p["passage_urn"]: (int(p["token_start"]), int(p["token_end"])) for p in token_index.get("passages") or []}
+
+    def surface_of(ts: int, te: int) -> str | None:
+        return " ".join(tokens[ts:te]) if 0 <= ts < te <= len(tokens) else None
+
+    defaults = {"work_slug": token_index.get("work_slug"), "work_urn": token_index.get("work_urn")}
+    return StreamValidator(bounds, surface_of, defaults={**defaults, **kwargs.pop("defaults", {})}, **kwargs)
+
+
+def feed_json_lines(stream: IO[str], validator: StreamValidator, echo: IO[str]) -> None:
+    # codex progress goes to the terminal; lines that look like JSON objects are checked on arrival.
+    for line in stream:
+        if line.lstrip().startswith("{"):
+            validator.feed(line)
+        else:
+            echo.write(line)
+
+
+def write_quarantine(path: Path, validator: StreamValidator) -> None:
+    if validator.quarantine:
+        write_jsonl(path, validator.quarantine)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def validate_jsonl(path: Path) -> None:
+    content = path.read_text(encoding="utf-8").strip()
+    if not content:
+        raise SystemExit(f"Codex returned empty output for {path}.")
+    try:
+        parse_jsonl_objects(content)
+    except ValueError as e:
+        raise SystemExit(str(e))
 
 
 def main() -> None:
@@ -46,38 +311,94 @@ def main() -> None:
     ap.add_argument("--model", help="Optional codex model override.")
     ap.add_argument("--effort", choices=["low", "medium", "high"], default="medium", help="Model reasoning effort.")
     ap.add_argument("--no-validate", action="store_true", help="Skip JSONL validation of the captured output.")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Response cache directory.")
+    ap.add_argument("--cache-max-mb", type=float, default=512.0, help="Evict least recently used cache entries beyond this size.")
+    ap.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache.")
+    ap.add_argument("--refresh", action="store_true", help="Ignore a cached response, re-run codex and overwrite the entry.")
+    ap.add_argument(
+        "--token-index",
+        help="Check and repair annotation lines against this token index as they stream in; "
+        "bad lines are quarantined instead of failing the run.",
+    )
+    ap.add_argument("--annotator-id", help="--token-index: fill annotator_id where a line lacks it.")
+    ap.add_argument("--quarantine", help="Rejected lines JSONL (default: {out}.quarantine.jsonl).")
+    ap.add_argument("--max-error-rate", type=float, default=0.2, help="Abort once this share of lines is rejected.")
+    ap.add_argument("--min-lines", type=int, default=20, help="Lines seen before the error rate can abort a running stream.")
     args = ap.parse_args()
 
     prompt_path = Path(args.prompt)
     out_path = Path(args.out)
 
     base_prompt = prompt_path.read_text(encoding="utf-8")
-    final_prompt = base_prompt.rstrip() + JSONL_ONLY_SUFFIX
+    prompt = final_prompt(base_prompt)
 
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    quarantine_path = Path(args.quarantine) if args.quarantine else out_path.with_name(out_path.name + ".quarantine.jsonl")
+    token_index = read_json(Path(args.token_index)) if args.token_index else None
+
+    def new_validator() -> StreamValidator:
+        assert token_index is not None
+        defaults = {"annotator_id": args.annotator_id} if args.annotator_id else {}
+        return token_index_validator(token_index, defaults=defaults, max_error_rate=args.max_error_rate, min_lines=args.min_lines)
+
+    def accept(content: str) -> None:
+        # Final rows come from the captured last message, checked line by line.
+        if token_index is None:
+            out_path.write_text(content, encoding="utf-8")
+            if not args.no_validate:
+                validate_jsonl(out_path)
+            return
+        validator = new_validator()
+        try:
+            for line in content.splitlines():
+                validator.feed(line)
+            validator.finish()
+        except StreamAborted as e:
+            write_quarantine(quarantine_path, validator)
+            raise SystemExit(f"Codex output rejected: {e} (quarantine: {quarantine_path})")
+        write_mentions(out_path, validator.rows)
+        write_quarantine(quarantine_path, validator)
+        if validator.quarantine:
+            print(f"WARN: {len(validator.quarantine)} of {validator.seen} lines quarantined in {quarantine_path}")
+
+    cache = None if args.no_cache else ResponseCache(Path(args.cache_dir), int(args.cache_max_mb * 1024 * 1024))
+    key = cache_key(prompt, args.model, args.effort, referenced_inputs(prompt, Path(args.cd), {out_path}))
+    cached = cache.get(key) if cache is not None and not args.refresh else None
+    if cached is not None:
+        accept(cached)
+        print(f"OK (cached response {key[:12]})")
+        return
+
     with tempfile.NamedTemporaryFile("w+", encoding="utf-8", delete=False) as tmp:
         tmp_path = Path(tmp.name)
 
-    cmd = [
-        "codex",
-        "exec",
-        "--output-last-message",
-        str(tmp_path),
-        "-C",
-        str(Path(args.cd)),
-        "-c",
-        f'model_reasoning_effort="{args.effort}"',
-    ]
-    if args.model:
-        cmd.extend(["-m", args.model])
+    cmd = codex_command(tmp_path, args.cd, args.effort, args.model)
 
-    # Feed prompt on stdin.
-    subprocess.run(cmd, input=final_prompt.encode("utf-8"), check=True)
+    if token_index is None:
+        # Feed prompt on stdin.
+        subprocess.run(cmd, input=prompt.encode("utf-8"), check=True)
+    else:
+        # Stream stdout so a run producing mostly bad lines is stopped early.
+        watch = new_validator()
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8")
+        assert proc.stdin is not None and proc.stdout is not None
+        proc.stdin.write(prompt)
+        proc.stdin.close()
+        try:
+            feed_json_lines(proc.stdout, watch, sys.stdout)
+        except StreamAborted as e:
+            proc.kill()
+            proc.wait()
+            write_quarantine(quarantine_path, watch)
+            tmp_path.unlink(missing_ok=True)
+            raise SystemExit(f"Aborted codex run early: {e} (quarantine: {quarantine_path})")
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
     content = tmp_path.read_text(encoding="utf-8").strip() + "\n"
-    out_path.write_text(content, encoding="utf-8")
-    if not args.no_validate:
-        validate_jsonl(out_path)
     tmp_path.unlink(missing_ok=True)
+    accept(content)
+    if cache is not None:
+        cache.put(key, content)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from codex_exec_jsonl import (
+    DEFAULT_CACHE_DIR,
+    ResponseCache,
+    StreamAborted,
+    StreamValidator,
+    codex_command,
+    final_prompt,
+    parse_jsonl_objects,
+    passage_cache_key,
+    passage_local_rows,
+    rebase_rows,
+    write_quarantine,
+)
+from ner_ontology_utils import iter_jsonl, iter_manifest_items, json_dumps, read_json, write_json, write_jsonl
+
+
+MANIFEST_PLACEHOLDER = "data/samples/sample_manifest.json"
+SHARD_NOTE = """
+
+SHARD
+- This run covers one shard of the sample: use {manifest} instead of {placeholder}.
+- SHARD MANIFEST: {manifest}
+- Annotate only the {n} passages listed there; do not emit rows for other passages.
+"""
+
+
+# Sharded open coding: the sample manifest is split into context-budgeted shards, each
+# shard gets its own prompt and `codex exec` subprocess (at most --concurrency at once),
+# lines are checked and repaired as they stream in (bad lines quarantined, a shard whose
+# rejected share passes --max-error-rate is killed early), failed shards are retried with
+# exponential backoff, and every validated shard
+# is checkpointed so a re-run only executes shards whose prompt or passages changed or never finished.
+# Validated rows are also cached per normalized passage; a shard whose passages are all
+# cached (e.g. the same passage in another work) is rebased from the cache without a run.
+
+
+@dataclass
+class Shard:
+    annotator: str
+    name: str
+    items: list[dict[str, Any]]
+    prompt: str = ""
+    template_sha256: str = ""
+    rows: list[dict[str, Any]] = field(default_factory=list)
+    attempts: int = 0
+    resumed: bool = False
+    cached: bool = False
+    error: str | None = None
+
+
+def shard_items(items: list[dict[str, Any]], max_tokens: int, max_passages: int) -> list[list[dict[str, Any]]]:
+    # Greedy in manifest order; a passage larger than the budget gets a shard of its own.
+    shards: list[list[dict[str, Any]]] = []
+    cur: list[dict[str, Any]] = []
+    cur_tokens = 0
+    for it in items:
+        n = int(it["token_end"]) - int(it["token_start"])
+        if cur and (cur_tokens + n > max_tokens or len(cur) >= max_passages):
+            shards.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(it)
+        cur_tokens += n
+    if cur:
+        shards.append(cur)
+    return shards
+
+
+def shard_prompt(base_prompt: str, manifest_path: Path, n_items: int) -> str:
+    body = base_prompt.replace(MANIFEST_PLACEHOLDER, str(manifest_path)).rstrip()
+    return final_prompt(body + SHARD_NOTE.format(manifest=manifest_path, placeholder=MANIFEST_PLACEHOLDER, n=n_items))
+
+
+def prompt_sha256(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def items_sha256(items: list[dict[str, Any]]) -> str:
+    # The prompt only names the shard manifest, so resuming also requires the same passages.
+    keys = [[it.get("passage_urn"), it.get("token_start"), it.get("token_end"), it.get("tokens_norm") or it.get("tokens")] for it in items]
+    return hashlib.sha256(json_dumps(keys).encode("utf-8")).hexdigest()
+
+
+def shard_validator(shard: Shard, max_error_rate: float, min_lines: int) -> StreamValidator:
+    # Spans must stay inside the shard's passages; surfaces are repaired from the passage tokens.
+    bounds = {it["passage_urn"]: (int(it["token_start"]), int(it["token_end"])) for it in shard.items}
+    passages = [(int(it["token_start"]), int(it["token_end"]), it.get("tokens") or []) for it in shard.items]
+
+    def surface_of(ts: int, te: int) -> str | None:
+        for lo, hi, tokens in passages:
+            if lo <= ts < te <= hi and tokens:
+                return " ".join(tokens[ts - lo : te - lo])
+        return None
+
+    first = shard.items[0]
+    defaults = {"annotator_id": shard.annotator, "work_slug": first.get("work_slug"), "work_urn": first.get("work_urn")}
+    return StreamValidator(bounds, surface_of, defaults=defaults, max_error_rate=max_error_rate, min_lines=min_lines)
+
+
+class Orchestrator:
+    def __init__(self, args: argparse.Namespace, work_dir: Path) -> None:
+        self.args = args
+        self.work_dir = work_dir
+        self.sem = asyncio.Semaphore(max(1, args.concurrency))
+        self.cache = None if args.no_cache else ResponseCache(Path(args.cache_dir), int(args.cache_max_mb * 1024 * 1024))
+
+    def paths(self, shard: Shard) -> dict[str, Path]:
+        base = self.work_dir / shard.annotator / shard.name
+        return {
+            "manifest": base.with_suffix(".manifest.json"),
+            "last_message": base.with_suffix(".last_message.txt"),
+            "quarantine": base.with_suffix(".quarantine.jsonl"),
+            "rows": base.with_suffix(".jsonl"),
+            "checkpoint": base.with_suffix(".done.json"),
+        }
+
+    def load_checkpoint(self, shard: Shard) -> bool:
+        paths = self.paths(shard)
+        if not paths["checkpoint"].exists() or not paths["rows"].exists():
+            return False
+        done = read_json(paths["checkpoint"])
+        if done.get("prompt_sha256") != prompt_sha256(shard.prompt) or done.get("items_sha256") != items_sha256(shard.items):
+            return False
+        shard.rows = list(iter_jsonl(paths["rows"]))
+        shard.resumed = True
+        return True
+
+    def passage_key(self, shard: Shard, item: dict[str, Any]) -> str | None:
+        if not item.get("tokens_norm"):
+            return None
+        return passage_cache_key(shard.template_sha256, self.args.model, self.args.effort, item["tokens_norm"])
+
+    def load_cached_passages(self, shard: Shard) -> bool:
+        if self.cache is None or self.args.refresh:
+            return False
+        rows: list[dict[str, Any]] = []
+        for item in shard.items:
+            key = self.passage_key(shard, item)
+            content = self.cache.get(key) if key else None
+            if content is None:
+                return False
+            rows.extend(rebase_rows(parse_jsonl_objects(content), item))
+        shard.rows = rows
+        shard.cached = True
+        return True
+
+    def store_cached_passages(self, shard: Shard) -> None:
+        if self.cache is None:
+            return
+        # One batch per shard: the cache size is updated once and eviction runs at most once.
+        by_passage: dict[Any, list[dict[str, Any]]] = defaultdict(list)
+        for r in shard.rows:
+            by_passage[r["passage_urn"]].append(r)
+        contents: dict[str, str] = {}
+        for item in shard.items:
+            key = self.passage_key(shard, item)
+            if key:
+                local = passage_local_rows(by_passage.get(item["passage_urn"], []), item)
+                contents[key] = "".join(json_dumps(r) + "\n" for r in local)
+        self.cache.put_many(contents)
+
+    def checkpoint(self, shard: Shard) -> None:
+        paths = self.paths(shard)
+        write_jsonl(paths["rows"], shard.rows)
+        write_json(paths["checkpoint"], {"prompt_sha256": prompt_sha256(shard.prompt), "items_sha256": items_sha256(shard.items), "rows": len(shard.rows), "attempts": shard.attempts})
+
+    def new_validator(self, shard: Shard) -> StreamValidator:
+        return shard_validator(shard, self.args.max_error_rate, self.args.min_lines)
+
+    async def exec_codex(self, shard: Shard) -> str:
+        # JSON-looking stdout lines are checked as they arrive; the final message is checked in accept().
+        paths = self.paths(shard)
+        paths["last_message"].unlink(missing_ok=True)
+        cmd = codex_command(paths["last_message"], self.args.cd, self.args.effort, self.args.model, self.args.codex_bin)
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        assert proc.stdin is not None and proc.stdout is not None and proc.stderr is not None
+        watch = self.new_validator(shard)
+
+        async def watch_stdout() -> None:
+            proc.stdin.write(shard.prompt.encode("utf-8"))
+            await proc.stdin.drain()
+            proc.stdin.close()
+            async for raw in proc.stdout:
+                line = raw.decode("utf-8", errors="replace")
+                if line.lstrip().startswith("{"):
+                    watch.feed(line)
+
+        try:
+            _, err = await asyncio.wait_for(asyncio.gather(watch_stdout(), proc.stderr.read()), self.args.timeout or None)
+            await proc.wait()
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise RuntimeError(f"timed out after {self.args.timeout}s")
+        except StreamAborted as e:
+            proc.kill()
+            await proc.wait()
+            write_quarantine(paths["quarantine"], watch)
+            raise RuntimeError(f"aborted early: {e}")
+        if proc.returncode != 0:
+            tail = err.decode("utf-8", errors="replace").strip().splitlines()[-1:] or [""]
+            raise RuntimeError(f"codex exited {proc.returncode}: {tail[0]}")
+        if not paths["last_message"].exists():
+            raise RuntimeError("codex wrote no final message")
+        return paths["last_message"].read_text(encoding="utf-8")
+
+    def accept(self, shard: Shard, content: str) -> list[dict[str, Any]]:
+        validator = self.new_validator(shard)
+        try:
+            for line in content.splitlines():
+                validator.feed(line)
+            validator.finish()
+        finally:
+            write_quarantine(self.paths(shard)["quarantine"], validator)
+        return [m.to_dict() for m in validator.rows]
+
+    async def run_shard(self, shard: Shard) -> Shard:
+        if self.load_checkpoint(shard):
+            return shard
+        if self.load_cached_passages(shard):
+            self.checkpoint(shard)
+            return shard
+        paths = self.paths(shard)
+        for attempt in range(self.args.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.args.backoff * 2 ** (attempt - 1))
+            shard.attempts = attempt + 1
+            async with self.sem:
+                try:
+                    shard.rows = self.accept(shard, await self.exec_codex(shard))
+                except (RuntimeError, StreamAborted) as e:
+                    shard.error = str(e)
+                    continue
+            shard.error = None
+            self.checkpoint(shard)
+            self.store_cached_passages(shard)
+            paths["last_message"].unlink(missing_ok=True)
+            return shard
+        return shard
+
+    async def run(self, shards: list[Shard]) -> list[Shard]:
+        return list(await asyncio.gather(*(self.run_shard(s) for s in shards)))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Sharded, concurrent Codex open coding (A/B) over a sample manifest with retries and resume.")
+    ap.add_argument("--manifest", required=True, help="Sample manifest (compact manifests are hydrated per shard).")
+    ap.add_argument("--token-index-dir", help="Resolve compact-manifest token indexes as {workSlug}.json here.")
+    ap.add_argument("--annotators", nargs="+", default=["A", "B"], help="Annotators; prompts default to prompts/agents/opencoder_{X}.md.")
+    ap.add_argument("--prompt", nargs="*", default=[], help="ANNOTATOR=PATH prompt overrides.")
+    ap.add_argument("--out-dir", default="data/annotations/open_coding", help="Merged outputs are written as {annotator}.jsonl here.")
+    ap.add_argument("--work-dir", help="Shard manifests, outputs and checkpoints (default: {out-dir}/shards).")
+    ap.add_argument("--shard-tokens", type=int, default=1500, help="Passage-token budget per shard (prompt context).")
+    ap.add_argument("--max-shard-passages", type=int, default=10)
+    ap.add_argument("--concurrency", type=int, default=4, help="Concurrent codex exec subprocesses.")
+    ap.add_argument("--retries", type=int, default=3, help="Retries per shard after a failed or invalid run.")
+    ap.add_argument("--backoff", type=float, default=5.0, help="Seconds before the first retry; doubles per retry.")
+    ap.add_argument("--timeout", type=float, default=1800.0, help="Seconds per codex exec run (0 = none).")
+    ap.add_argument("--cd", default=".", help="Working directory for codex exec.")
+    ap.add_argument("--model", help="Optional codex model override.")
+    ap.add_argument("--effort", choices=["low", "medium", "high"], default="medium", help="Model reasoning effort.")
+    ap.add_argument("--codex-bin", default="codex", help="codex executable.")
+    ap.add_argument("--max-error-rate", type=float, default=0.2, help="Reject (and retry) a shard once this share of its lines is bad.")
+    ap.add_argument("--min-lines", type=int, default=20, help="Lines seen before the error rate can abort a running shard.")
+    ap.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Passage-level response cache directory.")
+    ap.add_argument("--cache-max-mb", type=float, default=512.0, help="Evict least recently used cache entries beyond this size.")
+    ap.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache.")
+    ap.add_argument("--refresh", action="store_true", help="Ignore cached passages and re-run codex (cache entries are overwritten).")
+    args = ap.parse_args()
+
+    out_dir = Path(args.out_dir)
+    work_dir = Path(args.work_dir) if args.work_dir else out_dir / "shards"
+    prompts = {a: Path(f"prompts/agents/opencoder_{a}.md") for a in args.annotators}
+    for raw in args.prompt:
+        annotator, sep, path = raw.partition("=")
+        if not sep or annotator not in prompts:
+            raise SystemExit(f"--prompt expects ANNOTATOR=PATH for one of {args.annotators}: {raw}")
+        prompts[annotator] = Path(path)
+
+    manifest = read_json(Path(args.manifest))
+    token_index_dir = Path(args.token_index_dir) if args.token_index_dir else None
+    items = list(iter_manifest_items(manifest, token_index_dir))
+    if not items:
+        raise SystemExit(f"No items in {args.manifest}.")
+    groups = shard_items(items, args.shard_tokens, args.max_shard_passages)
+
+    orchestrator = Orchestrator(args, work_dir)
+    header = {k: v for k, v in manifest.items() if k not in {"manifest_format", "token_indexes", "items"}}
+    shards: list[Shard] = []
+    for annotator, prompt_path in prompts.items():
+        base_prompt = prompt_path.read_text(encoding="utf-8")
+        for i, group in enumerate(groups):
+            shard = Shard(annotator=annotator, name=f"shard_{i:04d}", items=group, template_sha256=prompt_sha256(base_prompt))
+            shard_manifest = orchestrator.paths(shard)["manifest"]
+            write_json(shard_manifest, {**header, "items": group})
+            shard.prompt = shard_prompt(base_prompt, shard_manifest, len(group))
+            shards.append(shard)
+
+    shards = asyncio.run(orchestrator.run(shards))
+
+    failed = [s for s in shards if s.error is not None]
+    for annotator in prompts:
+        mine = [s for s in shards if s.annotator == annotator]
+        if any(s.error is not None for s in mine):
+            continue
+        rows = [r for s in mine for r in s.rows]
+        rows.sort(key=lambda r: (str(r.get("passage_urn", "")), int(r["token_start"]), int(r["token_end"]), str(r.get("provisional_type", ""))))
+        write_jsonl(out_dir / f"{annotator}.jsonl", rows)
+    if failed:
+        lines = [f"{s.annotator}/{s.name} after {s.attempts} attempts: {s.error}" for s in failed]
+        raise SystemExit("Shards failed (validated shards are checkpointed; re-run to resume):\n- " + "\n- ".join(lines))
+    n_resumed = sum(1 for s in shards if s.resumed)
+    n_cached = sum(1 for s in shards if s.cached)
+    print(
+        f"OK ({len(groups)} shards x {len(prompts)} annotators; "
+        f"{len(shards) - n_resumed - n_cached} run, {n_resumed} resumed, {n_cached} from cache)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from ner_ontology_utils import iter_jsonl, iter_linked, load_link_overlay, write_jsonl
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Materialize a full linked JSONL from base mentions + a link overlay.")
+    ap.add_argument("--base", required=True, help="Base mention JSONL (e.g., data/annotations/adjudicated/gold_v0.jsonl).")
+    ap.add_argument("--overlay", required=True, help="Overlay JSONL written by link_mentions.py --format overlay.")
+    ap.add_argument("--out", required=True, help="Full linked JSONL output (same layout as link_mentions.py --format full).")
+    args = ap.parse_args()
+
+    overlay = load_link_overlay(Path(args.overlay))
+    linked = list(iter_linked(iter_jsonl(Path(args.base)), overlay))
+    linked.sort(key=lambda r: (r["work_slug"], r["passage_urn"], r["token_start"], r["token_end"]))
+    write_jsonl(Path(args.out), linked)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Iterator
+
+from bootstrap_entities_from_gold import ENTITY_FIELDS, TYPE_TO_FILE, read_merges, write_merges
+from ner_ontology_utils import NESTED_ROW_KEYS, iter_jsonl, normalize_greek, write_jsonl
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed to score candidate pairs
+    np = None
+
+
+# Near-duplicate entities (inflected forms, head noun vs. full name) within one mvo_type.
+# Blocking: every label token yields a prefix key ("p:" + first PREFIX_CHARS chars) and a stem
+# key ("s:" + token without its inflectional ending); only entities sharing a key are compared.
+# A block larger than --max-block is split into overlapping windows in label order.
+# Scoring: per block, a dense entity x char-bigram matrix gives all pairwise intersections in
+# one product (bigram Dice). A pair sharing a stem key where one label is a single token is
+# also proposed (shared_stem: inflections, and a head noun vs. the full name as in
+# στάχυς vs. νάρδου στάχυς).
+PREFIX_CHARS = 4
+MIN_STEM_CHARS = 3
+GREEK_ENDINGS = tuple(
+    sorted(
+        ["ος", "ου", "ον", "οι", "ων", "οις", "ους", "α", "ας", "αι", "αις", "αν", "η", "ης", "ην", "ῃ", "ες", "εσι", "ι", "ς", "ν"],
+        key=lambda e: (-len(e), e),
+    )
+)
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise SystemExit("Entity dedup scoring needs the 'numpy' package.")
+    return np
+
+
+def stem(token: str) -> str:
+    for ending in GREEK_ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= MIN_STEM_CHARS:
+            return token[: -len(ending)]
+    return token
+
+
+def block_keys(norm: str) -> set[str]:
+    keys: set[str] = set()
+    for tok in norm.split():
+        if len(tok) >= MIN_STEM_CHARS:
+            keys.add("p:" + tok[:PREFIX_CHARS])
+            keys.add("s:" + stem(tok))
+    return keys
+
+
+def bigrams(norm: str) -> set[str]:
+    padded = f"<{norm}>"
+    return {padded[i : i + 2] for i in range(len(padded) - 1)}
+
+
+def load_entities(entities_dir: Path) -> list[dict[str, str]]:
+    rows: list[dict[str, str]] = []
+    for fname in sorted(set(TYPE_TO_FILE.values())):
+        path = entities_dir / fname
+        if not path.exists():
+            continue
+        with path.open("r", encoding="utf-8") as f:
+            for r in csv.DictReader(f, delimiter="\t"):
+                if (r.get("entity_id") or "").strip():
+                    r["preferred_label_norm"] = r.get("preferred_label_norm") or normalize_greek(r.get("preferred_label") or "")
+                    rows.append(r)
+    return rows
+
+
+def count_mentions(paths: list[Path]) -> Counter[str]:
+    counts: Counter[str] = Counter()
+    for path in paths:
+        for row in iter_jsonl(path):
+            if row.get("entity_id"):
+                counts[str(row["entity_id"])] += 1
+    return counts
+
+
+def block_windows(members: list[int], max_block: int) -> Iterator[list[int]]:
+    if len(members) <= max_block:
+        yield members
+        return
+    step = max(1, max_block // 2)
+    for lo in range(0, len(members) - step, step):
+        yield members[lo : lo + max_block]
+
+
+def score_block(grams: list[set[str]], members: list[int]) -> Iterator[tuple[int, int, float]]:
+    # Dice over char bigrams for every pair in the block, from one matrix product.
+    npm = _require_numpy()
+    vocab = {g: j for j, g in enumerate(sorted(set().union(*(grams[i] for i in members))))}
+    m = npm.zeros((len(members), len(vocab)), dtype=npm.int32)
+    for r, i in enumerate(members):
+        m[r, [vocab[g] for g in grams[i]]] = 1
+    inter = m @ m.T
+    sizes = inter.diagonal()
+    dice = 2.0 * inter / (sizes[:, None] + sizes[None, :])
+    rows, cols = npm.triu_indices(len(members), k=1)
+    for r, c, s in zip(rows.tolist(), cols.tolist(), dice[rows, cols].tolist()):
+        yield members[r], members[c], s
+
+
+def propose(entities: list[dict[str, str]], mentions: Counter[str], threshold: float, max_block: int) -> tuple[list[dict[str, Any]], int]:
+    norms = [e["preferred_label_norm"] for e in entities]
+    grams = [bigrams(n) for n in norms]
+    single = [len(n.split()) == 1 for n in norms]
+
+    blocks: dict[tuple[str, str], list[int]] = defaultdict(list)
+    for i, e in enumerate(entities):
+        for key in block_keys(norms[i]):
+            blocks[(e["mvo_type"], key)].append(i)
+
+    best: dict[tuple[int, int], tuple[float, set[str]]] = {}
+    n_compared = 0
+    for (_, key), members in sorted(blocks.items()):
+        if len(members) < 2:
+            continue
+        members = sorted(members, key=lambda i: (norms[i], entities[i]["entity_id"]))
+        for window in block_windows(members, max_block):
+            for i, j, s in score_block(grams, window):
+                n_compared += 1
+                reasons: set[str] = set()
+                if s >= threshold:
+                    reasons.add("bigram_dice")
+                if key.startswith("s:") and (single[i] or single[j]) and norms[i] != norms[j]:
+                    reasons.add("shared_stem")
+                if reasons:
+                    pair = (min(i, j), max(i, j))
+                    prev = best.get(pair)
+                    best[pair] = (s, reasons | (prev[1] if prev else set()))
+
+    def keep_rank(i: int) -> tuple[int, int, int, str]:
+        return (-mentions[entities[i]["entity_id"]], len(norms[i].split()), len(norms[i]), entities[i]["entity_id"])
+
+    out: list[dict[str, Any]] = []
+    for (i, j), (s, reasons) in best.items():
+        keep, merge = sorted((i, j), key=keep_rank)
+        out.append(
+            {
+                "mvo_type": entities[keep]["mvo_type"],
+                "keep_entity_id": entities[keep]["entity_id"],
+                "keep_label": entities[keep]["preferred_label"],
+                "keep_mentions": mentions[entities[keep]["entity_id"]],
+                "merge_entity_id": entities[merge]["entity_id"],
+                "merge_label": entities[merge]["preferred_label"],
+                "merge_mentions": mentions[entities[merge]["entity_id"]],
+                "score": round(s, 4),
+                "reasons": sorted(reasons),
+                "decision": "",
+            }
+        )
+    out.sort(key=lambda r: (-r["score"], r["mvo_type"], r["keep_entity_id"], r["merge_entity_id"]))
+    return out, n_compared
+
+
+def merge_map(proposals: list[dict[str, Any]], accept_all: bool) -> dict[str, str]:
+    # Accepted pairs are edges; each connected group merges into its best-ranked member
+    # (same order as propose), so chains and overlapping pairs resolve consistently.
+    parent: dict[str, str] = {}
+    rank: dict[str, tuple[int, int, int, str]] = {}
+
+    def find(x: str) -> str:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for p in proposals:
+        decision = str(p.get("decision") or "")
+        if not (decision == "merge" or (accept_all and decision != "reject")):
+            continue
+        for side in ("keep", "merge"):
+            eid, norm = str(p[f"{side}_entity_id"]), normalize_greek(str(p[f"{side}_label"]))
+            parent.setdefault(eid, eid)
+            rank[eid] = (-int(p.get(f"{side}_mentions") or 0), len(norm.split()), len(norm), eid)
+        a, b = find(str(p["keep_entity_id"])), find(str(p["merge_entity_id"]))
+        if a != b:
+            a, b = sorted((a, b), key=rank.__getitem__)
+            parent[b] = a
+    return {eid: find(eid) for eid in parent if find(eid) != eid}
+
+
+def remap_row(row: dict[str, Any], mapping: dict[str, str]) -> bool:
+    changed = False
+    for r in (row, *(row[k] for k in NESTED_ROW_KEYS if isinstance(row.get(k), dict))):
+        eid = r.get("entity_id")
+        if eid in mapping:
+            r["entity_id"] = mapping[eid]
+            changed = True
+    return changed
+
+
+def rewrite_jsonl(path: Path, mapping: dict[str, str]) -> int:
+    # One streaming pass into a sibling temp file (same suffix, so compression is kept).
+    changed = 0
+
+    def rows() -> Iterator[dict[str, Any]]:
+        nonlocal changed
+        for row in iter_jsonl(path):
+            changed += remap_row(row, mapping)
+            yield row
+
+    tmp = path.with_name("." + path.name)
+    write_jsonl(tmp, rows())
+    os.replace(tmp, path)
+    return changed
+
+
+def rewrite_tsv(path: Path, fieldnames: list[str], rows: list[dict[str, Any]]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=fieldnames, delimiter="\t", extrasaction="ignore")
+        w.writeheader()
+        for r in rows:
+            w.writerow(r)
+
+
+def apply_to_registries(entities_dir: Path, lexicons_dir: Path | None, mapping: dict[str, str]) -> tuple[int, int]:
+    # Merged entities leave the registries; their lexicon variants move to the kept entity.
+    # Each merge is recorded in the merges ledger so later bootstraps/lexicon builds honor it.
+    dropped = moved = 0
+    ledger = {m["entity_id"]: m for m in read_merges(entities_dir)}
+    for m in ledger.values():
+        m["merged_into"] = mapping.get(m["merged_into"], m["merged_into"])
+    for fname in sorted(set(TYPE_TO_FILE.values())):
+        path = entities_dir / fname
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f, delimiter="\t"))
+            kept = [r for r in rows if r.get("entity_id") not in mapping]
+            for r in rows:
+                if r.get("entity_id") in mapping:
+                    ledger[r["entity_id"]] = {
+                        "entity_id": r["entity_id"],
+                        "merged_into": mapping[r["entity_id"]],
+                        "mvo_type": r.get("mvo_type") or "",
+                        "preferred_label": r.get("preferred_label") or "",
+                        "preferred_label_norm": r.get("preferred_label_norm") or normalize_greek(r.get("preferred_label") or ""),
+                    }
+            dropped += len(rows) - len(kept)
+            rewrite_tsv(path, ENTITY_FIELDS, kept)
+        lex_path = lexicons_dir / fname if lexicons_dir else None
+        if lex_path and lex_path.exists():
+            with lex_path.open("r", encoding="utf-8") as f:
+                reader = csv.DictReader(f, delimiter="\t")
+                fieldnames = list(reader.fieldnames or [])
+                lex_rows = list(reader)
+            seen: set[tuple[str, str]] = set()
+            out: list[dict[str, Any]] = []
+            for r in lex_rows:
+                if r.get("entity_id") in mapping:
+                    r["entity_id"] = mapping[r["entity_id"]]
+                    moved += 1
+                key = (r.get("entity_id") or "", r.get("variant_norm") or "")
+                if key not in seen:
+                    seen.add(key)
+                    out.append(r)
+            out.sort(key=lambda r: (r.get("entity_id") or "", r.get("variant_norm") or "", r.get("variant") or ""))
+            rewrite_tsv(lex_path, fieldnames, out)
+    write_merges(entities_dir, list(ledger.values()))
+    return dropped, moved
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Propose and apply merges of near-duplicate entities (blocking + bigram similarity).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ap_prop = sub.add_parser("propose", help="Write merge proposals JSONL for curators (fill decision: merge|reject).")
+    ap_prop.add_argument("--entities", required=True, help="data/entities")
+    ap_prop.add_argument("--linked", nargs="*", default=[], help="Linked JSONL used to count mentions (the most used entity is kept).")
+    ap_prop.add_argument("--out", required=True, help="e.g. data/annotations/entity_merge_proposals.jsonl")
+    ap_prop.add_argument("--threshold", type=float, default=0.6, help="Minimum bigram Dice for a proposal.")
+    ap_prop.add_argument("--max-block", type=int, default=200)
+
+    ap_apply = sub.add_parser("apply", help="Rewrite entity_ids in linked files and registries from decided proposals.")
+    ap_apply.add_argument("--proposals", required=True)
+    ap_apply.add_argument("--accept-all", action="store_true", help="Apply every proposal not marked decision=reject.")
+    ap_apply.add_argument("--entities", required=True)
+    ap_apply.add_argument("--lexicons", help="data/lexicons (variants of merged entities move to the kept entity)")
+    ap_apply.add_argument("--linked", nargs="*", default=[], help="JSONL files rewritten in place (one streaming pass each).")
+
+    args = ap.parse_args()
+
+    if args.cmd == "propose":
+        if args.max_block < 2:
+            raise SystemExit("--max-block must be >= 2")
+        entities = load_entities(Path(args.entities))
+        proposals, n_compared = propose(entities, count_mentions([Path(p) for p in args.linked]), args.threshold, args.max_block)
+        write_jsonl(Path(args.out), proposals)
+        print(f"OK: {len(entities)} entities, {n_compared} pairs scored, {len(proposals)} proposals")
+        return
+
+    mapping = merge_map(list(iter_jsonl(Path(args.proposals))), args.accept_all)
+    if not mapping:
+        print("OK: no accepted merges")
+        return
+    rewritten = {p: rewrite_jsonl(Path(p), mapping) for p in args.linked}
+    dropped, moved = apply_to_registries(Path(args.entities), Path(args.lexicons) if args.lexicons else None, mapping)
+    print(f"OK: {len(mapping)} merges, {sum(rewritten.values())} rows relinked, {dropped} entities dropped, {moved} lexicon variants moved")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ import argparse
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import write_jsonl, iter_jsonl
+from ner_ontology_utils import EVIDENCE_REF_KEY, Mention, iter_jsonl, write_jsonl
 
 
 FIXED_TS = "2000-01-01T00:00:00Z"
@@ -24,28 +24,28 @@ def main() -> None:
 
     gold: list[dict[str, Any]] = []
     for row in iter_jsonl(Path(args.inp)):
-        a = row.get("a")
-        b = row.get("b")
+        a = Mention.from_dict(row["a"]) if row.get("a") else None
+        b = Mention.from_dict(row["b"]) if row.get("b") else None
         base = a or b
         if base is None:
             continue
 
         chosen = base
         if a is not None and b is not None:
-            if str(a.get("provisional_type")) == str(b.get("provisional_type")):
+            if str(a.provisional_type) == str(b.provisional_type):
                 chosen = a
             else:
-                ca = certainty_rank(str(a.get("certainty")))
-                cb = certainty_rank(str(b.get("certainty")))
+                ca = certainty_rank(str(a.certainty))
+                cb = certainty_rank(str(b.certainty))
                 chosen = a if ca >= cb else b
 
         out = {
-            "mention_id": chosen.get("mention_id"),
+            "mention_id": chosen.mention_id,
             "work_urn": chosen["work_urn"],
             "passage_urn": chosen["passage_urn"],
             "work_slug": chosen["work_slug"],
-            "token_start": int(chosen["token_start"]),
-            "token_end": int(chosen["token_end"]),
+            "token_start": chosen.token_start,
+            "token_end": chosen.token_end,
             "surface": chosen["surface"],
             "surface_norm": chosen["surface_norm"],
             "provisional_type": chosen["provisional_type"],
@@ -53,8 +53,11 @@ def main() -> None:
             "annotator_id": args.annotator_id,
             "timestamp": FIXED_TS,
             "notes": "AUTO_ADJUDICATED_MVP",
-            "evidence_window": row.get("evidence_window"),
         }
+        if EVIDENCE_REF_KEY in row:
+            out[EVIDENCE_REF_KEY] = row[EVIDENCE_REF_KEY]
+        else:
+            out["evidence_window"] = row.get("evidence_window")
         gold.append(out)
 
     gold.sort(key=lambda r: (r["work_slug"], r["passage_urn"], r["token_start"], r["token_end"]))
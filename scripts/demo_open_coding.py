@@ -3,11 +3,20 @@ from __future__ import annotations
 
 import argparse
 import hashlib
-import json
+import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from ner_ontology_utils import PROVISIONAL_TYPES, normalize_greek, write_jsonl
+from ner_ontology_utils import (
+    EVIDENCE_REF_KEY,
+    PROVISIONAL_TYPES,
+    evidence_window_ref,
+    iter_manifest_items,
+    normalize_greek,
+    read_json,
+    write_jsonl,
+)
 
 
 FIXED_TS = "2000-01-01T00:00:00Z"
@@ -18,71 +27,117 @@ def mention_id(work_slug: str, passage_urn: str, token_start: int, token_end: in
     return "m_" + hashlib.sha1(raw).hexdigest()[:12]
 
 
-def classify_token(tok: str, tok_norm: str, annotator_id: str) -> tuple[str, str, str]:
-    # Returns (provisional_type, certainty, notes).
-    tn = tok_norm or normalize_greek(tok)
+# Stem families; substring membership in every family is answered by one compiled regex
+# (an optional lookahead group per family, matched once at position 0).
+STEM_FAMILIES: dict[str, tuple[str, ...]] = {
+    "measure": ("δραχμ", "κοτυλ", "λιτρ", "μετρ", "ουγκ", "σταθμ"),
+    "instrument": ("αγγει", "σκευ", "κεραμ", "χαλκ", "υαλ", "κρυσταλλ", "κονδυλ"),
+    "action": ("θερμαιν", "ψυχει", "ξηραιν", "υγραιν", "καθαρ", "καθαιρ", "εμετ", "πταρμ", "βηχ", "τριβ", "μιγν", "ζε", "εψη", "κοπ", "λει", "κονι"),
+    "quality": ("θερμ", "ψυχρ", "ξηρ", "υγρ", "γλυκ", "πικρ", "αλμυρ", "οσμη", "χρωμ"),
+    "b_quality": ("θερμ", "ψυχρ", "ξηρ", "υγρ"),
+    "material": ("φαρμακ", "υδωρ", "πυρεθρ", "καστορι", "υοσκυαμ", "μανδραγορ", "τροφ", "πυρ", "μελι", "οινος", "ελαι"),
+    # Tokens picked as mentions in a passage.
+    "trigger": ("φαρμακ", "θερμ", "ψυχρ", "ξηρ", "υγρ", "υδωρ", "πυρεθρ", "καστορι", "υοσκυαμ", "μανδραγορ", "δραχμ", "κοτυλ", "μετρ"),
+}
+STEM_RE = re.compile("".join(f"(?=.*?(?P<{name}>{'|'.join(map(re.escape, stems))}))?" for name, stems in STEM_FAMILIES.items()))
+
+
+@lru_cache(maxsize=1 << 16)
+def stem_families(tn: str) -> frozenset[str]:
+    m = STEM_RE.match(tn)
+    return frozenset(k for k, v in m.groupdict().items() if v is not None) if m else frozenset()
+
+
+def annotator_profile(annotator_id: str) -> str:
+    # Only B behaves differently (see classify_type).
+    return "B" if annotator_id.upper().startswith("B") else "A"
+
+
+@lru_cache(maxsize=1 << 16)
+def classify_type(tn: str, profile: str) -> tuple[str, str, str]:
+    # Returns (provisional_type, certainty, notes) for a normalized type.
+    families = stem_families(tn)
 
     # Quick measure detection.
-    if any(ch.isdigit() for ch in tok):
-        return ("MEASURE", "med", "")
-    if any(s in tn for s in ["δραχμ", "κοτυλ", "λιτρ", "μετρ", "ουγκ", "σταθμ"]):
+    if "measure" in families:
         return ("MEASURE", "high", "")
 
     # Instruments/containers.
-    if any(s in tn for s in ["αγγει", "σκευ", "κεραμ", "χαλκ", "υαλ", "κρυσταλλ", "κονδυλ"]):
+    if "instrument" in families:
         return ("INSTRUMENT", "med", "")
 
     # Actions/processes: prefer verb/infinitive stems; annotator differences for ambiguity.
-    action_stems = ["θερμαιν", "ψυχει", "ξηραιν", "υγραιν", "καθαρ", "καθαιρ", "εμετ", "πταρμ", "βηχ", "τριβ", "μιγν", "ζε", "εψη", "κοπ", "λει", "κονι"]
     looks_verbal = tn.endswith("ειν") or tn.endswith("ει") or tn.endswith("εσθαι") or tn.endswith("ησαι")
-    if any(s in tn for s in action_stems) and looks_verbal:
+    if "action" in families and looks_verbal:
         return ("ACTION", "high", "")
 
     # Qualities/properties.
-    quality_stems = ["θερμ", "ψυχρ", "ξηρ", "υγρ", "γλυκ", "πικρ", "αλμυρ", "οσμη", "χρωμ"]
     looks_property_noun = tn.endswith("της") or "τητα" in tn
-    if any(s in tn for s in quality_stems) and (looks_property_noun or not looks_verbal):
+    if "quality" in families and (looks_property_noun or not looks_verbal):
         return ("QUALITY", "high", "")
 
     # Annotator B intentionally over-tags θερμ/ψυχρ as QUALITY even when verbal-looking.
-    if annotator_id.upper().startswith("B") and any(s in tn for s in ["θερμ", "ψυχρ", "ξηρ", "υγρ"]):
+    if profile == "B" and "b_quality" in families:
         return ("QUALITY", "med", "HEURISTIC_B_PREFERS_QUALITY")
 
     # Materials: Galen SMT has many substance mentions.
-    material_stems = [
-        "φαρμακ",
-        "υδωρ",
-        "πυρεθρ",
-        "καστορι",
-        "υοσκυαμ",
-        "μανδραγορ",
-        "τροφ",
-        "πυρ",
-        "μελι",
-        "οινος",
-        "ελαι",
-    ]
-    if any(s in tn for s in material_stems):
+    if "material" in families:
         return ("MATERIAL", "high", "")
 
     # Fallback: keep empirical and conservative.
     return ("MATERIAL", "low", "HEURISTIC_DEFAULT_UNCERTAIN")
 
 
+def classify_token(tok: str, tok_norm: str, annotator_id: str) -> tuple[str, str, str]:
+    # Returns (provisional_type, certainty, notes).
+    if any(ch.isdigit() for ch in tok):
+        return ("MEASURE", "med", "")
+    return classify_type(tok_norm or normalize_greek(tok), annotator_profile(annotator_id))
+
+
+def token_index_items(path: Path) -> Iterator[dict[str, Any]]:
+    # Every passage of a token index in manifest item shape (whole-work baseline coding).
+    idx = read_json(path)
+    tokens = idx.get("tokens") or []
+    tokens_norm = idx.get("tokens_norm") or []
+    for p in idx.get("passages") or []:
+        ts, te = int(p["token_start"]), int(p["token_end"])
+        yield {
+            "work_slug": idx["work_slug"],
+            "work_urn": idx["work_urn"],
+            "passage_urn": p["passage_urn"],
+            "token_start": ts,
+            "token_end": te,
+            "tokens": tokens[ts:te],
+            "tokens_norm": tokens_norm[ts:te],
+        }
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Deterministic demo open-coding generator (MVP smoke only).")
-    ap.add_argument("--manifest", required=True, help="data/samples/sample_manifest.json")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--manifest", help="data/samples/sample_manifest.json")
+    src.add_argument("--token-index", nargs="+", help="Code every passage of these token indexes instead of a sample manifest.")
     ap.add_argument("--annotator-id", required=True, help="Annotator id (e.g., A or B).")
     ap.add_argument("--out", required=True, help="Output JSONL path.")
     ap.add_argument("--seed", type=int, default=0, help="Unused (kept for CLI compatibility).")
-    ap.add_argument("--max-mentions-per-passage", type=int, default=3)
+    ap.add_argument("--max-mentions-per-passage", type=int, default=3, help="0 = no cap.")
+    ap.add_argument(
+        "--compact-evidence",
+        action="store_true",
+        help="Write evidence_window_ref [lo, hi) token offsets instead of evidence_window token lists.",
+    )
     args = ap.parse_args()
 
-    manifest = json.loads(Path(args.manifest).read_text(encoding="utf-8"))
+    if args.manifest:
+        items: Iterable[dict[str, Any]] = iter_manifest_items(read_json(Path(args.manifest)))
+    else:
+        items = (it for p in args.token_index for it in token_index_items(Path(p)))
+    max_mentions = int(args.max_mentions_per_passage) or None
 
     rows: list[dict[str, Any]] = []
 
-    for item in manifest.get("items", []):
+    for item in items:
         tokens = item.get("tokens") or []
         tokens_norm = item.get("tokens_norm") or []
         if not tokens:
@@ -90,13 +145,11 @@ def main() -> None:
 
         chosen_idxs: list[int] = []
         for rel_idx, tok_norm in enumerate(tokens_norm[: len(tokens)]):
-            if len(chosen_idxs) >= int(args.max_mentions_per_passage):
+            if max_mentions is not None and len(chosen_idxs) >= max_mentions:
                 break
             tn = tok_norm or normalize_greek(tokens[rel_idx])
             # Pick "interesting" tokens by heuristic triggers, plus allow some qualities/actions early.
-            if any(s in tn for s in ["φαρμακ", "θερμ", "ψυχρ", "ξηρ", "υγρ", "υδωρ", "πυρεθρ", "καστορι", "υοσκυαμ", "μανδραγορ"]):
-                chosen_idxs.append(rel_idx)
-            elif any(s in tn for s in ["δραχμ", "κοτυλ", "μετρ"]):
+            if "trigger" in stem_families(tn):
                 chosen_idxs.append(rel_idx)
 
         if not chosen_idxs:
@@ -113,25 +166,29 @@ def main() -> None:
             token_start = int(item["token_start"]) + rel_idx
             token_end = token_start + 1
             mid = mention_id(item["work_slug"], item["passage_urn"], token_start, token_end, args.annotator_id)
-
-            rows.append(
-                {
-                    "mention_id": mid,
-                    "work_urn": item["work_urn"],
-                    "passage_urn": item["passage_urn"],
-                    "work_slug": item["work_slug"],
-                    "token_start": token_start,
-                    "token_end": token_end,
-                    "surface": tok,
-                    "surface_norm": tok_norm,
-                    "provisional_type": ptype,
-                    "certainty": certainty,
-                    "annotator_id": args.annotator_id,
-                    "timestamp": FIXED_TS,
-                    "evidence_window": tokens[max(0, rel_idx - 5) : min(len(tokens), rel_idx + 6)],
-                    "notes": notes,
-                }
-            )
+            ev_lo = max(0, rel_idx - 5)
+            ev_hi = min(len(tokens), rel_idx + 6)
+
+            row: dict[str, Any] = {
+                "mention_id": mid,
+                "work_urn": item["work_urn"],
+                "passage_urn": item["passage_urn"],
+                "work_slug": item["work_slug"],
+                "token_start": token_start,
+                "token_end": token_end,
+                "surface": tok,
+                "surface_norm": tok_norm,
+                "provisional_type": ptype,
+                "certainty": certainty,
+                "annotator_id": args.annotator_id,
+                "timestamp": FIXED_TS,
+                "notes": notes,
+            }
+            if args.compact_evidence:
+                row[EVIDENCE_REF_KEY] = evidence_window_ref(int(item["token_start"]) + ev_lo, int(item["token_start"]) + ev_hi)
+            else:
+                row["evidence_window"] = tokens[ev_lo:ev_hi]
+            rows.append(row)
 
     rows.sort(key=lambda r: (r["work_slug"], r["passage_urn"], r["token_start"], r["token_end"], r["annotator_id"]))
     write_jsonl(Path(args.out), rows)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from bootstrap_entities_from_gold import TYPE_TO_FILE
+from ner_ontology_utils import iter_jsonl, json_dumps, normalize_greek, read_json, sha256_file, tokenize, write_json, write_jsonl
+
+
+# Lexicon variant expansion driven by a rule table (data/ontology/variant_rules.tsv):
+# - paradigm: the last token ends in one of the endings -> stem + every other ending; `slots`
+#   names the paradigm slot (gender.case.number) of each ending. Only the paradigms with the
+#   longest matching ending apply (σπέρμα is -μα, not -α).
+# - article: a (paradigm) form in one of the listed `slots` -> article + phrase per `replace`
+# - elision: a form in one of the listed `slots` ending in `match` -> that ending replaced by
+#   `replace` (usually dropped)
+# A slot may be qualified with the paradigm that produced it ("decl2_neut:n.nom.pl"); forms no
+# paradigm analyses get neither articles nor elision. Observed gold surfaces of linked entities
+# are added too. Attested variants (lexicon, gold) always win; a generated variant that another
+# entity attests, or that two entities generate, is dropped and reported as a collision. The
+# result is compiled into the tagger's phrase index (tag_with_lexicons.py --phrase-index), keyed
+# by the sha256 of every input, so unchanged inputs reuse the compiled index.
+EXPANDER_VERSION = "variant_rules_v2"
+RULE_KINDS = ("paradigm", "article", "elision")
+LEXICON_FIELDS = ["entity_id", "preferred_label", "variant", "variant_norm", "notes"]
+
+
+@dataclass(frozen=True)
+class Rule:
+    rule_id: str
+    kind: str
+    types: frozenset[str]
+    match: tuple[str, ...]
+    replace: tuple[str, ...]
+    # paradigm: one "|"-separated slot list per ending; article/elision: the slots they apply to.
+    slots: tuple[str, ...] = ()
+
+    def applies_to(self, mvo_type: str) -> bool:
+        return not self.types or mvo_type in self.types
+
+    def covers(self, paradigm_id: str, slots: tuple[str, ...]) -> bool:
+        return any(s in self.slots or f"{paradigm_id}:{s}" in self.slots for s in slots)
+
+
+def split_list(value: str | None) -> tuple[str, ...]:
+    return tuple(normalize_greek(x.strip()) for x in (value or "").split(",") if x.strip())
+
+
+def load_rules(path: Path) -> list[Rule]:
+    rules: list[Rule] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line_no, r in enumerate(csv.DictReader(f, delimiter="\t"), start=2):
+            kind = (r.get("kind") or "").strip()
+            if kind not in RULE_KINDS:
+                raise SystemExit(f"{path}:{line_no}: unknown rule kind {kind!r} (expected one of {', '.join(RULE_KINDS)})")
+            rule_id = str(r.get("rule_id") or f"line{line_no}")
+            match = split_list(r.get("match"))
+            slots = tuple(x.strip() for x in (r.get("slots") or "").split(",") if x.strip())
+            if kind != "article" and not match:
+                raise SystemExit(f"{path}:{line_no}: rule {rule_id} has no match endings")
+            if kind != "paradigm" and not slots:
+                raise SystemExit(f"{path}:{line_no}: rule {rule_id} lists no slots")
+            if kind == "paradigm" and slots and len(slots) != len(match):
+                raise SystemExit(f"{path}:{line_no}: rule {rule_id} has {len(match)} endings but {len(slots)} slots")
+            types = frozenset(t.strip() for t in (r.get("types") or "").split(",") if t.strip())
+            rules.append(Rule(rule_id, kind, types, match, split_list(r.get("replace")), slots))
+    return rules
+
+
+class VariantExpander:
+    def __init__(self, rules: list[Rule], min_stem: int) -> None:
+        self.min_stem = min_stem
+        self.paradigms = [r for r in rules if r.kind == "paradigm"]
+        self.articles = [r for r in rules if r.kind == "article"]
+        self.elisions = [r for r in rules if r.kind == "elision"]
+        self._forms: dict[tuple[str, str], list[tuple[str, str, tuple[str, ...]]]] = {}
+
+    def paradigm_forms(self, tok: str, mvo_type: str) -> list[tuple[str, str, tuple[str, ...]]]:
+        # [(form, paradigm rule_id, slots)] for every slot of the paradigms whose longest
+        # matching ending is the longest overall (tok itself is included with its own slots).
+        key = (tok, mvo_type)
+        cached = self._forms.get(key)
+        if cached is None:
+            analyses: list[tuple[int, Rule, str]] = []
+            for rule in self.paradigms:
+                if not rule.applies_to(mvo_type):
+                    continue
+                ending = max((e for e in rule.match if tok.endswith(e) and len(tok) - len(e) >= self.min_stem), key=len, default=None)
+                if ending is not None:
+                    analyses.append((len(ending), rule, tok[: len(tok) - len(ending)]))
+            longest = max((n for n, _, _ in analyses), default=0)
+            cached = []
+            for n, rule, stem in analyses:
+                if n == longest:
+                    slots = rule.slots or ("",) * len(rule.match)
+                    cached.extend((stem + e, rule.rule_id, tuple(s for s in slot.split("|") if s)) for e, slot in zip(rule.match, slots))
+            self._forms[key] = cached
+        return cached
+
+    def expand(self, toks: tuple[str, ...], mvo_type: str) -> list[tuple[tuple[str, ...], str]]:
+        # Inflection applies to the last (head) token; earlier tokens stay as attested.
+        out: list[tuple[tuple[str, ...], str]] = []
+        for form, paradigm_id, slots in self.paradigm_forms(toks[-1], mvo_type):
+            phrase = (*toks[:-1], form)
+            if form != toks[-1]:
+                out.append((phrase, paradigm_id))
+            for rule in self.articles:
+                if rule.applies_to(mvo_type) and rule.covers(paradigm_id, slots):
+                    out.extend(((article, *phrase), rule.rule_id) for article in rule.replace)
+            for rule in self.elisions:
+                if not (rule.applies_to(mvo_type) and rule.covers(paradigm_id, slots)):
+                    continue
+                ending = max((e for e in rule.match if form.endswith(e) and len(form) - len(e) >= self.min_stem), key=len, default=None)
+                if ending is not None:
+                    for rep in rule.replace or ("",):
+                        out.append(((*toks[:-1], form[: len(form) - len(ending)] + rep), rule.rule_id))
+        return out
+
+
+def norm_tokens(text: str) -> tuple[str, ...]:
+    return tuple(normalize_greek(t) for t in tokenize(text) if t)
+
+
+def input_cache_key(lexicon_paths: list[Path], rules_path: Path, gold_path: Path | None, min_stem: int, max_ngram: int) -> str:
+    inputs = {
+        "expander_version": EXPANDER_VERSION,
+        "min_stem": min_stem,
+        "max_ngram": max_ngram,
+        "lexicons": {p.name: sha256_file(p) for p in lexicon_paths},
+        "rules": sha256_file(rules_path),
+        "gold": sha256_file(gold_path) if gold_path else None,
+    }
+    return hashlib.sha256(json_dumps(inputs).encode("utf-8")).hexdigest()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Expand lexicon variants (declension/article/elision rules + observed gold surfaces) and compile the tagger phrase index.")
+    ap.add_argument("--lexicons", required=True, help="data/lexicons (scripts/build_lexicons.py output)")
+    ap.add_argument("--rules", default="data/ontology/variant_rules.tsv")
+    ap.add_argument("--gold", help="Linked gold JSONL: observed surfaces of linked mentions become variants of their entity.")
+    ap.add_argument("--out-dir", required=True, help="Expanded lexicon TSVs (same schema; notes record the source).")
+    ap.add_argument("--phrase-index", required=True, help="Compiled phrase index JSON for tag_with_lexicons.py --phrase-index.")
+    ap.add_argument("--collisions", help="Write dropped/ambiguous variants JSONL (default: {out-dir}/collisions.jsonl).")
+    ap.add_argument("--min-stem", type=int, default=3, help="Minimum characters left after removing an ending.")
+    ap.add_argument("--max-ngram", type=int, default=5)
+    ap.add_argument("--force", action="store_true", help="Rebuild even if the phrase index matches the inputs.")
+    args = ap.parse_args()
+
+    lex_dir = Path(args.lexicons)
+    out_dir = Path(args.out_dir)
+    index_path = Path(args.phrase_index)
+    collisions_path = Path(args.collisions) if args.collisions else out_dir / "collisions.jsonl"
+    gold_path = Path(args.gold) if args.gold else None
+    file_to_type = {fname: t for t, fname in TYPE_TO_FILE.items()}
+    lexicon_paths = [p for p in sorted(lex_dir.glob("*.tsv")) if p.name in file_to_type]
+
+    key = input_cache_key(lexicon_paths, Path(args.rules), gold_path, args.min_stem, args.max_ngram)
+    if not args.force and index_path.exists() and collisions_path.exists() and read_json(index_path).get("cache_key") == key:
+        print(f"OK: cached ({key[:12]})")
+        return
+
+    expander = VariantExpander(load_rules(Path(args.rules)), args.min_stem)
+
+    # Attested variants: token tuple -> {(entity_id, mvo_type): (variant, notes)}; the lexicon wins over gold.
+    attested: dict[tuple[str, ...], dict[tuple[str, str], tuple[str, str]]] = defaultdict(dict)
+    preferred: dict[str, str] = {}
+    entity_type: dict[str, str] = {}
+    for path in lexicon_paths:
+        mvo_type = file_to_type[path.name]
+        with path.open("r", encoding="utf-8") as f:
+            for r in csv.DictReader(f, delimiter="\t"):
+                eid = (r.get("entity_id") or "").strip()
+                variant = (r.get("variant") or "").strip()
+                toks = norm_tokens(variant)
+                if not eid or not toks:
+                    continue
+                preferred.setdefault(eid, r.get("preferred_label") or variant)
+                entity_type[eid] = mvo_type
+                attested[toks].setdefault((eid, mvo_type), (variant, r.get("notes") or ""))
+    n_lexicon = sum(len(v) for v in attested.values())
+    if gold_path:
+        for row in iter_jsonl(gold_path):
+            eid = str(row.get("entity_id") or "")
+            toks = norm_tokens(str(row.get("surface") or ""))
+            if eid in entity_type and toks:
+                attested[toks].setdefault((eid, entity_type[eid]), (str(row["surface"]), "observed:gold"))
+
+    generated: dict[tuple[str, ...], dict[tuple[str, str], str]] = defaultdict(dict)
+    # Generated forms that another entity (or the same entity under another type) attests.
+    shadowed: dict[tuple[str, ...], dict[tuple[str, str], str]] = defaultdict(dict)
+    for toks, owners in attested.items():
+        for eid, mvo_type in owners:
+            for phrase, rule_id in expander.expand(toks, mvo_type):
+                if phrase not in attested:
+                    generated[phrase].setdefault((eid, mvo_type), rule_id)
+                elif (eid, mvo_type) not in attested[phrase]:
+                    shadowed[phrase].setdefault((eid, mvo_type), rule_id)
+
+    collisions: list[dict[str, Any]] = []
+    final: dict[tuple[str, ...], list[tuple[str, str, str, str]]] = {}
+    for toks, owners in attested.items():
+        final[toks] = [(eid, t, variant, notes) for (eid, t), (variant, notes) in sorted(owners.items())]
+        if len(owners) > 1:
+            types = sorted({t for _, t in owners})
+            collisions.append({"variant_norm": " ".join(toks), "kind": "attested", "entity_ids": sorted(e for e, _ in owners), "mvo_types": types, "across_types": len(types) > 1})
+    for toks, owners in generated.items():
+        if len(owners) == 1:
+            (eid, t), rule_id = next(iter(owners.items()))
+            final[toks] = [(eid, t, " ".join(toks), f"expanded:{rule_id}")]
+            continue
+        types = sorted({t for _, t in owners})
+        collisions.append(
+            {
+                "variant_norm": " ".join(toks),
+                "kind": "generated",
+                "entity_ids": sorted(e for e, _ in owners),
+                "mvo_types": types,
+                "across_types": len(types) > 1,
+                "rules": sorted(set(owners.values())),
+            }
+        )
+
+    for toks, owners in shadowed.items():
+        all_owners = set(owners) | set(attested[toks])
+        types = sorted({t for _, t in all_owners})
+        collisions.append(
+            {
+                "variant_norm": " ".join(toks),
+                "kind": "generated_vs_attested",
+                "entity_ids": sorted({e for e, _ in all_owners}),
+                "generated_entity_ids": sorted({e for e, _ in owners}),
+                "mvo_types": types,
+                "across_types": len(types) > 1,
+                "rules": sorted(set(owners.values())),
+            }
+        )
+
+    by_file: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    phrases: dict[str, list[list[str]]] = {}
+    for toks, entries in final.items():
+        for eid, mvo_type, variant, notes in entries:
+            by_file[TYPE_TO_FILE[mvo_type]].append(
+                {"entity_id": eid, "preferred_label": preferred[eid], "variant": variant, "variant_norm": " ".join(toks), "notes": notes}
+            )
+        if len(toks) <= args.max_ngram:
+            phrases[" ".join(toks)] = [[eid, mvo_type] for eid, mvo_type, _, _ in entries]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for path in lexicon_paths:
+        rows = sorted(by_file.get(path.name, []), key=lambda r: (r["entity_id"], r["variant_norm"], r["variant"]))
+        with (out_dir / path.name).open("w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=LEXICON_FIELDS, delimiter="\t")
+            w.writeheader()
+            for r in rows:
+                w.writerow(r)
+    collisions.sort(key=lambda c: (c["kind"], c["variant_norm"]))
+    write_jsonl(collisions_path, collisions)
+    write_json(index_path, {"cache_key": key, "expander_version": EXPANDER_VERSION, "max_ngram": args.max_ngram, "phrases": phrases})
+
+    n_variants = sum(len(v) for v in by_file.values())
+    print(f"OK: {n_lexicon} lexicon variants -> {n_variants} ({len(phrases)} phrases, {len(collisions)} collisions)")
+
+
+if __name__ == "__main__":
+    main()
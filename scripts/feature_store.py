@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+from ner_ontology_utils import read_json
+from sequence_tagger import FEATURE_VERSION, type_features
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for the feature store
+    np = None
+
+
+# Binary features (char n-grams, affixes, length, shape; sequence_tagger.type_features) per
+# normalized type, as a CSR matrix without a data array (every stored entry is 1):
+#   vocab[i] is type id i; features[j] is feature id j; row i = indices[indptr[i]:indptr[i+1]].
+# Ids are append-only: a rebuild only featurizes types not yet in the store, so type ids (and
+# type-id arrays derived from them) stay valid. Token positions map to rows through type ids.
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise SystemExit("The feature store needs the 'numpy' package.")
+    return np
+
+
+def vocab_sha256(vocab: Iterable[str]) -> str:
+    return hashlib.sha256("\n".join(sorted(vocab)).encode("utf-8")).hexdigest()
+
+
+class FeatureStore:
+    def __init__(self, vocab: list[str], features: list[str], indptr: Any, indices: Any) -> None:
+        self.vocab = vocab
+        self.features = features
+        self.indptr = indptr
+        self.indices = indices
+        self.type_ids = {t: i for i, t in enumerate(vocab)}
+
+    @classmethod
+    def empty(cls) -> FeatureStore:
+        npm = _require_numpy()
+        return cls([], [], npm.zeros(1, dtype=npm.int64), npm.zeros(0, dtype=npm.int32))
+
+    @classmethod
+    def load(cls, path: Path) -> FeatureStore:
+        npm = _require_numpy()
+        with npm.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("feature_version") != FEATURE_VERSION:
+                raise SystemExit(f"Feature store {path} has feature_version {meta.get('feature_version')}, expected {FEATURE_VERSION}.")
+            return cls(z["vocab"].tolist(), z["features"].tolist(), z["indptr"], z["indices"])
+
+    def save(self, path: Path) -> None:
+        npm = _require_numpy()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"feature_version": FEATURE_VERSION, "vocab_sha256": vocab_sha256(self.vocab), "n_types": len(self.vocab), "n_features": len(self.features)}
+        with path.open("wb") as f:
+            npm.savez_compressed(
+                f,
+                meta=npm.array(json.dumps(meta, sort_keys=True)),
+                vocab=npm.array(self.vocab, dtype=str),
+                features=npm.array(self.features, dtype=str),
+                indptr=self.indptr,
+                indices=self.indices,
+            )
+
+    def extend(self, types: Iterable[str]) -> int:
+        # Featurize types not yet in the store (sorted, appended); returns how many were added.
+        npm = _require_numpy()
+        new = sorted({t for t in types if t not in self.type_ids})
+        if not new:
+            return 0
+        feature_ids = {f: j for j, f in enumerate(self.features)}
+        rows: list[list[int]] = []
+        for t in new:
+            ids = []
+            for f in type_features(t):
+                j = feature_ids.get(f)
+                if j is None:
+                    j = feature_ids[f] = len(self.features)
+                    self.features.append(f)
+                ids.append(j)
+            rows.append(sorted(ids))
+        lengths = npm.array([len(r) for r in rows], dtype=npm.int64)
+        self.indptr = npm.concatenate([self.indptr, self.indptr[-1] + npm.cumsum(lengths)])
+        self.indices = npm.concatenate([self.indices, npm.array([j for r in rows for j in r], dtype=npm.int32)])
+        for t in new:
+            self.type_ids[t] = len(self.vocab)
+            self.vocab.append(t)
+        return len(new)
+
+    def ids_for(self, tokens_norm: list[str]) -> Any:
+        # Token positions -> type ids (-1 for types not in the store).
+        npm = _require_numpy()
+        return npm.fromiter((self.type_ids.get(t, -1) for t in tokens_norm), dtype=npm.int32, count=len(tokens_norm))
+
+    def gather(self, type_ids: Any) -> tuple[Any, Any]:
+        # CSR (indptr, indices) with one row per position; unknown (-1) types get empty rows.
+        npm = _require_numpy()
+        ids = npm.asarray(type_ids)
+        known = ids >= 0
+        safe = npm.where(known, ids, 0)
+        starts = self.indptr[safe]
+        lengths = npm.where(known, self.indptr[safe + 1] - starts, 0)
+        indptr = npm.concatenate([[0], npm.cumsum(lengths)]).astype(npm.int64)
+        offsets = npm.repeat(starts - indptr[:-1], lengths)
+        indices = self.indices[npm.arange(indptr[-1]) + offsets]
+        return indptr, indices
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Per-type sparse feature matrices (CSR, NumPy .npz) for the token vocabulary.")
+    ap.add_argument("--token-index", nargs="+", required=True, help="Token index JSON paths whose tokens_norm define the vocabulary.")
+    ap.add_argument("--store", default="data/features/type_features.npz")
+    ap.add_argument("--type-ids-dir", help="Also write {workSlug}.npy token-position -> type-id arrays here.")
+    args = ap.parse_args()
+
+    npm = _require_numpy()
+    store_path = Path(args.store)
+    store = FeatureStore.load(store_path) if store_path.exists() else FeatureStore.empty()
+    before = vocab_sha256(store.vocab)
+
+    indexes = [read_json(Path(p)) for p in args.token_index]
+    added = 0
+    for idx in indexes:
+        added += store.extend(idx.get("tokens_norm") or [])
+    if added or not store_path.exists():
+        store.save(store_path)
+    if args.type_ids_dir:
+        out_dir = Path(args.type_ids_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for idx in indexes:
+            npm.save(out_dir / f"{idx['work_slug']}.npy", store.ids_for(idx.get("tokens_norm") or []))
+
+    after = vocab_sha256(store.vocab)
+    state = "unchanged" if after == before else f"{added} new types"
+    print(f"OK: {len(store.vocab)} types x {len(store.features)} features ({state}; vocab {after[:12]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Any, Iterator
+
+from ner_ontology_utils import hydrate_evidence_window, iter_jsonl, read_json, write_jsonl
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Resolve compact evidence_window_ref offsets into evidence_window token lists.")
+    ap.add_argument("--in", dest="inp", required=True, help="JSONL written with --compact-evidence.")
+    ap.add_argument(
+        "--token-index",
+        required=True,
+        help="Token index JSON path, or a directory of {workSlug}.json files (resolved per row work_slug).",
+    )
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    token_index = Path(args.token_index)
+    tokens_by_work: dict[str, list[str]] = {}
+
+    def tokens_for(row: dict[str, Any]) -> list[str]:
+        if not token_index.is_dir():
+            key = ""
+        else:
+            base = row.get("row") or row.get("a") or row.get("b") or row
+            key = str(row.get("work_slug") or base.get("work_slug") or "")
+        if key not in tokens_by_work:
+            path = token_index / f"{key}.json" if token_index.is_dir() else token_index
+            tokens_by_work[key] = read_json(path).get("tokens") or []
+        return tokens_by_work[key]
+
+    def hydrated() -> Iterator[dict[str, Any]]:
+        for row in iter_jsonl(Path(args.inp)):
+            yield hydrate_evidence_window(row, tokens_for(row))
+
+    write_jsonl(Path(args.out), hydrated())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Any
+
+from ner_ontology_utils import iter_manifest_items, read_json, write_json, write_jsonl
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Render passage payloads (tokens, tokens_norm, tokens_with_offsets, text) for a sample manifest.")
+    ap.add_argument("--manifest", required=True, help="Sample manifest (compact or full).")
+    ap.add_argument("--token-index-dir", help="Resolve token indexes as {workSlug}.json here instead of the recorded paths.")
+    ap.add_argument("--passage-urn", nargs="+", help="Only render these items.")
+    ap.add_argument("--out", help="Write a full manifest JSON (same shape make_sample_manifest.py writes without --compact).")
+    ap.add_argument("--out-jsonl", help="Write one hydrated item per line (per-item payloads for LLM/human tooling).")
+    args = ap.parse_args()
+
+    if not args.out and not args.out_jsonl:
+        raise SystemExit("Provide --out and/or --out-jsonl.")
+
+    manifest = read_json(Path(args.manifest))
+    if args.passage_urn:
+        wanted = set(args.passage_urn)
+        manifest = {**manifest, "items": [it for it in manifest.get("items", []) if it["passage_urn"] in wanted]}
+    token_index_dir = Path(args.token_index_dir) if args.token_index_dir else None
+    items: list[dict[str, Any]] = list(iter_manifest_items(manifest, token_index_dir))
+
+    if args.out:
+        full = {k: v for k, v in manifest.items() if k not in {"manifest_format", "token_indexes"}}
+        full["items"] = items
+        write_json(Path(args.out), full)
+    if args.out_jsonl:
+        write_jsonl(Path(args.out_jsonl), items)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,16 @@ from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import MVO_TO_PROVISIONAL, PROVISIONAL_TO_MVO, iter_jsonl, write_jsonl
+from annotation_store import add_input_arguments, input_rows
+from ner_ontology_utils import (
+    LINK_FIELDS,
+    MVO_TO_PROVISIONAL,
+    PROVISIONAL_TO_MVO,
+    Mention,
+    mention_key,
+    write_jsonl,
+    write_mentions,
+)
 
 
 def load_lexicons(dir_path: Path) -> dict[str, dict[str, list[str]]]:
@@ -39,41 +48,52 @@ def load_lexicons(dir_path: Path) -> dict[str, dict[str, list[str]]]:
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Link mention JSONL to entity IDs using lexicon TSVs.")
-    ap.add_argument("--in", dest="inp", required=True)
+    add_input_arguments(ap)
     ap.add_argument("--lexicons", required=True)
     ap.add_argument("--out", required=True)
     ap.add_argument("--unlinked", required=True)
+    ap.add_argument(
+        "--format",
+        choices=["full", "overlay"],
+        default="full",
+        help="full: linked mention rows; overlay: only mention_id + link fields (join with scripts/compact_link_overlay.py).",
+    )
     args = ap.parse_args()
 
     lex = load_lexicons(Path(args.lexicons))
 
-    linked: list[dict[str, Any]] = []
+    linked: list[Mention] = []
     unlinked: list[dict[str, Any]] = []
 
-    for row in iter_jsonl(Path(args.inp)):
-        ptype = str(row.get("provisional_type"))
+    for m in map(Mention.from_dict, input_rows(args)):
+        ptype = str(m.provisional_type)
         mvo_type = PROVISIONAL_TO_MVO.get(ptype)
         if not mvo_type:
-            unlinked.append({"reason": "unknown_type", "row": row})
+            unlinked.append({"reason": "unknown_type", "row": m.to_dict()})
             continue
-        vn = str(row.get("surface_norm") or "").strip()
+        vn = str(m.surface_norm or "").strip()
         candidates = lex.get(mvo_type, {}).get(vn, [])
         if len(candidates) == 1:
-            out = dict(row)
-            out["mvo_type"] = mvo_type
-            out["entity_id"] = candidates[0]
-            out["link_method"] = "exact_norm"
-            out["link_confidence"] = "high"
-            out["provisional_type"] = ptype or MVO_TO_PROVISIONAL.get(mvo_type) or ptype
-            linked.append(out)
+            # Linking only sets attributes, so rows are updated in place (no per-row copies).
+            m.mvo_type = mvo_type
+            m.entity_id = candidates[0]
+            m.link_method = "exact_norm"
+            m.link_confidence = "high"
+            m.provisional_type = ptype or MVO_TO_PROVISIONAL.get(mvo_type) or ptype
+            linked.append(m)
         elif len(candidates) > 1:
-            unlinked.append({"reason": "ambiguous", "mvo_type": mvo_type, "surface_norm": vn, "candidates": candidates, "row": row})
+            unlinked.append({"reason": "ambiguous", "mvo_type": mvo_type, "surface_norm": vn, "candidates": candidates, "row": m.to_dict()})
         else:
-            unlinked.append({"reason": "no_match", "mvo_type": mvo_type, "surface_norm": vn, "row": row})
+            unlinked.append({"reason": "no_match", "mvo_type": mvo_type, "surface_norm": vn, "row": m.to_dict()})
 
-    linked.sort(key=lambda r: (r["work_slug"], r["passage_urn"], r["token_start"], r["token_end"]))
     unlinked.sort(key=lambda r: (r.get("reason", ""), r.get("mvo_type", ""), r.get("surface_norm", "")))
-    write_jsonl(Path(args.out), linked)
+    if args.format == "overlay":
+        overlay = [{"mention_id": mention_key(m), **{k: m[k] for k in LINK_FIELDS}} for m in linked]
+        overlay.sort(key=lambda r: r["mention_id"])
+        write_jsonl(Path(args.out), overlay)
+    else:
+        linked.sort(key=lambda m: (m.work_slug, m.passage_urn, m.token_start, m.token_end))
+        write_mentions(Path(args.out), linked)
     write_jsonl(Path(args.unlinked), unlinked)
 
 
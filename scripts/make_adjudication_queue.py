@@ -2,12 +2,11 @@
 from __future__ import annotations
 
 import argparse
-import json
 from collections import defaultdict
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import iter_jsonl, write_jsonl
+from ner_ontology_utils import EVIDENCE_REF_KEY, evidence_window_ref, iter_jsonl, read_json, write_jsonl
 
 
 def jaccard(a0: int, a1: int, b0: int, b1: int) -> float:
@@ -24,9 +23,14 @@ def main() -> None:
     ap.add_argument("--out", required=True)
     ap.add_argument("--overlap-threshold", type=float, default=0.5)
     ap.add_argument("--window", type=int, default=12, help="Evidence window tokens on each side (approx).")
+    ap.add_argument(
+        "--compact-evidence",
+        action="store_true",
+        help="Write evidence_window_ref [lo, hi) token offsets instead of evidence_window token lists.",
+    )
     args = ap.parse_args()
 
-    token_index = json.loads(Path(args.token_index).read_text(encoding="utf-8"))
+    token_index = read_json(Path(args.token_index))
     tokens = token_index.get("tokens") or []
 
     a = list(iter_jsonl(Path(args.a)))
@@ -45,10 +49,12 @@ def main() -> None:
         bb = sorted(by_passage_b.get(passage_urn, []), key=lambda r: (r["token_start"], r["token_end"]))
         used_b: set[int] = set()
 
-        def ctx(ts: int, te: int) -> list[str]:
+        def ctx(ts: int, te: int) -> dict[str, Any]:
             lo = max(0, ts - args.window)
             hi = min(len(tokens), te + args.window)
-            return tokens[lo:hi]
+            if args.compact_evidence:
+                return {EVIDENCE_REF_KEY: evidence_window_ref(lo, hi)}
+            return {"evidence_window": tokens[lo:hi]}
 
         for ra in aa:
             best_i = None
@@ -85,7 +91,7 @@ def main() -> None:
                 "surface_norm": ra["surface_norm"],
                 "a": ra,
                 "b": rb,
-                "evidence_window": ctx(ts, te),
+                **ctx(ts, te),
             }
             queue.append(row)
 
@@ -105,7 +111,7 @@ def main() -> None:
                     "surface_norm": rb["surface_norm"],
                     "a": None,
                     "b": rb,
-                    "evidence_window": ctx(ts, te),
+                    **ctx(ts, te),
                 }
             )
 
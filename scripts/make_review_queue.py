@@ -2,62 +2,183 @@
 from __future__ import annotations
 
 import argparse
-import json
+import hashlib
+import heapq
 from collections import defaultdict
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
-from ner_ontology_utils import iter_jsonl, write_jsonl
+from annotation_store import add_input_arguments, open_dataset
+from ner_ontology_utils import EVIDENCE_REF_KEY, evidence_window_ref, iter_jsonl, read_json, write_jsonl
+
+
+# Higher = reviewed first when --top-k caps the queue.
+REASON_PRIORITY = {
+    "DUPLICATE_SPAN": 4,
+    "OVERLAP": 3,
+    "NESTED": 2,
+    "LOW_CONFIDENCE": 1,
+}
+
+
+def overlap_group_id(passage_urn: str, lo: int, hi: int) -> str:
+    raw = f"{passage_urn}|{lo}|{hi}".encode("utf-8")
+    return "ovl_" + hashlib.sha1(raw).hexdigest()[:12]
+
+
+def label_group(spans: list[tuple[int, int]], members: list[int]) -> dict[int, set[str]]:
+    # Every pair of members that overlaps gets its relation (members are in sweep order, so
+    # the inner loop stops at the first span starting at or after x's end):
+    # - DUPLICATE_SPAN: identical spans
+    # - NESTED: one span covers the other
+    # - OVERLAP: partial overlap (each has tokens outside the other)
+    reasons: dict[int, set[str]] = {i: set() for i in members}
+    for k, x in enumerate(members):
+        xs, xe = spans[x]
+        for y in members[k + 1 :]:
+            ys, ye = spans[y]
+            if ys >= xe:
+                break
+            if (xs, xe) == (ys, ye):
+                reason = "DUPLICATE_SPAN"
+            elif xs <= ys and ye <= xe:
+                reason = "NESTED"
+            else:
+                reason = "OVERLAP"
+            reasons[x].add(reason)
+            reasons[y].add(reason)
+    return reasons
+
+
+def overlap_groups(spans: list[tuple[int, int]]) -> list[tuple[list[int], dict[int, set[str]]]]:
+    # Sweep line over spans sorted by (start, -end), O(n log n). A group closes once the
+    # next start reaches the running max end, so transitive overlaps share one group; each
+    # closed group is then labelled pairwise (label_group).
+    # Returns [(member indexes, {index: reasons})] for groups with 2+ members.
+    order = sorted(range(len(spans)), key=lambda i: (spans[i][0], -spans[i][1], i))
+    groups: list[tuple[list[int], dict[int, set[str]]]] = []
+
+    members: list[int] = []
+    max_end = -1
+    for i in order:
+        ts, te = spans[i]
+        if members and ts >= max_end:
+            if len(members) > 1:
+                groups.append((members, label_group(spans, members)))
+            members, max_end = [], -1
+        members.append(i)
+        max_end = max(max_end, te)
+    if len(members) > 1:
+        groups.append((members, label_group(spans, members)))
+    return groups
 
 
 def main() -> None:
     ap = argparse.ArgumentParser(description="Generate a review queue from auto-tagged annotations.")
-    ap.add_argument("--in", dest="inp", required=True)
+    add_input_arguments(ap)
     ap.add_argument("--token-index", required=True)
     ap.add_argument("--out", required=True)
     ap.add_argument("--window", type=int, default=12)
+    ap.add_argument(
+        "--top-k",
+        type=int,
+        help="Keep only the K highest-priority review units per work (an overlap group counts as one unit).",
+    )
+    ap.add_argument(
+        "--compact-evidence",
+        action="store_true",
+        help="Write evidence_window_ref [lo, hi) token offsets instead of evidence_window token lists.",
+    )
     args = ap.parse_args()
 
-    idx = json.loads(Path(args.token_index).read_text(encoding="utf-8"))
+    idx = read_json(Path(args.token_index))
     tokens = idx.get("tokens") or []
 
-    rows = list(iter_jsonl(Path(args.inp)))
-    by_passage: dict[str, list[dict[str, Any]]] = defaultdict(list)
-    for r in rows:
-        by_passage[str(r["passage_urn"])].append(r)
+    def passages() -> Iterator[tuple[str, list[dict[str, Any]]]]:
+        # (passage_urn, rows) in passage order; a store is read one passage at a time via its index.
+        if args.store:
+            if not args.dataset:
+                raise SystemExit("--store requires --dataset")
+            with open_dataset(Path(args.store), args.dataset) as store:
+                for urn in store.passage_urns(args.dataset):
+                    yield urn, list(store.rows(args.dataset, passage_urn=urn))
+            return
+        if not args.inp:
+            raise SystemExit("Provide --in or --store with --dataset.")
+        by_passage: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for r in iter_jsonl(Path(args.inp)):
+            by_passage[str(r["passage_urn"])].append(r)
+        yield from sorted(by_passage.items())
 
-    queue: list[dict[str, Any]] = []
-    for passage_urn, items in sorted(by_passage.items()):
-        items.sort(key=lambda r: (r["token_start"], r["token_end"]))
-        for i, r in enumerate(items):
-            reasons: list[str] = []
-            ts = int(r["token_start"])
-            te = int(r["token_end"])
-
-            # Overlap check with immediate neighbors (enough for MVP).
-            if i > 0:
-                prev = items[i - 1]
-                if int(prev["token_end"]) > ts:
-                    reasons.append("OVERLAP")
-            if i + 1 < len(items):
-                nxt = items[i + 1]
-                if te > int(nxt["token_start"]):
-                    reasons.append("OVERLAP")
+    # Review units: a whole overlap group, or a single flagged row.
+    units_by_work: dict[str, list[list[dict[str, Any]]]] = defaultdict(list)
+    for passage_urn, items in passages():
+        items.sort(key=lambda r: (int(r["token_start"]), int(r["token_end"])))
+        spans = [(int(r["token_start"]), int(r["token_end"])) for r in items]
+
+        reasons_by_i: dict[int, list[str]] = defaultdict(list)
+        group_by_i: dict[int, str] = {}
+        for members, member_reasons in overlap_groups(spans):
+            gid = overlap_group_id(passage_urn, min(spans[i][0] for i in members), max(spans[i][1] for i in members))
+            for i in members:
+                group_by_i[i] = gid
+                reasons_by_i[i].extend(sorted(member_reasons[i], key=lambda x: -REASON_PRIORITY[x]))
 
+        for i, r in enumerate(items):
             if str(r.get("link_confidence")) == "low" or str(r.get("certainty")) == "low":
-                reasons.append("LOW_CONFIDENCE")
+                reasons_by_i[i].append("LOW_CONFIDENCE")
 
-            if not reasons:
+        grouped: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for i, r in enumerate(items):
+            if not reasons_by_i.get(i):
                 continue
-
+            ts, te = spans[i]
             lo = max(0, ts - args.window)
             hi = min(len(tokens), te + args.window)
-            queue.append({"reason": reasons, "row": r, "evidence_window": tokens[lo:hi]})
+            item: dict[str, Any] = {
+                "reason": reasons_by_i[i],
+                "row": r,
+                "priority": sum(REASON_PRIORITY[x] for x in set(reasons_by_i[i])),
+            }
+            if args.compact_evidence:
+                item[EVIDENCE_REF_KEY] = evidence_window_ref(lo, hi)
+            else:
+                item["evidence_window"] = tokens[lo:hi]
+            if i in group_by_i:
+                item["group_id"] = group_by_i[i]
+                grouped[group_by_i[i]].append(item)
+            else:
+                units_by_work[str(r["work_slug"])].append([item])
+        for gid in sorted(grouped):
+            units_by_work[str(grouped[gid][0]["row"]["work_slug"])].append(grouped[gid])
+
+    queue: list[dict[str, Any]] = []
+    for work_slug in sorted(units_by_work):
+        units = units_by_work[work_slug]
+        if args.top_k is not None:
+            # Bounded min-heap of size K; on equal priority the earlier unit wins.
+            heap: list[tuple[int, int, int]] = []
+            for seq, unit in enumerate(units):
+                entry = (max(q["priority"] for q in unit), -seq, seq)
+                if len(heap) < args.top_k:
+                    heapq.heappush(heap, entry)
+                elif args.top_k > 0 and entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+            units = [units[seq] for _, _, seq in heap]
+        for unit in units:
+            queue.extend(unit)
 
-    queue.sort(key=lambda q: (q["row"]["work_slug"], q["row"]["passage_urn"], q["row"]["token_start"]))
+    queue.sort(
+        key=lambda q: (
+            q["row"]["work_slug"],
+            q["row"]["passage_urn"],
+            int(q["row"]["token_start"]),
+            int(q["row"]["token_end"]),
+            str(q["row"].get("mvo_type") or ""),
+        )
+    )
     write_jsonl(Path(args.out), queue)
 
 
 if __name__ == "__main__":
     main()
-
@@ -2,16 +2,23 @@
 from __future__ import annotations
 
 import argparse
-import json
+import bisect
+import hashlib
+import heapq
+import math
 import random
+from collections import deque
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import json_dumps, write_json
+from ner_ontology_utils import MANIFEST_COMPACT, is_passage_table_path, iter_jsonl, manifest_item, read_json, read_passage_table, sha256_file, write_json
+
+
+COVERAGE_SIGNALS = ("density", "untagged_types", "ambiguous")
 
 
 def load_token_index(path: Path) -> dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return read_json(path)
 
 
 def passage_book_key(passage_ref: str) -> str:
@@ -19,6 +26,112 @@ def passage_book_key(passage_ref: str) -> str:
     return (passage_ref.split(".", 1)[0] if passage_ref else "?") or "?"
 
 
+def seeded_unit(seed: int, *parts: Any) -> float:
+    # Uniform in (0, 1) from a hash of (seed, parts): independent of file and passage order.
+    raw = "|".join(str(p) for p in (seed, *parts)).encode("utf-8")
+    h = int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big")
+    return (h + 1) / (2**64 + 2)
+
+
+def sample_roundrobin(passages: list[dict[str, Any]], n: int, max_tokens: int, rng: random.Random) -> list[dict[str, Any]]:
+    # Group by first passage_ref segment ("book") for light stratification.
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for rec in passages:
+        if (int(rec["token_end"]) - int(rec["token_start"])) > max_tokens:
+            continue
+        groups.setdefault(passage_book_key(rec.get("passage_ref", "")), []).append(rec)
+
+    queues: dict[str, deque[dict[str, Any]]] = {
+        k: deque(sorted(g, key=lambda r: (r.get("passage_urn", ""), r.get("token_start", 0)))) for k, g in groups.items()
+    }
+
+    # Round-robin draw from shuffled groups to ensure coverage.
+    group_keys = list(queues.keys())
+    rng.shuffle(group_keys)
+    chosen: list[dict[str, Any]] = []
+    while group_keys and len(chosen) < n:
+        new_group_keys: list[str] = []
+        for k in group_keys:
+            if len(chosen) >= n:
+                break
+            if queues[k]:
+                chosen.append(queues[k].popleft())
+                if queues[k]:
+                    new_group_keys.append(k)
+        group_keys = new_group_keys
+    return chosen
+
+
+def sample_reservoir(
+    passages: list[dict[str, Any]],
+    n: int,
+    max_tokens: int,
+    seed: int,
+    work_slug: str,
+    length_bands: list[int],
+    weight: str,
+) -> list[dict[str, Any]]:
+    # One pass, weighted reservoir sampling (Efraimidis-Spirakis A-Res) per stratum
+    # (book, passage length band): key = log(u) / w, keep the n largest keys per stratum.
+    # Memory is O(n * strata) rather than O(passages).
+    reservoirs: dict[tuple[str, int], list[tuple[float, str, int, dict[str, Any]]]] = {}
+    for rec in passages:
+        ts, te = int(rec["token_start"]), int(rec["token_end"])
+        if (te - ts) > max_tokens:
+            continue
+        stratum = (passage_book_key(rec.get("passage_ref", "")), bisect.bisect_left(length_bands, te - ts))
+        w = max(1, te - ts) if weight == "tokens" else 1
+        entry = (math.log(seeded_unit(seed, rec.get("passage_urn", ""), ts)) / w, rec.get("passage_urn", ""), ts, rec)
+        heap = reservoirs.setdefault(stratum, [])
+        if len(heap) < n:
+            heapq.heappush(heap, entry)
+        elif entry[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, entry)
+
+    # Strata in seeded order, each drawn highest key first, round-robin until n.
+    order = sorted(reservoirs, key=lambda s: (seeded_unit(seed, work_slug, *s), s))
+    queues = [deque(sorted(reservoirs[s], key=lambda e: e[:3], reverse=True)) for s in order]
+    chosen: list[dict[str, Any]] = []
+    while queues and len(chosen) < n:
+        for q in queues:
+            if len(chosen) >= n:
+                break
+            chosen.append(q.popleft()[3])
+        queues = [q for q in queues if q]
+    return chosen
+
+
+def load_passage_stats(paths: list[Path]) -> dict[str, dict[str, Any]]:
+    # tag_with_lexicons.py --passage-stats rows keyed by passage_urn.
+    return {row["passage_urn"]: row for p in paths for row in iter_jsonl(p)}
+
+
+def coverage_priority(stats: dict[str, Any], signal: str) -> float:
+    if signal == "density":
+        # Lexicon-tagged share of the passage; least covered first.
+        return -int(stats["tagged_tokens"]) / max(1, int(stats["n_tokens"]))
+    if signal == "untagged_types":
+        return int(stats["frequent_untagged_types"])
+    return int(stats["ambiguous_skipped"])
+
+
+def sample_coverage(
+    passages: list[dict[str, Any]],
+    n: int,
+    max_tokens: int,
+    seed: int,
+    passage_stats: dict[str, dict[str, Any]],
+    signal: str,
+) -> list[dict[str, Any]]:
+    # Top-n passages by coverage priority with a bounded heap; ties broken by a seeded hash.
+    candidates = (
+        (coverage_priority(passage_stats[rec["passage_urn"]], signal), seeded_unit(seed, rec["passage_urn"]), rec["passage_urn"], rec)
+        for rec in passages
+        if rec["passage_urn"] in passage_stats and (int(rec["token_end"]) - int(rec["token_start"])) <= max_tokens
+    )
+    return [c[3] for c in heapq.nlargest(n, candidates, key=lambda c: c[:3])]
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Create a deterministic sample manifest from token_index JSON.")
     ap.add_argument(
@@ -37,7 +150,47 @@ def main() -> None:
         default=400,
         help="Skip passages longer than this (keeps LLM/human annotation practical).",
     )
+    ap.add_argument(
+        "--compact",
+        action="store_true",
+        help="Store passage references + token-index sha256 only; render payloads with hydrate_manifest.py.",
+    )
+    ap.add_argument(
+        "--strategy",
+        choices=["roundrobin", "reservoir", "coverage"],
+        default="roundrobin",
+        help="roundrobin: shuffled books, sorted passages; reservoir: one-pass weighted reservoir per (book, length band); "
+        "coverage: passages lexicon tagging covers worst (needs --passage-stats).",
+    )
+    ap.add_argument(
+        "--length-bands",
+        default="100,200",
+        help="Reservoir strategy: comma-separated passage-length band edges in tokens.",
+    )
+    ap.add_argument(
+        "--weight",
+        choices=["uniform", "tokens"],
+        default="uniform",
+        help="Reservoir strategy: sampling weight per passage (tokens = proportional to passage length).",
+    )
+    ap.add_argument(
+        "--passage-stats",
+        nargs="+",
+        default=[],
+        help="Coverage strategy: tag_with_lexicons.py --passage-stats JSONL file(s).",
+    )
+    ap.add_argument(
+        "--coverage-signal",
+        choices=COVERAGE_SIGNALS,
+        default="density",
+        help="Coverage strategy: density = lowest auto-tag density; untagged_types = most frequent untagged "
+        "normalized types; ambiguous = most ambiguous lexicon skips.",
+    )
     args = ap.parse_args()
+    if args.strategy == "coverage" and not args.passage_stats:
+        raise SystemExit("--strategy coverage requires --passage-stats.")
+    passage_stats = load_passage_stats([Path(x) for x in args.passage_stats])
+    length_bands = sorted(int(x) for x in args.length_bands.split(",") if x.strip())
 
     rng = random.Random(args.seed)
     out_path = Path(args.out)
@@ -48,69 +201,32 @@ def main() -> None:
             if args.works:
                 token_index_paths.extend([raw / f"{w}.json" for w in args.works])
             else:
-                token_index_paths.extend(sorted(raw.glob("*.json")))
+                token_index_paths.extend(p for p in sorted(raw.glob("*.json")) if not is_passage_table_path(p))
         else:
             token_index_paths.append(raw)
 
     items: list[dict[str, Any]] = []
+    token_indexes: dict[str, dict[str, str]] = {}
     for p in token_index_paths:
-        idx = load_token_index(p)
-        passages = idx.get("passages") or []
-        tokens = idx.get("tokens") or []
-        tokens_norm = idx.get("tokens_norm") or []
-
-        # Group by first passage_ref segment ("book") for light stratification.
-        groups: dict[str, list[dict[str, Any]]] = {}
-        for rec in passages:
-            key = passage_book_key(rec.get("passage_ref", ""))
-            ts = int(rec["token_start"])
-            te = int(rec["token_end"])
-            if (te - ts) > int(args.max_passage_tokens):
-                continue
-            groups.setdefault(key, []).append(rec)
-
-        for g in groups.values():
-            g.sort(key=lambda r: (r.get("passage_urn", ""), r.get("token_start", 0)))
-
-        # Round-robin draw from shuffled groups to ensure coverage.
-        group_keys = list(groups.keys())
-        rng.shuffle(group_keys)
-        chosen: list[dict[str, Any]] = []
-        while group_keys and len(chosen) < int(args.n_passages):
-            new_group_keys: list[str] = []
-            for k in group_keys:
-                if len(chosen) >= int(args.n_passages):
-                    break
-                if groups[k]:
-                    chosen.append(groups[k].pop(0))
-                    if groups[k]:
-                        new_group_keys.append(k)
-            group_keys = new_group_keys
-
-        for rec in chosen:
-            ts = int(rec["token_start"])
-            te = int(rec["token_end"])
-            passage_tokens = tokens[ts:te]
-            passage_tokens_norm = tokens_norm[ts:te]
-            tokens_with_offsets = [f"{ts + i}:{tok}" for i, tok in enumerate(passage_tokens)]
-            items.append(
-                {
-                    "work_slug": idx["work_slug"],
-                    "work_urn": idx["work_urn"],
-                    "passage_urn": rec["passage_urn"],
-                    "passage_ref": rec.get("passage_ref"),
-                    # Passage bounds in WORK-GLOBAL token offsets.
-                    "token_start": ts,
-                    "token_end": te,
-                    # Aliases to avoid confusion with mention token_start/token_end.
-                    "passage_token_start": ts,
-                    "passage_token_end": te,
-                    "tokens": passage_tokens,
-                    "tokens_norm": passage_tokens_norm,
-                    "tokens_with_offsets": tokens_with_offsets,
-                    "text": " ".join(passage_tokens),
-                }
+        # Passage tables only; token arrays are read for works that contribute items.
+        table = read_passage_table(p)
+        passages = table["passages"]
+        if args.compact:
+            token_indexes[table["work_slug"]] = {"path": str(p), "sha256": sha256_file(p)}
+
+        if args.strategy == "reservoir":
+            chosen = sample_reservoir(
+                passages, int(args.n_passages), int(args.max_passage_tokens), args.seed, table["work_slug"], length_bands, args.weight
             )
+        elif args.strategy == "coverage":
+            chosen = sample_coverage(
+                passages, int(args.n_passages), int(args.max_passage_tokens), args.seed, passage_stats, args.coverage_signal
+            )
+        else:
+            chosen = sample_roundrobin(passages, int(args.n_passages), int(args.max_passage_tokens), rng)
+
+        idx = load_token_index(p) if chosen and not args.compact else table
+        items.extend(manifest_item(idx, rec, compact=args.compact) for rec in chosen)
 
     manifest = {
         "manifest_version": 1,
@@ -118,6 +234,13 @@ def main() -> None:
         "n_passages": args.n_passages,
         "items": sorted(items, key=lambda r: (r["work_slug"], r["passage_urn"])),
     }
+    if args.strategy == "reservoir":
+        manifest["sampling"] = {"strategy": args.strategy, "length_bands": length_bands, "weight": args.weight}
+    elif args.strategy == "coverage":
+        manifest["sampling"] = {"strategy": args.strategy, "coverage_signal": args.coverage_signal}
+    if args.compact:
+        manifest["manifest_format"] = MANIFEST_COMPACT
+        manifest["token_indexes"] = token_indexes
 
     # Use shared deterministic JSON writer.
     write_json(out_path, manifest)
@@ -1,14 +1,30 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import gzip
 import hashlib
 import json
+import os
 import re
+import sys
 import unicodedata
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable, Iterator
+from typing import IO, Any, Callable, Iterable, Iterator
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for *.zst artifacts
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON backend
+    orjson = None
 
 
 TEI_NS = {"tei": "http://www.tei-c.org/ns/1.0"}
@@ -74,29 +90,545 @@ def tokenize(text: str) -> list[str]:
     return tokens
 
 
+class StdlibJsonCodec:
+    """Canonical JSON: sorted keys, non-ASCII passthrough, compact separators."""
+
+    name = "stdlib"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+
+def _has_divergent_float(obj: Any) -> bool:
+    # Floats whose repr is exponent-formatted (1e+16, 1e-07) or non-finite (inf, nan); other
+    # floats, and every other JSON type, serialize identically under orjson and the stdlib.
+    stack = [obj]
+    while stack:
+        x = stack.pop()
+        t = type(x)
+        if t is str or t is int or t is bool or x is None:
+            continue
+        if isinstance(x, dict):
+            stack.extend(x.values())
+        elif isinstance(x, (list, tuple)):
+            stack.extend(x)
+        elif isinstance(x, float):
+            r = repr(x)
+            if "e" in r or "n" in r:
+                return True
+    return False
+
+
+class OrjsonJsonCodec(StdlibJsonCodec):
+    """orjson fast path; output is byte-identical to StdlibJsonCodec.
+
+    orjson spells floats differently in two cases (exponents: 1e16 vs 1e+16; NaN/Infinity as null)
+    and rejects non-str keys and >64-bit ints; those rows are re-encoded with the stdlib.
+    """
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            out = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return super().dumps(obj)
+        if _has_divergent_float(obj):
+            return super().dumps(obj)
+        return out
+
+    def loads(self, data: bytes | str) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity literals and >64-bit ints: let the stdlib decide (and raise if invalid).
+            return json.loads(data)
+
+
+JSON_CODECS = {"stdlib": StdlibJsonCodec, "orjson": OrjsonJsonCodec}
+
+
+def get_json_codec(name: str | None = None) -> StdlibJsonCodec:
+    # name=None: NER_JSON_BACKEND env var, else orjson when installed, else stdlib.
+    name = name or os.environ.get("NER_JSON_BACKEND") or ("orjson" if orjson is not None else "stdlib")
+    if name not in JSON_CODECS:
+        raise SystemExit(f"Unknown JSON backend: {name!r} (expected one of {sorted(JSON_CODECS)})")
+    if name == "orjson" and orjson is None:
+        raise SystemExit("JSON backend 'orjson' requested but the orjson package is not installed.")
+    return JSON_CODECS[name]()
+
+
+JSON_CODEC = get_json_codec()
+
+
 def json_dumps(obj: Any) -> str:
-    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return JSON_CODEC.dumps(obj).decode("utf-8")
+
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    return JSON_CODEC.dumps(obj)
+
+
+def json_loads(data: bytes | str) -> Any:
+    return JSON_CODEC.loads(data)
+
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+IO_BLOCK_SIZE = 1024 * 1024
+
+
+def compressed_suffix() -> str:
+    # Preferred compression for new artifacts: zstd when installed, gzip otherwise.
+    return ".zst" if zstandard is not None else ".gz"
+
+
+def _require_zstandard(path: Path) -> Any:
+    if zstandard is None:
+        raise SystemExit(f"{path}: zstd-compressed artifacts need the 'zstandard' package (or use a .gz path).")
+    return zstandard
+
+
+@contextmanager
+def open_binary(path: Path, mode: str) -> Iterator[IO[bytes]]:
+    # Binary stream with transparent gzip/zstd handling.
+    # Reads sniff magic bytes (so a mislabelled file still decodes); writes follow the suffix.
+    # gzip writes pin mtime/filename so identical content yields identical bytes.
+    if mode == "rb":
+        with path.open("rb") as raw:
+            magic = raw.read(4)
+            raw.seek(0)
+            if magic.startswith(GZIP_MAGIC):
+                with gzip.GzipFile(fileobj=raw, mode="rb") as f:
+                    yield f
+            elif magic == ZSTD_MAGIC:
+                with _require_zstandard(path).ZstdDecompressor().stream_reader(raw, closefd=False) as f:
+                    yield f
+            else:
+                yield raw
+    elif mode == "wb":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        suffix = path.suffix.lower()
+        if suffix == ".zst":
+            zstd = _require_zstandard(path)
+        with path.open("wb") as raw:
+            if suffix == ".gz":
+                with gzip.GzipFile(filename="", fileobj=raw, mode="wb", mtime=0) as f:
+                    yield f
+            elif suffix == ".zst":
+                with zstd.ZstdCompressor().stream_writer(raw, closefd=False) as f:
+                    yield f
+            else:
+                yield raw
+    else:
+        raise ValueError(f"unsupported mode: {mode!r}")
+
+
+def read_json(path: Path) -> Any:
+    with open_binary(path, "rb") as f:
+        return json_loads(f.read())
 
 
 def write_json(path: Path, obj: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json_dumps(obj) + "\n", encoding="utf-8")
+    with open_binary(path, "wb") as f:
+        f.write(json_dumps_bytes(obj) + b"\n")
+
+
+def iter_line_blocks(path: Path, block_size: int | None = None) -> Iterator[bytes]:
+    # Newline-aligned byte blocks (block reads; a split never lands inside a line or UTF-8 sequence).
+    size = block_size or IO_BLOCK_SIZE
+    with open_binary(path, "rb") as f:
+        tail = b""
+        for block in iter(lambda: f.read(size), b""):
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            tail = block[cut:]
+            if cut:
+                yield block[:cut]
+        if tail:
+            yield tail
+
+
+def decode_jsonl_block(block: bytes) -> list[dict[str, Any]]:
+    rows: list[dict[str, Any]] = []
+    for line in block.split(b"\n"):
+        line = line.strip()
+        if line:
+            rows.append(json_loads(line))
+    return rows
 
 
 def iter_jsonl(path: Path) -> Iterator[dict[str, Any]]:
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            yield json.loads(line)
+    for block in iter_line_blocks(path):
+        yield from decode_jsonl_block(block)
+
+
+def _decode_and_apply(fn: Callable[[list[dict[str, Any]]], Any] | None, block: bytes) -> Any:
+    rows = decode_jsonl_block(block)
+    return rows if fn is None else fn(rows)
+
+
+def map_jsonl_blocks(
+    path: Path,
+    fn: Callable[[list[dict[str, Any]]], Any] | None = None,
+    *,
+    workers: int | None = None,
+    block_size: int | None = None,
+) -> Iterator[Any]:
+    # Decodes newline-aligned blocks across a process pool and yields fn(rows) per block, in file order.
+    # fn must be a module-level function; returning small results (counts, errors) avoids shipping
+    # decoded rows back to the parent. Only 2 * workers blocks are in flight at a time.
+    workers = workers or os.cpu_count() or 1
+    blocks = iter_line_blocks(path, block_size or 4 * IO_BLOCK_SIZE)
+    if workers <= 1:
+        for block in blocks:
+            yield _decode_and_apply(fn, block)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending: deque[Future[Any]] = deque()
+        for block in blocks:
+            pending.append(ex.submit(_decode_and_apply, fn, block))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_jsonl_parallel(path: Path, workers: int | None = None) -> Iterator[dict[str, Any]]:
+    # Same rows, same order as iter_jsonl.
+    for rows in map_jsonl_blocks(path, workers=workers):
+        yield from rows
 
 
 def write_jsonl(path: Path, rows: Iterable[dict[str, Any]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
+    with open_binary(path, "wb") as f:
+        buf: list[bytes] = []
+        size = 0
         for row in rows:
-            f.write(json_dumps(row) + "\n")
+            line = json_dumps_bytes(row) + b"\n"
+            buf.append(line)
+            size += len(line)
+            if size >= IO_BLOCK_SIZE:
+                f.write(b"".join(buf))
+                buf, size = [], 0
+        if buf:
+            f.write(b"".join(buf))
+
+
+def is_jsonl_path(path: Path) -> bool:
+    name = path.name.lower()
+    return name.endswith((".jsonl", ".jsonl.gz", ".jsonl.zst"))
+
+
+def is_json_path(path: Path) -> bool:
+    name = path.name.lower()
+    return name.endswith((".json", ".json.gz", ".json.zst"))
+
+
+EVIDENCE_REF_KEY = "evidence_window_ref"
+# Nested mention rows carried by queue items (review queue: row; adjudication queue: a/b).
+NESTED_ROW_KEYS = ("row", "a", "b")
+
+
+def evidence_window_ref(lo: int, hi: int) -> list[int]:
+    # Compact stand-in for an evidence_window token list: work-global [lo, hi) offsets
+    # into the token index the row was produced from.
+    return [int(lo), int(hi)]
+
+
+def hydrate_evidence_window(row: dict[str, Any], tokens: list[str]) -> dict[str, Any]:
+    # Returns a copy with evidence_window_ref resolved to evidence_window (nested rows too).
+    out = dict(row)
+    ref = out.pop(EVIDENCE_REF_KEY, None)
+    if ref is not None:
+        lo, hi = int(ref[0]), int(ref[1])
+        out["evidence_window"] = tokens[max(0, lo) : min(len(tokens), hi)]
+    for key in NESTED_ROW_KEYS:
+        nested = out.get(key)
+        if isinstance(nested, dict):
+            out[key] = hydrate_evidence_window(nested, tokens)
+    return out
+
+
+# Fields link_mentions.py adds to a mention row; a link overlay stores only these.
+LINK_FIELDS = ("mvo_type", "entity_id", "link_method", "link_confidence")
+
+
+def mention_key(row: dict[str, Any]) -> str:
+    # Overlay join key: mention_id when present, else the stable m_ id derived from the span.
+    mid = row.get("mention_id")
+    if mid:
+        return str(mid)
+    raw = f"{row['work_slug']}|{row['passage_urn']}|{int(row['token_start'])}|{int(row['token_end'])}|{row.get('annotator_id', '')}"
+    return "m_" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def load_link_overlay(path: Path) -> dict[str, dict[str, Any]]:
+    # Hash index mention_id -> link fields.
+    overlay: dict[str, dict[str, Any]] = {}
+    for row in iter_jsonl(path):
+        overlay[str(row["mention_id"])] = {k: row[k] for k in LINK_FIELDS if k in row}
+    return overlay
+
+
+def iter_linked(base_rows: Iterable[dict[str, Any]], overlay: dict[str, dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    # Lazily joins base mention rows with their overlay entry; rows without a link are skipped.
+    for row in base_rows:
+        fields = overlay.get(mention_key(row))
+        if fields is None:
+            continue
+        out = dict(row)
+        out.update(fields)
+        yield out
+
+
+# Passage table sidecar written next to each token index (w.json -> w.passages.json), so
+# samplers read passage ranges without parsing the token arrays. It records the token index
+# sha256; a missing or stale sidecar falls back to reading the full index.
+PASSAGE_TABLE_SUFFIX = ".passages.json"
+
+
+def passage_table_path(index_path: Path) -> Path:
+    name = index_path.name
+    for suffix in (".gz", ".zst", ".json"):
+        if name.lower().endswith(suffix):
+            name = name[: -len(suffix)]
+    return index_path.with_name(name + PASSAGE_TABLE_SUFFIX)
+
+
+def is_passage_table_path(path: Path) -> bool:
+    return path.name.lower().endswith(PASSAGE_TABLE_SUFFIX)
+
+
+def write_passage_table(index_path: Path, idx: dict[str, Any]) -> None:
+    write_json(
+        passage_table_path(index_path),
+        {
+            "token_index_sha256": sha256_file(index_path),
+            "work_slug": idx.get("work_slug"),
+            "work_urn": idx.get("work_urn"),
+            "passages": idx.get("passages") or [],
+        },
+    )
+
+
+def read_passage_table(path: Path) -> dict[str, Any]:
+    # work_slug, work_urn and passages of a token index.
+    sidecar = passage_table_path(path)
+    if sidecar.exists():
+        table = read_json(sidecar)
+        if table.get("token_index_sha256") == sha256_file(path):
+            return {k: table.get(k) for k in ("work_slug", "work_urn", "passages")}
+    idx = read_json(path)
+    return {"work_slug": idx.get("work_slug"), "work_urn": idx.get("work_urn"), "passages": idx.get("passages") or []}
+
+
+# Compact sample manifests keep passage references only; payloads are rendered from the token index.
+MANIFEST_COMPACT = "compact"
+
+
+def manifest_item(idx: dict[str, Any], rec: dict[str, Any], *, compact: bool = False) -> dict[str, Any]:
+    # One sample item for a token-index passage record; compact items carry only the reference.
+    ts = int(rec["token_start"])
+    te = int(rec["token_end"])
+    item: dict[str, Any] = {
+        "work_slug": idx["work_slug"],
+        "work_urn": idx["work_urn"],
+        "passage_urn": rec["passage_urn"],
+        "passage_ref": rec.get("passage_ref"),
+        # Passage bounds in WORK-GLOBAL token offsets.
+        "token_start": ts,
+        "token_end": te,
+        # Aliases to avoid confusion with mention token_start/token_end.
+        "passage_token_start": ts,
+        "passage_token_end": te,
+    }
+    if not compact:
+        item.update(manifest_payload(idx, ts, te))
+    return item
+
+
+def manifest_payload(idx: dict[str, Any], ts: int, te: int) -> dict[str, Any]:
+    passage_tokens = (idx.get("tokens") or [])[ts:te]
+    return {
+        "tokens": passage_tokens,
+        "tokens_norm": (idx.get("tokens_norm") or [])[ts:te],
+        "tokens_with_offsets": [f"{ts + i}:{tok}" for i, tok in enumerate(passage_tokens)],
+        "text": " ".join(passage_tokens),
+    }
+
+
+def iter_manifest_items(manifest: dict[str, Any], token_index_dir: Path | None = None) -> Iterator[dict[str, Any]]:
+    # Full manifests pass through; compact ones are hydrated item by item, loading each
+    # work's token index once (recorded path, or {work_slug}.json under token_index_dir)
+    # and refusing to render against an index whose sha256 differs from the recorded one.
+    if manifest.get("manifest_format") != MANIFEST_COMPACT:
+        yield from manifest.get("items", [])
+        return
+    indexes = manifest.get("token_indexes") or {}
+    loaded: dict[str, dict[str, Any]] = {}
+    for item in manifest.get("items", []):
+        work_slug = str(item["work_slug"])
+        if work_slug not in loaded:
+            ref = indexes.get(work_slug) or {}
+            path = token_index_dir / f"{work_slug}.json" if token_index_dir else Path(str(ref.get("path", "")))
+            if not path.is_file():
+                raise SystemExit(f"Token index for {work_slug} not found: {path}")
+            if ref.get("sha256") and sha256_file(path) != ref["sha256"]:
+                raise SystemExit(f"Token index changed since the manifest was written: {path} (sha256 mismatch)")
+            loaded[work_slug] = read_json(path)
+        yield {**item, **manifest_payload(loaded[work_slug], int(item["token_start"]), int(item["token_end"]))}
+
+
+MENTION_FIELDS = (
+    "mention_id",
+    "work_urn",
+    "passage_urn",
+    "work_slug",
+    "token_start",
+    "token_end",
+    "surface",
+    "surface_norm",
+    "provisional_type",
+    "mvo_type",
+    "certainty",
+    "annotator_id",
+    "timestamp",
+    "entity_id",
+    "link_method",
+    "link_confidence",
+    "notes",
+)
+# Low-cardinality fields shared by many rows: one interned str object each.
+INTERNED_MENTION_FIELDS = (
+    "work_urn",
+    "passage_urn",
+    "work_slug",
+    "provisional_type",
+    "mvo_type",
+    "certainty",
+    "annotator_id",
+    "timestamp",
+    "link_method",
+    "link_confidence",
+)
+
+
+_KNOWN = frozenset(MENTION_FIELDS)
+_INTERNED = frozenset(INTERNED_MENTION_FIELDS)
+
+
+class Mention:
+    """Slotted mention row: int offsets, interned shared strings, unknown keys kept in `extra`.
+
+    Known fields that are absent in the source row are None; explicit JSON nulls are remembered
+    so to_dict() reproduces the input row exactly (apart from offsets becoming ints).
+    """
+
+    __slots__ = (*MENTION_FIELDS, "extra", "_nulls")
+
+    mention_id: str | None
+    work_urn: str | None
+    passage_urn: str
+    work_slug: str
+    token_start: int
+    token_end: int
+    surface: str | None
+    surface_norm: str | None
+    provisional_type: str | None
+    mvo_type: str | None
+    certainty: Any
+    annotator_id: str | None
+    timestamp: str | None
+    entity_id: str | None
+    link_method: str | None
+    link_confidence: str | None
+    notes: str | None
+    extra: dict[str, Any]
+    _nulls: tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, row: dict[str, Any]) -> Mention:
+        m = cls.__new__(cls)
+        nulls: list[str] = []
+        for field in MENTION_FIELDS:
+            value = row.get(field)
+            if value is None and field in row:
+                nulls.append(field)
+            elif field in _INTERNED and type(value) is str:
+                value = sys.intern(value)
+            object.__setattr__(m, field, value)
+        if m.token_start is not None:
+            m.token_start = int(m.token_start)
+        if m.token_end is not None:
+            m.token_end = int(m.token_end)
+        # Sized to the unknown keys only (a popped-down copy of the row would keep its full table).
+        m.extra = {k: v for k, v in row.items() if k not in _KNOWN}
+        m._nulls = tuple(nulls)
+        return m
+
+    @classmethod
+    def from_json(cls, line: bytes | str) -> Mention:
+        return cls.from_dict(json_loads(line))
+
+    def to_dict(self) -> dict[str, Any]:
+        out = dict(self.extra)
+        for field in MENTION_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                out[field] = value
+            elif field in self._nulls:
+                out[field] = None
+        return out
+
+    def to_json(self) -> bytes:
+        return json_dumps_bytes(self.to_dict())
+
+    def copy(self) -> Mention:
+        m = Mention.__new__(Mention)
+        for field in MENTION_FIELDS:
+            object.__setattr__(m, field, getattr(self, field))
+        m.extra = dict(self.extra)
+        m._nulls = self._nulls
+        return m
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # dict-style read access so row helpers (mention_key, sort keys) accept either form.
+        if key in _KNOWN:
+            value = getattr(self, key)
+            return default if value is None and key not in self._nulls else value
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _KNOWN:
+            value = getattr(self, key)
+            if value is None and key not in self._nulls:
+                raise KeyError(key)
+            return value
+        return self.extra[key]
+
+    def __contains__(self, key: str) -> bool:
+        if key in _KNOWN:
+            return getattr(self, key) is not None or key in self._nulls
+        return key in self.extra
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Mention) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Mention({self.to_dict()!r})"
+
+
+def iter_mentions(path: Path) -> Iterator[Mention]:
+    for row in iter_jsonl(path):
+        yield Mention.from_dict(row)
+
+
+def write_mentions(path: Path, mentions: Iterable[Mention]) -> None:
+    write_jsonl(path, (m.to_dict() for m in mentions))
 
 
 def localname(tag: str) -> str:
@@ -8,7 +8,7 @@ import time
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import sha256_file, write_json
+from ner_ontology_utils import compressed_suffix, iter_jsonl, sha256_file, write_json
 
 
 def run(cmd: list[str]) -> None:
@@ -18,16 +18,13 @@ def run(cmd: list[str]) -> None:
 def is_empty_jsonl(path: Path) -> bool:
     if not path.exists():
         return True
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            if line.strip():
-                return False
-    return True
+    return next(iter_jsonl(path), None) is None
 
 
 def copy_file(src: Path, dst: Path) -> None:
+    # Byte copy: keeps compressed artifacts compressed.
     dst.parent.mkdir(parents=True, exist_ok=True)
-    dst.write_text(src.read_text(encoding="utf-8"), encoding="utf-8")
+    dst.write_bytes(src.read_bytes())
 
 
 def main() -> None:
@@ -42,6 +39,36 @@ def main() -> None:
     ap.add_argument("--out-root", default=".", help="Workspace root for outputs (default: repo root).")
     ap.add_argument("--a-jsonl", help="Open-coding A JSONL path (human mode).")
     ap.add_argument("--b-jsonl", help="Open-coding B JSONL path (human mode).")
+    ap.add_argument(
+        "--compact-evidence",
+        action="store_true",
+        help="Store evidence windows as token offsets (resolve with scripts/hydrate_evidence_windows.py); about 1/4 smaller, use with --compress for most of the volume.",
+    )
+    ap.add_argument(
+        "--compress",
+        action="store_true",
+        help="Compress the large auto/review/reviewed JSONL outputs (zstd when installed, else gzip).",
+    )
+    ap.add_argument(
+        "--link-overlay",
+        action="store_true",
+        help="Write gold links as an overlay keyed by mention_id (materialize with scripts/compact_link_overlay.py).",
+    )
+    ap.add_argument(
+        "--compact-manifest",
+        action="store_true",
+        help="Write the sample manifest as passage references (render payloads with scripts/hydrate_manifest.py).",
+    )
+    ap.add_argument(
+        "--expand-variants",
+        action="store_true",
+        help="Tag with rule-expanded lexicon variants (scripts/expand_lexicon_variants.py) instead of the citation forms only.",
+    )
+    ap.add_argument(
+        "--store",
+        action="store_true",
+        help="Import each annotation state into data/annotations/store.sqlite (scripts/annotation_store.py); linking and the review queue read from it.",
+    )
     args = ap.parse_args()
 
     root = Path(args.out_root)
@@ -65,14 +92,34 @@ def main() -> None:
     adjudicated_queue_path = ann / "adjudicated" / "gold_v0_queue_decisions.jsonl"
     entities_dir = root / "data" / "entities"
     lexicons_dir = root / "data" / "lexicons"
-    gold_linked_path = ann / "linked" / "gold_v0_linked.jsonl"
+    expanded_dir = root / "data" / "lexicons_expanded"
+    phrase_index_path = expanded_dir / "phrase_index.json"
+    gold_linked_path = ann / "linked" / ("gold_v0_link_overlay.jsonl" if args.link_overlay else "gold_v0_linked.jsonl")
     unlinked_path = ann / "unlinked_queue.jsonl"
+    unlinked_clusters_path = ann / "unlinked_clusters.jsonl"
     auto_dir = ann / "linked"
-    auto_path = auto_dir / f"auto_{work_slug}.jsonl"
+    big_suffix = ".jsonl" + (compressed_suffix() if args.compress else "")
+    auto_path = auto_dir / f"auto_{work_slug}{big_suffix}"
     coverage_report = reports / "coverage" / f"{work_slug}.md"
-    review_queue_path = ann / f"review_queue_{work_slug}.jsonl"
-    reviewed_path = ann / "linked" / f"reviewed_{work_slug}.jsonl"
+    passage_stats_path = reports / "coverage" / f"{work_slug}_passages.jsonl"
+    validation_ledger = reports / "validation" / "ledger.json"
+    integrity_report = reports / "integrity" / f"{work_slug}.json"
+    review_queue_path = ann / f"review_queue_{work_slug}{big_suffix}"
+    reviewed_path = ann / "linked" / f"reviewed_{work_slug}{big_suffix}"
     enriched_path = enriched / tei_file.name
+    store_path = ann / "store.sqlite"
+
+    evidence_flags = ["--compact-evidence"] if args.compact_evidence else []
+
+    def store_import(dataset: str, path: Path) -> None:
+        run(["python3", "scripts/annotation_store.py", "import", "--db", str(store_path), "--dataset", dataset, "--jsonl", str(path)])
+
+    def input_flags(dataset: str, path: Path) -> list[str]:
+        # With --store, the state is imported once and downstream steps query the store.
+        if not args.store:
+            return ["--in", str(path)]
+        store_import(dataset, path)
+        return ["--store", str(store_path), "--dataset", dataset]
 
     start = time.time()
 
@@ -110,6 +157,7 @@ def main() -> None:
             str(args.seed),
             "--max-passage-tokens",
             str(args.max_passage_tokens),
+            *(["--compact"] if args.compact_manifest else []),
         ]
     )
 
@@ -122,7 +170,13 @@ def main() -> None:
             "token_index": str(token_index_path),
             "sample_manifest": str(sample_manifest_path),
             "next_steps": [
+                *(
+                    [f"Render passage payloads: python3 scripts/hydrate_manifest.py --manifest {sample_manifest_path} --out-jsonl <items.jsonl>"]
+                    if args.compact_manifest
+                    else []
+                ),
                 f"Produce open coding outputs: {a_path} and {b_path}",
+                f"Or shard A/B over concurrent codex exec runs: python3 scripts/codex_open_coding.py --manifest {sample_manifest_path} --out-dir {a_path.parent}",
                 f"Then run IAA: python3 scripts/compute_iaa.py --a {a_path} --b {b_path} --out {iaa_dir}",
             ],
         }
@@ -160,6 +214,7 @@ def main() -> None:
                 str(a_path),
                 "--seed",
                 "1",
+                *evidence_flags,
             ]
         )
         run(
@@ -174,11 +229,11 @@ def main() -> None:
                 str(b_path),
                 "--seed",
                 "2",
+                *evidence_flags,
             ]
         )
 
-    # Guideline + bounds checks for Phase 1 outputs (sources of truth: docs).
-    run(["python3", "scripts/validate_guidelines.py", "--strict", "--phase", "open_coding", "--jsonl", str(a_path), str(b_path)])
+    # Guideline + bounds checks for Phase 1 outputs (sources of truth: docs), one pass per file.
     run(
         [
             "python3",
@@ -189,27 +244,19 @@ def main() -> None:
             "data/ontology/relations.yaml",
             "--token-index",
             str(token_index_path),
+            "--ledger",
+            str(validation_ledger),
+            "--guidelines-phase",
+            "open_coding",
+            "--strict-guidelines",
             "--ann",
             str(a_path),
-        ]
-    )
-    run(
-        [
-            "python3",
-            "scripts/validate_annotations.py",
-            "--mvo",
-            "data/ontology/mvo.yaml",
-            "--relations",
-            "data/ontology/relations.yaml",
-            "--token-index",
-            str(token_index_path),
-            "--ann",
             str(b_path),
         ]
     )
 
     run(["python3", "scripts/compute_iaa.py", "--a", str(a_path), "--b", str(b_path), "--out", str(iaa_dir)])
-    run(["python3", "scripts/make_adjudication_queue.py", "--a", str(a_path), "--b", str(b_path), "--token-index", str(token_index_path), "--out", str(queue_path)])
+    run(["python3", "scripts/make_adjudication_queue.py", "--a", str(a_path), "--b", str(b_path), "--token-index", str(token_index_path), "--out", str(queue_path), *evidence_flags])
     if args.mode == "demo":
         run(["python3", "scripts/demo_adjudicate.py", "--in", str(queue_path), "--out", str(adjudicated_queue_path)])
     else:
@@ -241,7 +288,6 @@ def main() -> None:
     run(["python3", "scripts/bootstrap_entities_from_gold.py", "--gold", str(gold_path), "--out-dir", str(entities_dir)])
 
     # Guideline + bounds checks for gold set (still provisional types).
-    run(["python3", "scripts/validate_guidelines.py", "--strict", "--phase", "gold", "--jsonl", str(gold_path)])
     run(
         [
             "python3",
@@ -252,15 +298,30 @@ def main() -> None:
             "data/ontology/relations.yaml",
             "--token-index",
             str(token_index_path),
+            "--ledger",
+            str(validation_ledger),
+            "--guidelines-phase",
+            "gold",
+            "--strict-guidelines",
             "--ann",
             str(gold_path),
         ]
     )
 
     run(["python3", "scripts/build_lexicons.py", "--entities", str(entities_dir), "--out-dir", str(lexicons_dir)])
-    run(["python3", "scripts/link_mentions.py", "--in", str(gold_path), "--lexicons", str(lexicons_dir), "--out", str(gold_linked_path), "--unlinked", str(unlinked_path)])
-    run(["python3", "scripts/tag_with_lexicons.py", "--token-index", str(token_index_path), "--lexicons", str(lexicons_dir), "--out", str(auto_dir), "--report", str(coverage_report)])
-    run(["python3", "scripts/make_review_queue.py", "--in", str(auto_path), "--token-index", str(token_index_path), "--out", str(review_queue_path)])
+    if args.store:
+        store_import("open_coding_A", a_path)
+        store_import("open_coding_B", b_path)
+    run(["python3", "scripts/link_mentions.py", *input_flags("gold_v0", gold_path), "--lexicons", str(lexicons_dir), "--out", str(gold_linked_path), "--unlinked", str(unlinked_path), "--format", "overlay" if args.link_overlay else "full"])
+    run(["python3", "scripts/cluster_unlinked.py", "--unlinked", str(unlinked_path), "--lexicons", str(lexicons_dir), "--out", str(unlinked_clusters_path)])
+    lexicon_flags = ["--lexicons", str(lexicons_dir)]
+    if args.expand_variants:
+        # Observed surfaces need full linked rows (an overlay has no surfaces).
+        gold_flags = [] if args.link_overlay else ["--gold", str(gold_linked_path)]
+        run(["python3", "scripts/expand_lexicon_variants.py", "--lexicons", str(lexicons_dir), *gold_flags, "--out-dir", str(expanded_dir), "--phrase-index", str(phrase_index_path)])
+        lexicon_flags = ["--phrase-index", str(phrase_index_path)]
+    run(["python3", "scripts/tag_with_lexicons.py", "--token-index", str(token_index_path), *lexicon_flags, "--out", str(auto_path), "--report", str(coverage_report), "--passage-stats", str(passage_stats_path), *evidence_flags])
+    run(["python3", "scripts/make_review_queue.py", *input_flags(f"auto_{work_slug}", auto_path), "--token-index", str(token_index_path), "--out", str(review_queue_path), *evidence_flags])
     if args.mode == "demo":
         if is_empty_jsonl(review_queue_path):
             copy_file(auto_path, reviewed_path)
@@ -276,9 +337,32 @@ def main() -> None:
                     f"- {reviewed_path}\n"
                     "Populate it from data/annotations/review_queue_{workSlug}.jsonl, then rerun."
                 )
+    if args.store:
+        store_import(f"reviewed_{work_slug}", reviewed_path)
     run(["python3", "scripts/export_tei_with_standoff.py", "--tei-file", str(tei_file), "--ann", str(reviewed_path), "--out", str(enriched)])
     run(["python3", "scripts/validate_ontology.py", "--mvo", "data/ontology/mvo.yaml", "--relations", "data/ontology/relations.yaml", "--entities", str(entities_dir), "--lexicons", str(lexicons_dir)])
-    run(["python3", "scripts/validate_annotations.py", "--mvo", "data/ontology/mvo.yaml", "--relations", "data/ontology/relations.yaml", "--token-index", str(token_index_path), "--ann", str(auto_path)])
+    run(["python3", "scripts/validate_annotations.py", "--mvo", "data/ontology/mvo.yaml", "--relations", "data/ontology/relations.yaml", "--token-index", str(token_index_path), "--ledger", str(validation_ledger), "--ann", str(auto_path)])
+    # Cross-artifact references: entity ids vs registries, adjudicated spans vs A/B, unique reviewed mention ids.
+    # Human mode may start from a prebuilt gold file, in which case there are no queue decisions to check.
+    adjudicated_flags = ["--a", str(a_path), "--b", str(b_path), "--adjudicated-queue", str(adjudicated_queue_path)] if adjudicated_queue_path.exists() else []
+    run(
+        [
+            "python3",
+            "scripts/check_integrity.py",
+            "--entities",
+            str(entities_dir),
+            "--linked",
+            str(gold_linked_path),
+            str(auto_path),
+            str(reviewed_path),
+            *adjudicated_flags,
+            "--unique-mention-ids",
+            str(gold_path),
+            str(reviewed_path),
+            "--report",
+            str(integrity_report),
+        ]
+    )
 
     elapsed_s = round(time.time() - start, 3)
     run_manifest: dict[str, Any] = {
@@ -305,9 +389,17 @@ def main() -> None:
             "reviewed": str(reviewed_path),
             "enriched_tei": str(enriched_path),
             "coverage_report": str(coverage_report),
+            "coverage_passage_stats": str(passage_stats_path),
+            "unlinked_clusters": str(unlinked_clusters_path),
+            "validation_ledger": str(validation_ledger),
+            "integrity_report": str(integrity_report),
         },
         "elapsed_seconds": elapsed_s,
     }
+    if args.expand_variants:
+        run_manifest["outputs"]["phrase_index"] = str(phrase_index_path)
+    if args.store:
+        run_manifest["outputs"]["annotation_store"] = str(store_path)
     suffix = "demo_run" if args.mode == "demo" else "human_run"
     run_path = reports / "runs" / f"{work_slug}_{suffix}.json"
     write_json(run_path, run_manifest)
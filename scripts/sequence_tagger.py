@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import random
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from ner_ontology_utils import MVO_TO_PROVISIONAL, iter_jsonl, mention_key, normalize_greek, read_json, sha256_file, write_json, write_jsonl
+
+
+# Averaged-perceptron BIO tagger over normalized tokens. Features of a token are the features
+# of its normalized type (char n-grams, affixes, shape; computed once per type and cached) plus
+# a small context window and the previous tag; decoding is greedy left to right per passage.
+# At tag time the weights are fixed, so the summed score of each type's features is computed
+# once per type and shared by every passage (only context and previous-tag features vary).
+FEATURE_VERSION = "tagger_features_v1"
+FIXED_TS = "2000-01-01T00:00:00Z"
+OUTSIDE = "O"
+
+
+def token_shape(tn: str) -> str:
+    out: list[str] = []
+    for ch in tn:
+        c = "d" if ch.isdigit() else "a" if ch.isalpha() else "x"
+        if not out or out[-1] != c:
+            out.append(c)
+    return "".join(out)
+
+
+@lru_cache(maxsize=1 << 17)
+def type_features(tn: str) -> tuple[str, ...]:
+    padded = f"<{tn}>"
+    feats = [f"w={tn}", f"len={min(len(tn), 12)}", f"shape={token_shape(tn)}"]
+    for k in (1, 2, 3, 4):
+        if len(tn) >= k:
+            feats.append(f"pre{k}={tn[:k]}")
+            feats.append(f"suf{k}={tn[-k:]}")
+    for n in (2, 3, 4):
+        feats.extend(f"c{n}={padded[i : i + n]}" for i in range(len(padded) - n + 1))
+    return tuple(dict.fromkeys(feats))
+
+
+def window_features(norm: list[str], i: int) -> list[str]:
+    prev = norm[i - 1] if i > 0 else "<s>"
+    nxt = norm[i + 1] if i + 1 < len(norm) else "</s>"
+    return [f"w-1={prev}", f"w+1={nxt}", f"suf3-1={prev[-3:]}", f"suf3+1={nxt[-3:]}"]
+
+
+def context_features(norm: list[str], i: int) -> list[str]:
+    return ["bias", *type_features(norm[i]), *window_features(norm, i)]
+
+
+class AveragedPerceptron:
+    def __init__(self, labels: list[str]) -> None:
+        self.labels = labels
+        self.weights: dict[str, dict[str, float]] = {}
+        self._totals: dict[tuple[str, str], float] = defaultdict(float)
+        self._stamps: dict[tuple[str, str], int] = defaultdict(int)
+        self.n_updates = 0
+        self._type_scores: dict[str, dict[str, float]] = {}
+
+    def scores(self, feats: Iterable[str], base: dict[str, float] | None = None) -> dict[str, float]:
+        out: dict[str, float] = defaultdict(float, base or {})
+        for f in feats:
+            w = self.weights.get(f)
+            if w:
+                for label, v in w.items():
+                    out[label] += v
+        return out
+
+    def best(self, scores: dict[str, float]) -> str:
+        # Ties go to the earliest label ("O" first) for determinism.
+        return max(self.labels, key=lambda label: (scores.get(label, 0.0), -self.labels.index(label)))
+
+    def predict(self, feats: Iterable[str]) -> str:
+        return self.best(self.scores(feats))
+
+    def type_scores(self, tn: str) -> dict[str, float]:
+        # Only valid once weights are final (tag time).
+        cached = self._type_scores.get(tn)
+        if cached is None:
+            cached = self._type_scores[tn] = dict(self.scores(["bias", *type_features(tn)]))
+        return cached
+
+    def update(self, truth: str, guess: str, feats: Iterable[str]) -> None:
+        self.n_updates += 1
+        if truth == guess:
+            return
+        for f in feats:
+            w = self.weights.setdefault(f, {})
+            for label, delta in ((truth, 1.0), (guess, -1.0)):
+                key = (f, label)
+                self._totals[key] += (self.n_updates - self._stamps[key]) * w.get(label, 0.0)
+                self._stamps[key] = self.n_updates
+                w[label] = w.get(label, 0.0) + delta
+
+    def average(self) -> None:
+        for f, w in self.weights.items():
+            for label in list(w):
+                key = (f, label)
+                total = self._totals[key] + (self.n_updates - self._stamps[key]) * w[label]
+                avg = round(total / self.n_updates, 4) if self.n_updates else 0.0
+                if avg:
+                    w[label] = avg
+                else:
+                    del w[label]
+        self.weights = {f: w for f, w in self.weights.items() if w}
+
+
+def decode(model: AveragedPerceptron, norm: list[str]) -> list[str]:
+    tags: list[str] = []
+    for i in range(len(norm)):
+        prev = tags[-1] if tags else "<s>"
+        tags.append(model.best(model.scores([*window_features(norm, i), f"t-1={prev}"], model.type_scores(norm[i]))))
+    return tags
+
+
+def bio_tags(n: int, spans: list[tuple[int, int, str]]) -> list[str]:
+    # Overlapping gold spans: earliest start, then longest, wins.
+    tags = [OUTSIDE] * n
+    for ts, te, label in sorted(spans, key=lambda s: (s[0], s[0] - s[1], s[2])):
+        if ts < 0 or te > n or ts >= te or any(t != OUTSIDE for t in tags[ts:te]):
+            continue
+        tags[ts] = f"B-{label}"
+        for i in range(ts + 1, te):
+            tags[i] = f"I-{label}"
+    return tags
+
+
+def tag_spans(tags: list[str]) -> list[tuple[int, int, str]]:
+    # A stray I-X (after O or another type) opens a new span.
+    spans: list[tuple[int, int, str]] = []
+    start, label = -1, ""
+    for i, tag in enumerate([*tags, OUTSIDE]):
+        kind, _, cur = tag.partition("-")
+        if start >= 0 and (kind != "I" or cur != label):
+            spans.append((start, i, label))
+            start = -1
+        if kind == "B" or (kind == "I" and start < 0):
+            start, label = i, cur
+    return spans
+
+
+def load_token_indexes(paths: list[str]) -> dict[str, dict[str, Any]]:
+    out: dict[str, dict[str, Any]] = {}
+    for p in paths:
+        idx = read_json(Path(p))
+        out[idx["work_slug"]] = idx
+    return out
+
+
+def training_passages(gold_path: Path, indexes: dict[str, dict[str, Any]], label_field: str) -> list[tuple[list[str], list[str]]]:
+    # (tokens_norm, BIO tags) for every passage with at least one gold mention.
+    spans: dict[tuple[str, str], list[tuple[int, int, str]]] = defaultdict(list)
+    for row in iter_jsonl(gold_path):
+        label = row.get(label_field)
+        if label and row.get("work_slug") in indexes:
+            spans[(row["work_slug"], row["passage_urn"])].append((int(row["token_start"]), int(row["token_end"]), str(label)))
+    out: list[tuple[list[str], list[str]]] = []
+    for work_slug, idx in sorted(indexes.items()):
+        norm = idx.get("tokens_norm") or []
+        for p in idx.get("passages") or []:
+            rows = spans.get((work_slug, p["passage_urn"]))
+            if not rows:
+                continue
+            lo, hi = int(p["token_start"]), int(p["token_end"])
+            out.append((norm[lo:hi], bio_tags(hi - lo, [(ts - lo, te - lo, label) for ts, te, label in rows])))
+    return out
+
+
+def train(data: list[tuple[list[str], list[str]]], epochs: int, seed: int) -> AveragedPerceptron:
+    labels = sorted({t for _, tags in data for t in tags} | {OUTSIDE}, key=lambda t: (t != OUTSIDE, t))
+    model = AveragedPerceptron(labels)
+    rng = random.Random(seed)
+    order = list(range(len(data)))
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for k in order:
+            norm, gold = data[k]
+            prev = "<s>"
+            for i in range(len(norm)):
+                feats = [*context_features(norm, i), f"t-1={prev}"]
+                model.update(gold[i], model.predict(feats), feats)
+                # Gold history during training; decode() uses its own predictions.
+                prev = gold[i]
+    model.average()
+    return model
+
+
+def iter_candidates(
+    model: AveragedPerceptron, idx: dict[str, Any], label_field: str, annotator_id: str, passage_urns: set[str] | None
+) -> Iterator[dict[str, Any]]:
+    tokens = idx.get("tokens") or []
+    norm_all = idx.get("tokens_norm") or []
+    for p in idx.get("passages") or []:
+        if passage_urns is not None and p["passage_urn"] not in passage_urns:
+            continue
+        lo, hi = int(p["token_start"]), int(p["token_end"])
+        for ts, te, label in tag_spans(decode(model, norm_all[lo:hi])):
+            surface = " ".join(tokens[lo + ts : lo + te])
+            row: dict[str, Any] = {
+                "work_urn": idx["work_urn"],
+                "passage_urn": p["passage_urn"],
+                "work_slug": idx["work_slug"],
+                "token_start": lo + ts,
+                "token_end": lo + te,
+                "surface": surface,
+                "surface_norm": normalize_greek(surface),
+                "provisional_type": MVO_TO_PROVISIONAL.get(label, "MATERIAL") if label_field == "mvo_type" else label,
+                "certainty": "low",
+                "annotator_id": annotator_id,
+                "timestamp": FIXED_TS,
+                "notes": "AUTO_SEQUENCE_TAGGER",
+            }
+            if label_field == "mvo_type":
+                row["mvo_type"] = label
+            row["mention_id"] = mention_key(row)
+            yield row
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Averaged-perceptron BIO tagger trained on gold mentions (CPU-only recall layer).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ap_train = sub.add_parser("train", help="Train on gold JSONL + token indexes and write the model JSON.")
+    ap_train.add_argument("--gold", required=True, help="e.g. data/annotations/adjudicated/gold_v0.jsonl")
+    ap_train.add_argument("--token-index", nargs="+", required=True)
+    ap_train.add_argument("--label-field", default="provisional_type", choices=["provisional_type", "mvo_type"])
+    ap_train.add_argument("--epochs", type=int, default=5)
+    ap_train.add_argument("--seed", type=int, default=0)
+    ap_train.add_argument("--model", required=True, help="Output model JSON.")
+
+    ap_tag = sub.add_parser("tag", help="Tag every passage (or --passage-urn ones) and write candidate mention JSONL.")
+    ap_tag.add_argument("--model", required=True)
+    ap_tag.add_argument("--token-index", nargs="+", required=True)
+    ap_tag.add_argument("--passage-urn", nargs="+", help="Only tag these passages.")
+    ap_tag.add_argument("--annotator-id", default="AUTO_TAGGER")
+    ap_tag.add_argument("--out", required=True)
+
+    args = ap.parse_args()
+    indexes = load_token_indexes(args.token_index)
+
+    if args.cmd == "train":
+        data = training_passages(Path(args.gold), indexes, args.label_field)
+        if not data:
+            raise SystemExit(f"No gold mentions in {args.gold} fall in the given token indexes.")
+        model = train(data, args.epochs, args.seed)
+        write_json(
+            Path(args.model),
+            {
+                "feature_version": FEATURE_VERSION,
+                "label_field": args.label_field,
+                "epochs": args.epochs,
+                "seed": args.seed,
+                "gold_sha256": sha256_file(Path(args.gold)),
+                "n_passages": len(data),
+                "labels": model.labels,
+                "weights": model.weights,
+            },
+        )
+        print(f"OK: {len(data)} passages, {len(model.weights)} features, {len(model.labels)} labels")
+        return
+
+    saved = read_json(Path(args.model))
+    if saved.get("feature_version") != FEATURE_VERSION:
+        raise SystemExit(f"Model feature_version {saved.get('feature_version')} != {FEATURE_VERSION}; retrain.")
+    model = AveragedPerceptron(saved["labels"])
+    model.weights = saved["weights"]
+    wanted = set(args.passage_urn) if args.passage_urn else None
+    rows = [r for _, idx in sorted(indexes.items()) for r in iter_candidates(model, idx, saved["label_field"], args.annotator_id, wanted)]
+    rows.sort(key=lambda r: (r["work_slug"], r["passage_urn"], r["token_start"], r["token_end"]))
+    write_jsonl(Path(args.out), rows)
+    print(f"OK: {len(rows)} candidates")
+
+
+if __name__ == "__main__":
+    main()
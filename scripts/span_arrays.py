@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from ner_ontology_utils import iter_jsonl, read_json, write_jsonl
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for columnar span operations
+    np = None
+
+
+# One record per mention; passage and type are codes into SpanTable.passages / SpanTable.types
+# (codes follow sorted string order, so sorting by code == sorting by passage_urn).
+# `line` is the 0-based line in the source JSONL, which maps results back to full rows.
+SPAN_FIELDS = (
+    ("passage", "i4"),
+    ("start", "i8"),
+    ("end", "i8"),
+    ("type", "i4"),
+    ("line", "i8"),
+)
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise SystemExit("Columnar span operations need the 'numpy' package.")
+    return np
+
+
+def span_dtype() -> Any:
+    return _require_numpy().dtype(list(SPAN_FIELDS))
+
+
+@dataclass
+class SpanTable:
+    spans: Any  # np.ndarray[SPAN_FIELDS]
+    passages: list[str]
+    types: list[str]
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def take(self, idx: Any) -> SpanTable:
+        return SpanTable(self.spans[idx], self.passages, self.types)
+
+
+def _sorted_codes(vocab: dict[str, int]) -> tuple[list[str], Any]:
+    # Re-code first-seen ids into sorted-string ids; returns (sorted vocab, old->new lookup).
+    names = sorted(vocab)
+    lut = np.empty(len(names), dtype="i4")
+    for new, name in enumerate(names):
+        lut[vocab[name]] = new
+    return names, lut
+
+
+def from_rows(rows: Iterable[dict[str, Any]], *, type_field: str = "provisional_type") -> SpanTable:
+    _require_numpy()
+    passage_ids: dict[str, int] = {}
+    type_ids: dict[str, int] = {}
+    passage_col: list[int] = []
+    start_col: list[int] = []
+    end_col: list[int] = []
+    type_col: list[int] = []
+    for row in rows:
+        passage_col.append(passage_ids.setdefault(str(row["passage_urn"]), len(passage_ids)))
+        start_col.append(int(row["token_start"]))
+        end_col.append(int(row["token_end"]))
+        t = row.get(type_field)
+        type_col.append(-1 if t is None else type_ids.setdefault(str(t), len(type_ids)))
+
+    spans = np.empty(len(passage_col), dtype=span_dtype())
+    passages, plut = _sorted_codes(passage_ids)
+    types, tlut = _sorted_codes(type_ids)
+    spans["passage"] = plut[np.asarray(passage_col, dtype="i4")] if passage_col else 0
+    spans["start"] = start_col
+    spans["end"] = end_col
+    # Missing types are -1, which indexes the trailing -1 of the lookup.
+    spans["type"] = np.append(tlut, -1)[np.asarray(type_col, dtype="i4")] if type_col else -1
+    spans["line"] = np.arange(len(spans))
+    return SpanTable(spans, passages, types)
+
+
+def from_jsonl(path: Path, *, type_field: str = "provisional_type") -> SpanTable:
+    return from_rows(iter_jsonl(path), type_field=type_field)
+
+
+def to_rows(table: SpanTable, *, type_field: str = "provisional_type") -> Iterator[dict[str, Any]]:
+    # Span-only rows; use select_jsonl_lines() to get the full source rows back.
+    for rec in table.spans.tolist():
+        passage, start, end, t, line = rec
+        yield {
+            "passage_urn": table.passages[passage],
+            "token_start": start,
+            "token_end": end,
+            type_field: table.types[t] if t >= 0 else None,
+            "line": line,
+        }
+
+
+def select_jsonl_lines(path: Path, table: SpanTable) -> Iterator[dict[str, Any]]:
+    # Streams the source JSONL and yields the rows still present in `table`, in file order.
+    keep = np.zeros(int(table.spans["line"].max()) + 1 if len(table) else 0, dtype=bool)
+    keep[table.spans["line"]] = True
+    for i, row in enumerate(iter_jsonl(path)):
+        if i >= len(keep):
+            break
+        if keep[i]:
+            yield row
+
+
+def align(a: SpanTable, b: SpanTable) -> tuple[SpanTable, SpanTable]:
+    # Re-code both tables onto the union vocabularies so codes are comparable across them.
+    if a.passages == b.passages and a.types == b.types:
+        return a, b
+    passages = sorted(set(a.passages) | set(b.passages))
+    types = sorted(set(a.types) | set(b.types))
+    pos_p = {p: i for i, p in enumerate(passages)}
+    pos_t = {t: i for i, t in enumerate(types)}
+
+    def recode(t: SpanTable) -> SpanTable:
+        spans = t.spans.copy()
+        plut = np.asarray([pos_p[p] for p in t.passages], dtype="i4")
+        tlut = np.asarray([pos_t[x] for x in t.types] + [-1], dtype="i4")
+        if len(spans):
+            spans["passage"] = plut[spans["passage"]]
+            spans["type"] = tlut[spans["type"]]
+        return SpanTable(spans, passages, types)
+
+    return recode(a), recode(b)
+
+
+def sort_order(table: SpanTable) -> Any:
+    # (passage_urn, token_start, token_end, line): stable and deterministic.
+    s = table.spans
+    return np.lexsort((s["line"], s["end"], s["start"], s["passage"]))
+
+
+def passage_groups(table: SpanTable) -> Iterator[tuple[str, Any]]:
+    # (passage_urn, row indexes sorted by span) per passage, in passage_urn order.
+    order = sort_order(table)
+    codes = table.spans["passage"][order]
+    cuts = np.flatnonzero(np.diff(codes)) + 1
+    for chunk in np.split(order, cuts) if len(order) else []:
+        yield table.passages[int(table.spans["passage"][chunk[0]])], chunk
+
+
+def locate(passages: list[dict[str, Any]], offsets: Any) -> Any:
+    # Index (into `passages`, token-index order) of the passage whose range contains each offset, or -1.
+    starts = np.asarray([int(p["token_start"]) for p in passages], dtype="i8")
+    ends = np.asarray([int(p["token_end"]) for p in passages], dtype="i8")
+    order = np.argsort(starts, kind="stable")
+    pos = np.searchsorted(starts[order], offsets, side="right") - 1
+    hit = order[np.maximum(pos, 0)]
+    inside = (pos >= 0) & (offsets < ends[hit])
+    return np.where(inside, hit, -1)
+
+
+def check_bounds(table: SpanTable, passages: list[dict[str, Any]]) -> Any:
+    # Boolean mask of spans that are well-formed and lie inside their declared passage's token range.
+    s = table.spans
+    pos_by_urn = {str(p["passage_urn"]): i for i, p in enumerate(passages)}
+    declared = np.asarray([pos_by_urn.get(p, -1) for p in table.passages] or [-1], dtype="i8")
+    declared = declared[s["passage"]] if len(s) else np.empty(0, dtype="i8")
+    ends = np.asarray([int(p["token_end"]) for p in passages] or [0], dtype="i8")
+    found = locate(passages, s["start"]) if passages else np.full(len(s), -1)
+    return (found >= 0) & (found == declared) & (s["start"] < s["end"]) & (s["end"] <= ends[np.maximum(found, 0)])
+
+
+def dedup(table: SpanTable, *, by_type: bool = True) -> SpanTable:
+    # Keeps the first occurrence of each (passage, start, end[, type]); survivors stay in input order.
+    s = table.spans
+    if not len(s):
+        return table
+    keys = (s["end"], s["start"], s["passage"]) if not by_type else (s["type"], s["end"], s["start"], s["passage"])
+    order = np.lexsort((s["line"], *keys))
+    first = np.ones(len(order), dtype=bool)
+    same = np.ones(len(order) - 1, dtype=bool)
+    for k in keys:
+        col = k[order]
+        same &= col[1:] == col[:-1]
+    first[1:] = ~same
+    return table.take(np.sort(order[first]))
+
+
+def _range_pairs(lo: Any, hi: Any) -> tuple[Any, Any]:
+    # Expand per-row candidate ranges [lo, hi) into flat (row, candidate) index pairs.
+    counts = np.maximum(hi - lo, 0)
+    rows = np.repeat(np.arange(len(lo)), counts)
+    if not len(rows):
+        return rows, rows
+    base = np.repeat(lo - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    return rows, base + np.arange(len(rows))
+
+
+def jaccard(a_start: Any, a_end: Any, b_start: Any, b_end: Any) -> Any:
+    inter = np.maximum(0, np.minimum(a_end, b_end) - np.maximum(a_start, b_start))
+    union = (a_end - a_start) + (b_end - b_start) - inter
+    return np.divide(inter, union, out=np.zeros(len(inter)), where=union > 0)
+
+
+def overlap_pairs(a: SpanTable, b: SpanTable | None = None) -> tuple[Any, Any, Any]:
+    # All overlapping (i in a, j in b) pairs within the same passage, with their Jaccard score.
+    # With b=None, pairs i < j (by span order) within a. Returns (i, j, jaccard) index arrays.
+    self_pairs = b is None
+    if b is None:
+        b = a
+    else:
+        a, b = align(a, b)
+    sa, sb = a.spans, b.spans
+    if not len(sa) or not len(sb):
+        empty = np.empty(0, dtype="i8")
+        return empty, empty, np.empty(0)
+
+    border = sort_order(b)
+    # Composite sortable key passage * stride + offset (token offsets are non-negative).
+    stride = int(max(sa["end"].max(), sb["end"].max(), sa["start"].max(), sb["start"].max())) + 2
+    bkey = sb["passage"][border].astype("i8") * stride + sb["start"][border]
+    akey = sa["passage"].astype("i8") * stride
+    # Candidates start before a's end in the same passage; with self pairs, only later spans in order.
+    # Cross pairs: a b span starting at or before a.start - (b's longest span) ends before a starts,
+    # so the window opens there instead of at the passage start.
+    hi = np.searchsorted(bkey, akey + sa["end"], side="left")
+    if self_pairs:
+        rank = np.empty(len(border), dtype="i8")
+        rank[border] = np.arange(len(border))
+        lo = rank + 1
+    else:
+        max_len_b = int((sb["end"] - sb["start"]).max())
+        lo = np.searchsorted(bkey, akey + np.maximum(sa["start"].astype("i8") - max_len_b + 1, 0), side="left")
+    i, k = _range_pairs(lo, hi)
+    j = border[k]
+    keep = sb["end"][j] > sa["start"][i]
+    i, j = i[keep], j[keep]
+    return i, j, jaccard(sa["start"][i], sa["end"][i], sb["start"][j], sb["end"][j])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Columnar (NumPy) span checks over mention JSONL: bounds, dedup, overlap pairs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ap_bounds = sub.add_parser("check-bounds", help="Write rows whose span is outside its passage token range.")
+    ap_bounds.add_argument("--in", dest="inp", required=True)
+    ap_bounds.add_argument("--token-index", required=True)
+    ap_bounds.add_argument("--out", required=True)
+
+    ap_dedup = sub.add_parser("dedup", help="Drop repeated spans (first occurrence wins; file order kept).")
+    ap_dedup.add_argument("--in", dest="inp", required=True)
+    ap_dedup.add_argument("--out", required=True)
+    ap_dedup.add_argument("--ignore-type", action="store_true", help="Treat same span with different types as duplicates.")
+
+    ap_pairs = sub.add_parser("overlaps", help="Write overlapping span pairs within passages with their Jaccard score.")
+    ap_pairs.add_argument("--a", required=True)
+    ap_pairs.add_argument("--b", help="Second mention set (cross pairs A x B); omit for pairs within --a.")
+    ap_pairs.add_argument("--min-jaccard", type=float, default=0.0)
+    ap_pairs.add_argument("--out", required=True)
+
+    args = ap.parse_args()
+
+    if args.cmd == "check-bounds":
+        table = from_jsonl(Path(args.inp))
+        passages = read_json(Path(args.token_index)).get("passages") or []
+        bad = table.take(~check_bounds(table, passages))
+        write_jsonl(Path(args.out), select_jsonl_lines(Path(args.inp), bad))
+        print(f"OK: {len(bad)} out-of-bounds spans / {len(table)}")
+    elif args.cmd == "dedup":
+        table = from_jsonl(Path(args.inp))
+        kept = dedup(table, by_type=not args.ignore_type)
+        write_jsonl(Path(args.out), select_jsonl_lines(Path(args.inp), kept))
+        print(f"OK: kept {len(kept)} / {len(table)}")
+    else:
+        a = from_jsonl(Path(args.a))
+        b = from_jsonl(Path(args.b)) if args.b else None
+        if b is not None:
+            a, b = align(a, b)
+        i, j, score = overlap_pairs(a, b)
+        other = b if b is not None else a
+        keep = score >= args.min_jaccard
+        out = [
+            {
+                "passage_urn": a.passages[int(a.spans["passage"][x])],
+                "a_line": int(a.spans["line"][x]),
+                "b_line": int(other.spans["line"][y]),
+                "jaccard": round(float(s), 6),
+            }
+            for x, y, s in zip(i[keep], j[keep], score[keep])
+        ]
+        out.sort(key=lambda d: (d["passage_urn"], d["a_line"], d["b_line"]))
+        write_jsonl(Path(args.out), out)
+
+
+if __name__ == "__main__":
+    main()
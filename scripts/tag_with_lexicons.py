@@ -3,15 +3,58 @@ from __future__ import annotations
 
 import argparse
 import csv
-import json
-from collections import defaultdict
+from collections import Counter, defaultdict
 from pathlib import Path
 from typing import Any
 
-from ner_ontology_utils import MVO_TO_PROVISIONAL, normalize_greek, tokenize, write_jsonl
+from ner_ontology_utils import (
+    EVIDENCE_REF_KEY,
+    MVO_TO_PROVISIONAL,
+    evidence_window_ref,
+    is_jsonl_path,
+    normalize_greek,
+    read_json,
+    tokenize,
+    write_jsonl,
+)
 
 
 FIXED_TS = "2000-01-01T00:00:00Z"
+# Untagged types shorter than this are mostly articles/particles; not counted as coverage gaps.
+MIN_GAP_TYPE_CHARS = 4
+
+
+def passage_stats_rows(
+    passages: list[dict[str, Any]],
+    tokens_norm: list[str],
+    tagged: bytearray,
+    per_passage: dict[str, dict[str, int]],
+    min_type_freq: int,
+) -> list[dict[str, Any]]:
+    # Per-passage coverage signals for make_sample_manifest.py --strategy coverage.
+    untagged = Counter(
+        tokens_norm[i]
+        for p in passages
+        for i in range(int(p["token_start"]), int(p["token_end"]))
+        if not tagged[i] and len(tokens_norm[i]) >= MIN_GAP_TYPE_CHARS
+    )
+    frequent = {t for t, c in untagged.items() if c >= min_type_freq}
+    rows: list[dict[str, Any]] = []
+    for p in passages:
+        ts, te = int(p["token_start"]), int(p["token_end"])
+        stats = per_passage.get(p["passage_urn"], {})
+        rows.append(
+            {
+                "passage_urn": p["passage_urn"],
+                "n_tokens": te - ts,
+                "tagged_tokens": stats.get("tagged_tokens", 0),
+                "mentions": stats.get("mentions", 0),
+                "ambiguous_skipped": stats.get("ambiguous_skipped", 0),
+                "frequent_untagged_types": len({tokens_norm[i] for i in range(ts, te) if not tagged[i] and tokens_norm[i] in frequent}),
+            }
+        )
+    rows.sort(key=lambda r: r["passage_urn"])
+    return rows
 
 
 def load_lexicon_phrases(dir_path: Path, max_ngram: int) -> dict[tuple[str, ...], list[tuple[str, str]]]:
@@ -44,17 +87,39 @@ def load_lexicon_phrases(dir_path: Path, max_ngram: int) -> dict[tuple[str, ...]
     return phrases
 
 
+def load_phrase_index(path: Path, max_ngram: int) -> dict[tuple[str, ...], list[tuple[str, str]]]:
+    # Compiled by scripts/expand_lexicon_variants.py: "tok tok" -> [[entity_id, mvo_type]...].
+    phrases: dict[tuple[str, ...], list[tuple[str, str]]] = {}
+    for key, cands in (read_json(path).get("phrases") or {}).items():
+        toks = tuple(key.split(" "))
+        if len(toks) <= max_ngram:
+            phrases[toks] = [(eid, mvo_type) for eid, mvo_type in cands]
+    return phrases
+
+
 def main() -> None:
     ap = argparse.ArgumentParser(description="Precision-first lexicon tagging using token_index JSON.")
     ap.add_argument("--tei", help="TEI directory (accepted for docs compatibility; not used).")
     ap.add_argument("--work", help="Work slug/stem to infer token index path (docs compatibility).")
     ap.add_argument("--token-index", help="Token index JSON path.")
     ap.add_argument("--token-index-dir", default="data/token_index", help="Directory to infer token index from when using --work.")
-    ap.add_argument("--lexicons", required=True)
+    ap.add_argument("--lexicons", help="Lexicon TSV directory.")
+    ap.add_argument("--phrase-index", help="Compiled phrase index JSON (scripts/expand_lexicon_variants.py) used instead of --lexicons.")
     ap.add_argument("--out", required=True, help="Output JSONL path or directory.")
     ap.add_argument("--report", help="Coverage report markdown path (defaults to reports/coverage/{workSlug}.md).")
     ap.add_argument("--max-ngram", type=int, default=5)
     ap.add_argument("--annotator-id", default="AUTO_LEXICON")
+    ap.add_argument(
+        "--compact-evidence",
+        action="store_true",
+        help="Write evidence_window_ref [lo, hi) token offsets instead of evidence_window token lists.",
+    )
+    ap.add_argument(
+        "--passage-stats",
+        help="Write per-passage coverage stats JSONL (tagged tokens, ambiguous skips, frequent untagged types) "
+        "for make_sample_manifest.py --strategy coverage.",
+    )
+    ap.add_argument("--min-type-freq", type=int, default=3, help="--passage-stats: untagged types seen this often in the work count as frequent.")
     args = ap.parse_args()
 
     token_index_path: Path
@@ -65,18 +130,25 @@ def main() -> None:
     else:
         raise SystemExit("Provide --token-index OR --work (to infer from --token-index-dir).")
 
-    idx = json.loads(token_index_path.read_text(encoding="utf-8"))
+    idx = read_json(token_index_path)
     work_slug = idx["work_slug"]
     work_urn = idx["work_urn"]
     tokens = idx.get("tokens") or []
     tokens_norm = idx.get("tokens_norm") or []
     passages = idx.get("passages") or []
 
-    phrases = load_lexicon_phrases(Path(args.lexicons), args.max_ngram)
+    if args.phrase_index:
+        phrases = load_phrase_index(Path(args.phrase_index), args.max_ngram)
+    elif args.lexicons:
+        phrases = load_lexicon_phrases(Path(args.lexicons), args.max_ngram)
+    else:
+        raise SystemExit("Provide --lexicons OR --phrase-index.")
 
     out_rows: list[dict[str, Any]] = []
     counts_by_type: dict[str, int] = defaultdict(int)
     ambiguous = 0
+    tagged = bytearray(len(tokens_norm))
+    per_passage: dict[str, dict[str, int]] = {}
 
     for p in passages:
         ts = int(p["token_start"])
@@ -84,6 +156,7 @@ def main() -> None:
         p_tokens = tokens[ts:te]
         p_norm = tokens_norm[ts:te]
         passage_urn = p["passage_urn"]
+        stats = per_passage.setdefault(passage_urn, {"tagged_tokens": 0, "mentions": 0, "ambiguous_skipped": 0})
 
         i = 0
         while i < len(p_norm):
@@ -95,6 +168,7 @@ def main() -> None:
                     continue
                 if len(cand) != 1:
                     ambiguous += 1
+                    stats["ambiguous_skipped"] += 1
                     i += 1  # precision-first: skip, but always advance
                     advanced = True
                     break
@@ -104,27 +178,34 @@ def main() -> None:
                 surface_norm = normalize_greek(surface)
                 global_start = ts + i
                 global_end = global_start + n
-                out_rows.append(
-                    {
-                        "work_urn": work_urn,
-                        "passage_urn": passage_urn,
-                        "work_slug": work_slug,
-                        "token_start": global_start,
-                        "token_end": global_end,
-                        "surface": surface,
-                        "surface_norm": surface_norm,
-                        "provisional_type": MVO_TO_PROVISIONAL.get(mvo_type, "MATERIAL"),
-                        "mvo_type": mvo_type,
-                        "certainty": "med",
-                        "annotator_id": args.annotator_id,
-                        "timestamp": FIXED_TS,
-                        "entity_id": eid,
-                        "link_method": "variant_norm",
-                        "link_confidence": "med",
-                        "evidence_window": p_tokens[max(0, i - 5) : min(len(p_tokens), i + n + 6)],
-                    }
-                )
+                ev_lo = max(0, i - 5)
+                ev_hi = min(len(p_tokens), i + n + 6)
+                row: dict[str, Any] = {
+                    "work_urn": work_urn,
+                    "passage_urn": passage_urn,
+                    "work_slug": work_slug,
+                    "token_start": global_start,
+                    "token_end": global_end,
+                    "surface": surface,
+                    "surface_norm": surface_norm,
+                    "provisional_type": MVO_TO_PROVISIONAL.get(mvo_type, "MATERIAL"),
+                    "mvo_type": mvo_type,
+                    "certainty": "med",
+                    "annotator_id": args.annotator_id,
+                    "timestamp": FIXED_TS,
+                    "entity_id": eid,
+                    "link_method": "variant_norm",
+                    "link_confidence": "med",
+                }
+                if args.compact_evidence:
+                    row[EVIDENCE_REF_KEY] = evidence_window_ref(ts + ev_lo, ts + ev_hi)
+                else:
+                    row["evidence_window"] = p_tokens[ev_lo:ev_hi]
+                out_rows.append(row)
                 counts_by_type[mvo_type] += 1
+                stats["mentions"] += 1
+                stats["tagged_tokens"] += n
+                tagged[global_start:global_end] = b"\x01" * n
                 i += n
                 advanced = True
                 break
@@ -136,9 +217,11 @@ def main() -> None:
     out_path = Path(args.out)
     if out_path.exists() and out_path.is_dir():
         out_path = out_path / f"auto_{work_slug}.jsonl"
-    elif str(out_path).endswith(("/", "\\")) or out_path.suffix.lower() != ".jsonl":
+    elif str(out_path).endswith(("/", "\\")) or not is_jsonl_path(out_path):
         out_path = out_path / f"auto_{work_slug}.jsonl"
     write_jsonl(out_path, out_rows)
+    if args.passage_stats:
+        write_jsonl(Path(args.passage_stats), passage_stats_rows(passages, tokens_norm, tagged, per_passage, args.min_type_freq))
 
     report_lines = [
         f"# Coverage report: {work_slug}",
@@ -2,35 +2,105 @@
 from __future__ import annotations
 
 import argparse
-import json
+import glob
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 
-import yaml
-
-from ner_ontology_utils import PROVISIONAL_TYPES, normalize_greek, iter_jsonl
-
-
-REQUIRED_FIELDS = {
-    "work_urn",
-    "passage_urn",
-    "work_slug",
-    "token_start",
-    "token_end",
-    "surface",
-    "surface_norm",
-    "provisional_type",
-    "certainty",
-    "annotator_id",
-    "timestamp",
-}
-
-
-def load_yaml(path: Path) -> dict[str, Any]:
-    data = yaml.safe_load(path.read_text(encoding="utf-8"))
-    if not isinstance(data, dict):
-        raise ValueError(f"{path}: expected YAML mapping at top level")
-    return data
+from ner_ontology_utils import iter_jsonl, read_json, sha256_file, write_json
+from validation_rules import (
+    GUIDELINE_PHASES,
+    VALIDATOR_VERSION,
+    RuleEngine,
+    ValidationContext,
+    format_stats,
+    guideline_rules,
+    load_context,
+    merge_stats,
+    schema_rules,
+)
+
+
+def build_engine(ctx: ValidationContext, guidelines_phase: str | None, strict_guidelines: bool) -> RuleEngine:
+    rules = schema_rules(ctx)
+    if guidelines_phase:
+        rules.extend(guideline_rules(guidelines_phase, strict=strict_guidelines, with_shared=False))
+    return RuleEngine(rules)
+
+
+def validate_file(engine: RuleEngine, path: Path, max_errors: int | None) -> dict[str, Any]:
+    # Streams one file through every rule once; all findings are counted, only the first max_errors kept.
+    kept: dict[str, list[str]] = {"error": [], "warning": []}
+    counts = {"error": 0, "warning": 0}
+    n_rows = 0
+    for i, row in enumerate(iter_jsonl(path), start=1):
+        n_rows = i
+        for rule, msg in engine.check_row(row):
+            counts[rule.level] += 1
+            if max_errors is None or len(kept[rule.level]) < max_errors:
+                kept[rule.level].append(f"line {i}: {msg}")
+    return {
+        "path": str(path),
+        "rows": n_rows,
+        "error_count": counts["error"],
+        "errors": kept["error"],
+        "warning_count": counts["warning"],
+        "warnings": kept["warning"],
+        "truncated": counts["error"] > len(kept["error"]),
+    }
+
+
+_WORKER_ENGINE_ARGS: tuple[ValidationContext, str | None, bool] | None = None
+
+
+def _init_worker(ctx: ValidationContext, guidelines_phase: str | None, strict_guidelines: bool) -> None:
+    global _WORKER_ENGINE_ARGS
+    _WORKER_ENGINE_ARGS = (ctx, guidelines_phase, strict_guidelines)
+
+
+def _validate_in_worker(path: str, max_errors: int | None) -> dict[str, Any]:
+    # Fresh engine per file so rule stats come back per file and merge in the parent.
+    assert _WORKER_ENGINE_ARGS is not None
+    engine = build_engine(*_WORKER_ENGINE_ARGS)
+    result = validate_file(engine, Path(path), max_errors)
+    result["rules"] = engine.stats()
+    return result
+
+
+def ledger_inputs(args: argparse.Namespace, max_errors: int | None) -> dict[str, Any]:
+    # Everything besides the annotation file itself that a cached result depends on.
+    return {
+        "token_index_sha256": sha256_file(Path(args.token_index)),
+        "mvo_sha256": sha256_file(Path(args.mvo)),
+        "relations_sha256": sha256_file(Path(args.relations)),
+        "validator_version": VALIDATOR_VERSION,
+        "options": {
+            "strict_surface": args.strict_surface,
+            "guidelines_phase": args.guidelines_phase,
+            "strict_guidelines": args.strict_guidelines,
+            "max_errors": max_errors,
+        },
+    }
+
+
+def load_ledger(path: Path) -> dict[str, Any]:
+    if not path.exists():
+        return {"entries": {}}
+    return read_json(path)
+
+
+def expand_ann_paths(patterns: list[str]) -> list[Path]:
+    # Literal paths pass through (missing ones fail loudly on read); glob patterns expand sorted.
+    paths: list[Path] = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise SystemExit(f"--ann pattern matched no files: {pattern}")
+            paths.extend(Path(m) for m in matches)
+        else:
+            paths.append(Path(pattern))
+    return list(dict.fromkeys(paths))
 
 
 def main() -> None:
@@ -38,81 +108,115 @@ def main() -> None:
     ap.add_argument("--mvo", required=True)
     ap.add_argument("--relations", required=True)
     ap.add_argument("--token-index", required=True)
-    ap.add_argument("--ann", required=True)
+    ap.add_argument(
+        "--ann",
+        required=True,
+        nargs="+",
+        action="extend",
+        help="One or more annotation JSONL files or glob patterns (all checked against the same token index).",
+    )
     ap.add_argument("--strict-surface", action="store_true")
+    ap.add_argument(
+        "--guidelines-phase",
+        choices=GUIDELINE_PHASES,
+        help="Also run the validate_guidelines.py checks for this phase in the same pass.",
+    )
+    ap.add_argument("--strict-guidelines", action="store_true", help="Treat guideline warnings as errors (validate_guidelines.py --strict).")
+    ap.add_argument("--workers", type=int, default=1, help="Validate files in parallel worker processes.")
+    ap.add_argument("--max-errors", type=int, default=200, help="Errors reported per file (all are counted); 0 = no cap.")
+    ap.add_argument("--summary-json", help="Write per-file counts, reported errors and per-rule hits/timing as JSON.")
+    ap.add_argument("--rule-stats", action="store_true", help="Print per-rule hit counts and time, costliest first.")
+    ap.add_argument(
+        "--ledger",
+        help="Validation ledger JSON (e.g. reports/validation/ledger.json): files whose sha256, token index, "
+        "MVO/relations and validator version match a recorded result are not re-validated.",
+    )
     args = ap.parse_args()
-
-    mvo = load_yaml(Path(args.mvo))
-    rels = load_yaml(Path(args.relations))
-    mvo_types = set((mvo.get("types") or {}).keys())
-    rel_names = set((rels.get("relations") or {}).keys())
-
-    idx = json.loads(Path(args.token_index).read_text(encoding="utf-8"))
-    tokens = idx.get("tokens") or []
-    work_slug = idx.get("work_slug")
-    passage_map = {p["passage_urn"]: (int(p["token_start"]), int(p["token_end"])) for p in (idx.get("passages") or [])}
-
-    errors: list[str] = []
-
-    for i, row in enumerate(iter_jsonl(Path(args.ann)), start=1):
-        missing = sorted(REQUIRED_FIELDS - set(row.keys()))
-        if missing:
-            errors.append(f"line {i}: missing fields: {missing}")
-            continue
-
-        if row.get("work_slug") != work_slug:
-            errors.append(f"line {i}: work_slug {row.get('work_slug')} != token_index work_slug {work_slug}")
-
-        ts = int(row["token_start"])
-        te = int(row["token_end"])
-        if not (0 <= ts < te <= len(tokens)):
-            errors.append(f"line {i}: token span out of bounds: {ts}-{te} (len={len(tokens)})")
-
-        pur = row.get("passage_urn")
-        if pur in passage_map:
-            ps, pe = passage_map[pur]
-            if not (ps <= ts and te <= pe):
-                errors.append(f"line {i}: span {ts}-{te} not within passage range {ps}-{pe} for {pur}")
-        else:
-            errors.append(f"line {i}: passage_urn not found in token index: {pur}")
-
-        ptype = str(row.get("provisional_type"))
-        if ptype not in PROVISIONAL_TYPES:
-            errors.append(f"line {i}: illegal provisional_type: {ptype}")
-
-        if "mvo_type" in row:
-            mvo_type = str(row.get("mvo_type"))
-            if mvo_type not in mvo_types:
-                errors.append(f"line {i}: illegal mvo_type: {mvo_type}")
-
-        sn = str(row.get("surface_norm") or "")
-        expected = normalize_greek(str(row.get("surface") or ""))
-        if sn != expected:
-            errors.append(f"line {i}: surface_norm mismatch (got {sn!r}, expected {expected!r})")
-
-        if args.strict_surface:
-            expected_surface = " ".join(tokens[ts:te])
-            if str(row.get("surface")) != expected_surface:
-                errors.append(f"line {i}: surface mismatch (got {row.get('surface')!r}, expected {expected_surface!r})")
-
-        rel_objs = row.get("relations")
-        if rel_objs is not None:
-            if not isinstance(rel_objs, list):
-                errors.append(f"line {i}: relations must be a list")
+    max_errors = args.max_errors or None
+
+    all_paths = expand_ann_paths(args.ann)
+    cached: dict[Path, dict[str, Any]] = {}
+    status: dict[Path, str] = {}
+    if args.ledger:
+        ledger = load_ledger(Path(args.ledger))
+        inputs = ledger_inputs(args, max_errors)
+        file_sha = {p: sha256_file(p) for p in all_paths}
+        for p in all_paths:
+            entry = ledger["entries"].get(str(p))
+            if entry is None:
+                status[p] = "new"
+            elif entry["file_sha256"] == file_sha[p] and entry["inputs"] == inputs:
+                status[p] = "unchanged"
+                cached[p] = entry["result"]
             else:
-                for rj in rel_objs:
-                    if not isinstance(rj, dict):
-                        errors.append(f"line {i}: relation object must be dict")
-                        continue
-                    rel = str(rj.get("rel") or "")
-                    if rel and rel not in rel_names:
-                        errors.append(f"line {i}: unknown relation rel={rel}")
-
-    if errors:
-        raise SystemExit("Annotation validation failed:\n- " + "\n- ".join(errors))
-    print("OK")
+                status[p] = "changed"
+    paths = [p for p in all_paths if p not in cached]
+
+    # Shared artifacts are only parsed when something actually needs validating.
+    ctx = load_context(Path(args.mvo), Path(args.relations), Path(args.token_index), keep_tokens=args.strict_surface) if paths else None
+    if ctx is not None and args.workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(
+            max_workers=min(args.workers, len(paths)),
+            initializer=_init_worker,
+            initargs=(ctx, args.guidelines_phase, args.strict_guidelines),
+        ) as ex:
+            results = list(ex.map(_validate_in_worker, [str(p) for p in paths], [max_errors] * len(paths)))
+    else:
+        results = []
+        for p in paths:
+            assert ctx is not None
+            engine = build_engine(ctx, args.guidelines_phase, args.strict_guidelines)
+            results.append({**validate_file(engine, p, max_errors), "rules": engine.stats()})
+    rule_stats = merge_stats(r.pop("rules") for r in results)
+
+    if args.ledger:
+        for p, r in zip(paths, results):
+            ledger["entries"][str(p)] = {"file_sha256": file_sha[p], "inputs": inputs, "result": r}
+        ledger["entries"] = dict(sorted(ledger["entries"].items()))
+        write_json(Path(args.ledger), ledger)
+        fresh = dict(zip(paths, results))
+        results = [{**(fresh[p] if p in fresh else cached[p]), "ledger_status": status[p]} for p in all_paths]
+
+    if args.summary_json:
+        write_json(
+            Path(args.summary_json),
+            {
+                "ok": not any(r["error_count"] for r in results),
+                "token_index": args.token_index,
+                "total_rows": sum(r["rows"] for r in results),
+                "total_errors": sum(r["error_count"] for r in results),
+                "total_warnings": sum(r["warning_count"] for r in results),
+                "files": results,
+                "rules": rule_stats,
+            },
+        )
+    if args.rule_stats:
+        print("RULES:")
+        for line in format_stats(rule_stats):
+            print(f"- {line}")
+
+    warnings: list[str] = []
+    lines: list[str] = []
+    for r in results:
+        prefix = f"{r['path']}: " if len(results) > 1 else ""
+        # Unchanged ledger entries re-report errors (they still fail the run) but not warnings.
+        if r.get("ledger_status") != "unchanged":
+            warnings.extend(prefix + w for w in r["warnings"])
+        lines.extend(prefix + e for e in r["errors"])
+        if r["truncated"]:
+            lines.append(f"{prefix}... {r['error_count'] - len(r['errors'])} more errors (raise --max-errors)")
+    if warnings:
+        print("WARN:")
+        for w in warnings:
+            print(f"- {w}")
+    if lines:
+        raise SystemExit("Annotation validation failed:\n- " + "\n- ".join(lines))
+    if args.ledger:
+        n_skipped = sum(1 for s in status.values() if s == "unchanged")
+        print(f"OK ({len(paths)} validated, {n_skipped} unchanged)")
+    else:
+        print("OK" if len(results) == 1 else f"OK ({len(results)} files, {sum(r['rows'] for r in results)} rows)")
 
 
 if __name__ == "__main__":
     main()
-
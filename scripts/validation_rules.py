@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable
+
+import yaml
+
+from ner_ontology_utils import PROVISIONAL_TYPES, normalize_greek, read_json
+
+
+# One engine pass per file: every rule sees each row once, normalization is shared
+# across rules via normalize_cached, and per-rule hits/time land in the report.
+
+REQUIRED_FIELDS = {
+    "work_urn",
+    "passage_urn",
+    "work_slug",
+    "token_start",
+    "token_end",
+    "surface",
+    "surface_norm",
+    "provisional_type",
+    "certainty",
+    "annotator_id",
+    "timestamp",
+}
+
+# Bump whenever a rule's logic or message changes: it invalidates validation ledger entries.
+VALIDATOR_VERSION = "rules_v2"
+
+CERTAINTY_ALLOWED = {"low", "med", "high"}
+GUIDELINE_PHASES = ("open_coding", "gold")
+
+
+# Surface strings repeat heavily across mention files (same lemma, many spans).
+normalize_cached = lru_cache(maxsize=1 << 16)(normalize_greek)
+
+
+def load_yaml(path: Path) -> dict[str, Any]:
+    data = yaml.safe_load(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected YAML mapping at top level")
+    return data
+
+
+def is_numeric_certainty(value: Any) -> bool:
+    try:
+        f = float(value)
+    except Exception:
+        return False
+    return 0.0 <= f <= 1.0
+
+
+@dataclass
+class ValidationContext:
+    # Shared artifacts, loaded once per invocation (and shipped once to each worker).
+    mvo_types: set[str]
+    rel_names: set[str]
+    work_slug: Any
+    n_tokens: int
+    passage_map: dict[str, tuple[int, int]]
+    tokens: list[str] | None  # only kept for --strict-surface
+
+
+def load_context(mvo_path: Path, relations_path: Path, token_index_path: Path, *, keep_tokens: bool = False) -> ValidationContext:
+    mvo = load_yaml(mvo_path)
+    rels = load_yaml(relations_path)
+    idx = read_json(token_index_path)
+    tokens = idx.get("tokens") or []
+    return ValidationContext(
+        mvo_types=set((mvo.get("types") or {}).keys()),
+        rel_names=set((rels.get("relations") or {}).keys()),
+        work_slug=idx.get("work_slug"),
+        n_tokens=len(tokens),
+        passage_map={p["passage_urn"]: (int(p["token_start"]), int(p["token_end"])) for p in (idx.get("passages") or [])},
+        tokens=tokens if keep_tokens else None,
+    )
+
+
+class Rule:
+    # Subclasses set `name` and implement check(); `fatal` rules stop the row on a hit
+    # (later rules assume their fields exist). level is "error" or "warning".
+    name = "rule"
+    fatal = False
+
+    def __init__(self, ctx: ValidationContext | None = None, *, level: str = "error") -> None:
+        self.ctx = ctx
+        self.level = level
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        raise NotImplementedError
+
+
+class RequiredFieldsRule(Rule):
+    name = "schema.required_fields"
+    fatal = True
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        missing = sorted(REQUIRED_FIELDS - row.keys())
+        return [f"missing fields: {missing}"] if missing else []
+
+
+class WorkSlugRule(Rule):
+    name = "schema.work_slug"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        if row.get("work_slug") != self.ctx.work_slug:
+            return [f"work_slug {row.get('work_slug')} != token_index work_slug {self.ctx.work_slug}"]
+        return []
+
+
+class TokenBoundsRule(Rule):
+    name = "bounds.token_span"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        ts = int(row["token_start"])
+        te = int(row["token_end"])
+        if not (0 <= ts < te <= self.ctx.n_tokens):
+            return [f"token span out of bounds: {ts}-{te} (len={self.ctx.n_tokens})"]
+        return []
+
+
+class PassageBoundsRule(Rule):
+    name = "bounds.passage"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        pur = row.get("passage_urn")
+        if pur not in self.ctx.passage_map:
+            return [f"passage_urn not found in token index: {pur}"]
+        ts = int(row["token_start"])
+        te = int(row["token_end"])
+        ps, pe = self.ctx.passage_map[pur]
+        if not (ps <= ts and te <= pe):
+            return [f"span {ts}-{te} not within passage range {ps}-{pe} for {pur}"]
+        return []
+
+
+class ProvisionalTypeRule(Rule):
+    name = "schema.provisional_type"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        ptype = str(row.get("provisional_type"))
+        return [f"illegal provisional_type: {ptype}"] if ptype not in PROVISIONAL_TYPES else []
+
+
+class GuidelineProvisionalTypeRule(ProvisionalTypeRule):
+    # validate_guidelines.py wording: a missing value is reported as '' (not None), repr-quoted.
+    def check(self, row: dict[str, Any]) -> list[str]:
+        ptype = str(row.get("provisional_type") or "")
+        return [f"illegal provisional_type={ptype!r}"] if ptype not in PROVISIONAL_TYPES else []
+
+
+class MvoTypeRule(Rule):
+    name = "schema.mvo_type"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        if "mvo_type" in row:
+            mvo_type = str(row.get("mvo_type"))
+            if mvo_type not in self.ctx.mvo_types:
+                return [f"illegal mvo_type: {mvo_type}"]
+        return []
+
+
+class SurfaceNormRule(Rule):
+    name = "surface_norm"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        sn = str(row.get("surface_norm") or "")
+        expected = normalize_cached(str(row.get("surface") or ""))
+        return [f"surface_norm mismatch (got {sn!r}, expected {expected!r})"] if sn != expected else []
+
+
+class SurfaceTextRule(Rule):
+    name = "bounds.surface_text"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        ts = int(row["token_start"])
+        te = int(row["token_end"])
+        expected_surface = " ".join(self.ctx.tokens[ts:te])
+        if str(row.get("surface")) != expected_surface:
+            return [f"surface mismatch (got {row.get('surface')!r}, expected {expected_surface!r})"]
+        return []
+
+
+class RelationNamesRule(Rule):
+    name = "relations.names"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        rel_objs = row.get("relations")
+        if rel_objs is None:
+            return []
+        if not isinstance(rel_objs, list):
+            return ["relations must be a list"]
+        out: list[str] = []
+        for rj in rel_objs:
+            if not isinstance(rj, dict):
+                out.append("relation object must be dict")
+                continue
+            rel = str(rj.get("rel") or "")
+            if rel and rel not in self.ctx.rel_names:
+                out.append(f"unknown relation rel={rel}")
+        return out
+
+
+class CertaintyRule(Rule):
+    name = "guidelines.certainty"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        certainty = row.get("certainty")
+        ok = certainty in CERTAINTY_ALLOWED if isinstance(certainty, str) else is_numeric_certainty(certainty)
+        return [] if ok else [f"illegal certainty={certainty!r} (expected low|med|high or 0..1)"]
+
+
+class RelationsPresentRule(Rule):
+    name = "guidelines.relations_present"
+
+    def __init__(self, ctx: ValidationContext | None = None, *, level: str = "warning", phase: str = "open_coding") -> None:
+        super().__init__(ctx, level=level)
+        self.phase = phase
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        if row.get("relations"):
+            return [f"relations present in {self.phase} (guidelines: avoid unless trivial)"]
+        return []
+
+
+class LowCertaintyNotesRule(Rule):
+    name = "guidelines.low_certainty_notes"
+
+    def check(self, row: dict[str, Any]) -> list[str]:
+        if row.get("certainty") == "low" and not str(row.get("notes") or "").strip():
+            return ["certainty=low but notes missing/empty (guidelines: add brief note)"]
+        return []
+
+
+def schema_rules(ctx: ValidationContext) -> list[Rule]:
+    rules: list[Rule] = [
+        RequiredFieldsRule(ctx),
+        WorkSlugRule(ctx),
+        TokenBoundsRule(ctx),
+        PassageBoundsRule(ctx),
+        ProvisionalTypeRule(ctx),
+        MvoTypeRule(ctx),
+        SurfaceNormRule(ctx),
+    ]
+    if ctx.tokens is not None:
+        rules.append(SurfaceTextRule(ctx))
+    rules.append(RelationNamesRule(ctx))
+    return rules
+
+
+def guideline_rules(phase: str, *, strict: bool, with_shared: bool = True) -> list[Rule]:
+    # with_shared=False drops the checks schema_rules() already runs (provisional_type, surface_norm).
+    rules: list[Rule] = [GuidelineProvisionalTypeRule()] if with_shared else []
+    rules.append(CertaintyRule())
+    if with_shared:
+        rules.append(SurfaceNormRule())
+    rules.append(RelationsPresentRule(phase=phase))
+    rules.append(LowCertaintyNotesRule(level="error" if strict else "warning"))
+    return rules
+
+
+class RuleEngine:
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self.rules = list(rules)
+        self.hits = {r.name: 0 for r in self.rules}
+        self.seconds = {r.name: 0.0 for r in self.rules}
+        self.rows = 0
+
+    def check_row(self, row: dict[str, Any]) -> list[tuple[Rule, str]]:
+        self.rows += 1
+        found: list[tuple[Rule, str]] = []
+        clock = time.perf_counter
+        for rule in self.rules:
+            t0 = clock()
+            msgs = rule.check(row)
+            self.seconds[rule.name] += clock() - t0
+            if msgs:
+                self.hits[rule.name] += len(msgs)
+                found.extend((rule, m) for m in msgs)
+                if rule.fatal:
+                    break
+        return found
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            r.name: {"level": r.level, "hits": self.hits[r.name], "seconds": round(self.seconds[r.name], 6)}
+            for r in self.rules
+        }
+
+
+def merge_stats(parts: Iterable[dict[str, dict[str, Any]]]) -> dict[str, dict[str, Any]]:
+    out: dict[str, dict[str, Any]] = {}
+    for part in parts:
+        for name, s in part.items():
+            cur = out.setdefault(name, {"level": s["level"], "hits": 0, "seconds": 0.0})
+            cur["hits"] += s["hits"]
+            cur["seconds"] = round(cur["seconds"] + s["seconds"], 6)
+    return out
+
+
+def format_stats(stats: dict[str, dict[str, Any]]) -> list[str]:
+    # Costliest rule first.
+    ordered = sorted(stats.items(), key=lambda kv: (-kv[1]["seconds"], kv[0]))
+    return [f"{name}: hits={s['hits']} time={s['seconds'] * 1000:.1f}ms" for name, s in ordered]
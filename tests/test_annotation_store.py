@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+
+
+def row(book: int, ts: int, ptype: str, annotator_id: str, **extra: object) -> dict[str, object]:
+    out: dict[str, object] = {
+        "work_urn": WORK_URN,
+        "work_slug": "w",
+        "passage_urn": f"{WORK_URN}:{book}.1.1",
+        "token_start": ts,
+        "token_end": ts + 1,
+        "surface": "ὕδωρ",
+        "surface_norm": "υδωρ",
+        "provisional_type": ptype,
+        "certainty": "med",
+        "annotator_id": annotator_id,
+        "timestamp": "2000-01-01T00:00:00Z",
+    }
+    out.update(extra)
+    return out
+
+
+def store(*args: str) -> None:
+    subprocess.check_call(["python3", str(SCRIPTS / "annotation_store.py"), *args], cwd=str(REPO_ROOT), stdout=subprocess.DEVNULL)
+
+
+def read_jsonl(path: Path) -> list[dict[str, object]]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+class AnnotationStoreTest(unittest.TestCase):
+    def test_roundtrip_and_indexed_queries(self) -> None:
+        a_rows = [row(3, 10, "MATERIAL", "A"), row(3, 12, "QUALITY", "A"), row(4, 50, "MATERIAL", "A"), row(3, 14, "ACTION", "A")]
+        b_rows = [row(3, 10, "MATERIAL", "B"), row(3, 12, "MATERIAL", "B"), row(4, 51, "MATERIAL", "B")]
+        linked = [row(3, 10, "MATERIAL", "X", entity_id="ent_a", unknown_key=[1, 2]), row(4, 50, "MATERIAL", "X", entity_id="ent_b")]
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            db = str(tmp / "store.sqlite")
+            for name, rows in (("A", a_rows), ("B", b_rows), ("linked", linked)):
+                src = tmp / f"{name}.jsonl"
+                src.write_text(
+                    "".join(json.dumps(r, ensure_ascii=False, sort_keys=True, separators=(",", ":")) + "\n" for r in rows),
+                    encoding="utf-8",
+                )
+                store("import", "--db", db, "--dataset", name, "--jsonl", str(src))
+
+            store("export", "--db", db, "--dataset", "linked", "--out", str(tmp / "linked_out.jsonl"))
+            self.assertEqual((tmp / "linked_out.jsonl").read_bytes(), (tmp / "linked.jsonl").read_bytes())
+
+            store("query", "--db", db, "--entity-id", "ent_a", "--out", str(tmp / "q.jsonl"))
+            self.assertEqual(read_jsonl(tmp / "q.jsonl"), [linked[0]])
+
+            store("disagreements", "--db", db, "--a", "A", "--b", "B", "--passage-prefix", f"{WORK_URN}:3.", "--out", str(tmp / "d.jsonl"))
+            got = [(d["reason"], (d["a"] or d["b"])["token_start"]) for d in read_jsonl(tmp / "d.jsonl")]
+            self.assertEqual(got, [("missing_in_B", 14), ("type_mismatch", 12)])
+
+    def test_linker_and_review_queue_read_the_same_rows_from_the_store(self) -> None:
+        rows = [
+            row(4, 3, "MATERIAL", "A", surface_norm="μελι"),
+            row(3, 12, "MATERIAL", "A", token_end=15),
+            row(3, 10, "MATERIAL", "A", token_end=13, certainty="low"),
+            row(3, 12, "ACTION", "A", token_end=15),
+            row(3, 20, "PLACE", "A", surface_norm="αγνωστον"),
+        ]
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "lex").mkdir()
+            (tmp / "lex" / "materials.tsv").write_text(
+                "entity_id\tpreferred_label\tvariant\tvariant_norm\tnotes\nent_water\tὕδωρ\tὕδωρ\tυδωρ\t\nent_meli\tμέλι\tμέλι\tμελι\t\n",
+                encoding="utf-8",
+            )
+            (tmp / "idx.json").write_text(json.dumps({"tokens": [f"t{i}" for i in range(40)]}), encoding="utf-8")
+            (tmp / "in.jsonl").write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+            db = str(tmp / "store.sqlite")
+            store("import", "--db", db, "--dataset", "gold", "--jsonl", str(tmp / "in.jsonl"))
+
+            outputs = {}
+            for name, source in (("jsonl", ("--in", str(tmp / "in.jsonl"))), ("store", ("--store", db, "--dataset", "gold"))):
+                for script, args in (
+                    ("link_mentions.py", ("--lexicons", str(tmp / "lex"), "--out", str(tmp / f"{name}_linked.jsonl"), "--unlinked", str(tmp / f"{name}_unlinked.jsonl"))),
+                    ("make_review_queue.py", ("--token-index", str(tmp / "idx.json"), "--out", str(tmp / f"{name}_queue.jsonl"))),
+                ):
+                    subprocess.check_call(["python3", str(SCRIPTS / script), *source, *args], cwd=str(REPO_ROOT))
+                outputs[name] = [(tmp / f"{name}_{kind}.jsonl").read_bytes() for kind in ("linked", "unlinked", "queue")]
+
+        self.assertEqual(outputs["store"], outputs["jsonl"])
+        linked, _, queue = outputs["store"]
+        self.assertEqual(len(linked.splitlines()), 3)
+        self.assertEqual(len(queue.splitlines()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import csv
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+
+def gold_row(surface: str, norm: str, ptype: str = "MATERIAL") -> dict:
+    return {"surface": surface, "surface_norm": norm, "provisional_type": ptype}
+
+
+def read_tsv(path: Path) -> list[dict[str, str]]:
+    with path.open("r", encoding="utf-8") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+class BootstrapEntitiesTest(unittest.TestCase):
+    def test_incremental_keeps_rows_and_reports_additions(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            entities = tmp / "entities"
+            lexicons = tmp / "lexicons"
+
+            def write_gold(rows: list[dict]) -> None:
+                (tmp / "gold.jsonl").write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+
+            def run(script: str, *args: str) -> None:
+                subprocess.run(["python3", str(SCRIPTS / script), *args], cwd=str(REPO_ROOT), check=True, capture_output=True)
+
+            write_gold([gold_row("μέλι", "μελι"), gold_row("θερμόν", "θερμον", "QUALITY")])
+            run("bootstrap_entities_from_gold.py", "--gold", str(tmp / "gold.jsonl"), "--out-dir", str(entities))
+            run("build_lexicons.py", "--entities", str(entities), "--out-dir", str(lexicons))
+
+            # Curator edits: a note on μέλι, plus a variant that dedup moved onto it.
+            materials = read_tsv(entities / "materials.tsv")
+            materials[0]["notes"] = "checked"
+            with (entities / "materials.tsv").open("w", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=list(materials[0]), delimiter="\t")
+                w.writeheader()
+                w.writerows(materials)
+            with (lexicons / "materials.tsv").open("a", encoding="utf-8") as f:
+                f.write(f"{materials[0]['entity_id']}\tμέλι\tμέλιτος\tμελιτος\t\n")
+            properties_before = (entities / "properties.tsv").read_bytes()
+            properties_lex_mtime = (lexicons / "properties.tsv").stat().st_mtime_ns
+
+            write_gold([gold_row("μέλι", "μελι"), gold_row("μέλιτος", "μελιτος"), gold_row("ὕδωρ", "υδωρ"), gold_row("θερμόν", "θερμον", "QUALITY")])
+            run(
+                "bootstrap_entities_from_gold.py",
+                *("--gold", str(tmp / "gold.jsonl"), "--out-dir", str(entities)),
+                *("--incremental", "--lexicons", str(lexicons), "--changes", str(tmp / "changes.json")),
+            )
+            changes = json.loads((tmp / "changes.json").read_text(encoding="utf-8"))
+            run("build_lexicons.py", "--entities", str(entities), "--out-dir", str(lexicons), "--changes", str(tmp / "changes.json"))
+
+            materials = read_tsv(entities / "materials.tsv")
+            self.assertEqual([(r["preferred_label_norm"], r["notes"]) for r in materials], [("μελι", "checked"), ("υδωρ", "")])
+            self.assertEqual(changes["changed_files"], ["materials.tsv"])
+            self.assertEqual(changes["added"], {"materials.tsv": [materials[1]["entity_id"]]})
+            self.assertEqual((entities / "properties.tsv").read_bytes(), properties_before)
+            self.assertEqual((lexicons / "properties.tsv").stat().st_mtime_ns, properties_lex_mtime)
+            self.assertEqual({r["variant_norm"] for r in read_tsv(lexicons / "materials.tsv")}, {"μελι", "υδωρ"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+PASSAGE = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1:1.1"
+
+
+def span(ts: int, te: int, **extra: object) -> dict[str, object]:
+    return {"work_slug": "w", "passage_urn": PASSAGE, "token_start": ts, "token_end": te, "annotator_id": "A", **extra}
+
+
+def write_jsonl(path: Path, rows: list[dict[str, object]]) -> None:
+    path.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+
+
+class CheckIntegrityTest(unittest.TestCase):
+    def test_reports_dangling_and_duplicate_references(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "entities").mkdir()
+            (tmp / "entities" / "materials.tsv").write_text(
+                "entity_id\tmvo_type\tpreferred_label\tpreferred_label_norm\tnotes\nent_m\tMATERIAL\tx\tx\t\n", encoding="utf-8"
+            )
+            write_jsonl(
+                tmp / "linked.jsonl",
+                [
+                    span(0, 1, entity_id="ent_m", mvo_type="MATERIAL"),
+                    span(1, 2, entity_id="ent_m", mvo_type="PLACE"),
+                    span(2, 3, entity_id="ent_gone", mvo_type="MATERIAL"),
+                    span(0, 1, entity_id="ent_m", mvo_type="MATERIAL"),
+                ],
+            )
+            write_jsonl(tmp / "A.jsonl", [span(0, 1)])
+            write_jsonl(tmp / "B.jsonl", [span(1, 2)])
+            write_jsonl(tmp / "adj.jsonl", [span(1, 2), span(5, 6)])
+
+            reports = {}
+            for mode, extra in (("exact", []), ("bloom", ["--bloom-capacity", "1000"])):
+                proc = subprocess.run(
+                    [
+                        "python3",
+                        str(SCRIPTS / "check_integrity.py"),
+                        "--entities",
+                        str(tmp / "entities"),
+                        "--linked",
+                        str(tmp / "linked.jsonl"),
+                        "--a",
+                        str(tmp / "A.jsonl"),
+                        "--b",
+                        str(tmp / "B.jsonl"),
+                        "--adjudicated-queue",
+                        str(tmp / "adj.jsonl"),
+                        "--unique-mention-ids",
+                        str(tmp / "linked.jsonl"),
+                        "--report",
+                        str(tmp / f"{mode}.json"),
+                        *extra,
+                    ],
+                    cwd=str(REPO_ROOT),
+                    capture_output=True,
+                    text=True,
+                )
+                self.assertNotEqual(proc.returncode, 0)
+                self.assertIn("Integrity check failed", proc.stderr)
+                reports[mode] = json.loads((tmp / f"{mode}.json").read_text(encoding="utf-8"))
+
+        expected = {"dangling_adjudicated_key": 1, "dangling_entity_id": 1, "duplicate_mention_id": 1, "entity_type_mismatch": 1}
+        for mode, report in reports.items():
+            with self.subTest(mode=mode):
+                self.assertEqual(report["counts"], expected)
+                self.assertIn(":4: duplicate mention_id m_", report["examples"]["duplicate_mention_id"][0])
+                self.assertIn("5-6 not in A or B", report["examples"]["dangling_adjudicated_key"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+
+class ClusterUnlinkedTest(unittest.TestCase):
+    def test_inflections_cluster_and_suggest_nearby_entity(self) -> None:
+        norms = ["σταχυος", "σταχυος", "σταχυν", "σταχυι", "μελιτος", "μελιτι", "μελι", "οξος"]
+        queue = [{"reason": "no_match", "mvo_type": "MATERIAL", "surface_norm": n, "row": {"surface": n, "mention_id": f"m{i}"}} for i, n in enumerate(norms)]
+        queue.append({"reason": "ambiguous", "mvo_type": "MATERIAL", "surface_norm": "υδωρ", "candidates": ["e1", "e2"], "row": {}})
+
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "lex").mkdir()
+            (tmp / "lex" / "materials.tsv").write_text(
+                "entity_id\tpreferred_label\tvariant\tvariant_norm\tnotes\nent_material_stachys\tστάχυς\tστάχυς\tσταχυς\t\n", encoding="utf-8"
+            )
+            (tmp / "unlinked.jsonl").write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in queue), encoding="utf-8")
+            subprocess.run(
+                [
+                    "python3",
+                    str(SCRIPTS / "cluster_unlinked.py"),
+                    *("--unlinked", str(tmp / "unlinked.jsonl"), "--lexicons", str(tmp / "lex")),
+                    *("--out", str(tmp / "clusters.jsonl")),
+                ],
+                cwd=str(REPO_ROOT),
+                check=True,
+                capture_output=True,
+            )
+            rows = [json.loads(x) for x in (tmp / "clusters.jsonl").read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual(
+            [(r["representative"], sorted(v["surface_norm"] for v in r["variants"]), r["frequency"]) for r in rows],
+            [
+                ("σταχυος", ["σταχυι", "σταχυν", "σταχυος"], 4),
+                ("μελι", ["μελι", "μελιτι", "μελιτος"], 3),
+                ("οξος", ["οξος"], 1),
+            ],
+        )
+        self.assertEqual(rows[0]["suggested_entity_id"], "ent_material_stachys")
+        self.assertEqual(rows[0]["mention_ids"], ["m0", "m1", "m2", "m3"])
+        self.assertEqual(rows[1]["suggested_entity_id"], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+sys.path.insert(0, str(SCRIPTS))
+from codex_exec_jsonl import ResponseCache  # noqa: E402
+
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+
+# Stand-in for `codex exec`: reads the shard manifest named in the prompt and answers one
+# mention per passage (or echoes FAKE_CODEX_REPLY for plain prompts). Logs each call; fails
+# the first call per shard when FAKE_CODEX_FLAKY is set; FAKE_CODEX_STREAM_BAD streams junk and hangs.
+FAKE_CODEX = r"""
+import json, os, re, sys, time
+from pathlib import Path
+
+args = sys.argv[1:]
+out = Path(args[args.index("--output-last-message") + 1])
+prompt = sys.stdin.read()
+with open(os.environ["FAKE_CODEX_LOG"], "a", encoding="utf-8") as f:
+    f.write(prompt[:20].replace("\n", " ") + "\n")
+if os.environ.get("FAKE_CODEX_STREAM_BAD"):
+    for i in range(50):
+        print(json.dumps({"passage_urn": "elsewhere", "token_start": i, "token_end": i + 1}), flush=True)
+    time.sleep(60)
+if "FAKE_CODEX_REPLY" in os.environ:
+    out.write_text(os.environ["FAKE_CODEX_REPLY"], encoding="utf-8")
+    sys.exit(0)
+manifest = re.search(r"SHARD MANIFEST: (\S+)", prompt).group(1)
+marker = Path(manifest + ".failed_once")
+if os.environ.get("FAKE_CODEX_FLAKY") and not marker.exists():
+    marker.write_text("", encoding="utf-8")
+    sys.exit(1)
+annotator = re.search(r"ROLE: OpenCoder \(Annotator (\w)\)", prompt).group(1)
+rows = [
+    {"passage_urn": it["passage_urn"], "token_start": it["token_start"], "token_end": it["token_start"] + 1, "annotator_id": annotator}
+    for it in json.loads(Path(manifest).read_text(encoding="utf-8"))["items"]
+]
+out.write_text("".join(json.dumps(r) + "\n" for r in reversed(rows)), encoding="utf-8")
+"""
+
+
+def write_fake_codex(tmp: Path) -> Path:
+    fake = tmp / "codex"
+    fake.write_text(f"#!{sys.executable}\n{FAKE_CODEX}", encoding="utf-8")
+    fake.chmod(0o755)
+    return fake
+
+
+def calls(log: Path) -> int:
+    return len(log.read_text(encoding="utf-8").splitlines()) if log.exists() else 0
+
+
+def read_rows(path: Path) -> list[dict[str, object]]:
+    return [json.loads(x) for x in path.read_text(encoding="utf-8").splitlines()]
+
+
+class CodexOpenCodingTest(unittest.TestCase):
+    def orchestrate(self, tmp: Path, manifest: Path, out_dir: Path, **env: str) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            [
+                "python3",
+                str(SCRIPTS / "codex_open_coding.py"),
+                *("--manifest", str(manifest), "--out-dir", str(out_dir), "--cache-dir", str(tmp / "cache")),
+                *("--codex-bin", str(tmp / "codex"), "--shard-tokens", "20", "--concurrency", "3", "--backoff", "0"),
+            ],
+            cwd=str(REPO_ROOT),
+            capture_output=True,
+            text=True,
+            env={**os.environ, "FAKE_CODEX_LOG": str(tmp / "calls.log"), **env},
+        )
+
+    def test_shards_retry_merge_and_resume(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            write_fake_codex(tmp)
+            items = [
+                {"work_slug": "w", "work_urn": WORK_URN, "passage_urn": f"{WORK_URN}:1.{i}", "token_start": 10 * i, "token_end": 10 * i + 10}
+                for i in range(5)
+            ]
+            (tmp / "manifest.json").write_text(json.dumps({"manifest_version": 1, "items": items}), encoding="utf-8")
+
+            proc = self.orchestrate(tmp, tmp / "manifest.json", tmp / "open_coding", FAKE_CODEX_FLAKY="1")
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            self.assertIn("OK (3 shards x 2 annotators; 6 run, 0 resumed, 0 from cache)", proc.stdout)
+            # Every shard failed once and succeeded on retry.
+            self.assertEqual(calls(tmp / "calls.log"), 12)
+            merged = {a: read_rows(tmp / "open_coding" / f"{a}.jsonl") for a in "AB"}
+
+            proc = self.orchestrate(tmp, tmp / "manifest.json", tmp / "open_coding")
+            self.assertIn("OK (3 shards x 2 annotators; 0 run, 6 resumed, 0 from cache)", proc.stdout)
+            self.assertEqual(calls(tmp / "calls.log"), 12)
+
+        for annotator, rows in merged.items():
+            self.assertEqual([r["token_start"] for r in rows], [0, 10, 20, 30, 40])
+            self.assertEqual({r["annotator_id"] for r in rows}, {annotator})
+
+    def test_new_sample_of_same_size_does_not_resume(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            write_fake_codex(tmp)
+
+            def write_manifest(lo: int) -> None:
+                items = [
+                    {"work_slug": "w", "work_urn": WORK_URN, "passage_urn": f"{WORK_URN}:1.{i}", "token_start": 10 * i, "token_end": 10 * i + 10}
+                    for i in range(lo, lo + 5)
+                ]
+                (tmp / "manifest.json").write_text(json.dumps({"manifest_version": 1, "items": items}), encoding="utf-8")
+
+            write_manifest(0)
+            self.orchestrate(tmp, tmp / "manifest.json", tmp / "open_coding")
+            write_manifest(5)
+            proc = self.orchestrate(tmp, tmp / "manifest.json", tmp / "open_coding")
+            self.assertIn("OK (3 shards x 2 annotators; 6 run, 0 resumed, 0 from cache)", proc.stdout)
+            rows = read_rows(tmp / "open_coding" / "A.jsonl")
+
+        self.assertEqual([r["token_start"] for r in rows], [50, 60, 70, 80, 90])
+
+    def test_identical_normalized_passages_reuse_cached_rows(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            write_fake_codex(tmp)
+            for slug, offset, tokens in (("w1", 0, ["Μέλι", "καὶ"]), ("w2", 100, ["μέλι", "και"])):
+                urn = f"urn:cts:greekLit:tlg0000.{slug}.1st1K-grc1"
+                item = {
+                    "work_slug": slug,
+                    "work_urn": urn,
+                    "passage_urn": f"{urn}:1.1",
+                    "token_start": offset,
+                    "token_end": offset + 2,
+                    "tokens": tokens,
+                    "tokens_norm": ["μελι", "και"],
+                }
+                (tmp / f"{slug}.json").write_text(json.dumps({"manifest_version": 1, "items": [item]}), encoding="utf-8")
+
+            self.assertIn("2 run", self.orchestrate(tmp, tmp / "w1.json", tmp / "w1").stdout)
+            proc = self.orchestrate(tmp, tmp / "w2.json", tmp / "w2")
+            self.assertIn("0 run, 0 resumed, 2 from cache", proc.stdout)
+            self.assertEqual(calls(tmp / "calls.log"), 2)
+            rows = read_rows(tmp / "w2" / "A.jsonl")
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["work_slug"], rows[0]["token_start"], rows[0]["token_end"]), ("w2", 100, 101))
+        self.assertEqual((rows[0]["surface"], rows[0]["surface_norm"]), ("μέλι", "μελι"))
+        self.assertTrue(str(rows[0]["mention_id"]).startswith("m_"))
+
+    def test_exec_cache_keys_on_referenced_inputs(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            write_fake_codex(tmp)
+            (tmp / "inputs.json").write_text("{}", encoding="utf-8")
+            (tmp / "prompt.md").write_text("Annotate inputs.json\n", encoding="utf-8")
+            env = {**os.environ, "FAKE_CODEX_LOG": str(tmp / "calls.log"), "FAKE_CODEX_REPLY": '{"x": 1}\n', "PATH": f"{tmp}:{os.environ['PATH']}"}
+
+            def run(*extra: str) -> None:
+                subprocess.run(
+                    [
+                        "python3",
+                        str(SCRIPTS / "codex_exec_jsonl.py"),
+                        *("--prompt", str(tmp / "prompt.md"), "--out", str(tmp / "out.jsonl"), "--cd", str(tmp)),
+                        *("--cache-dir", str(tmp / "cache"), *extra),
+                    ],
+                    cwd=str(REPO_ROOT),
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                )
+
+            run()
+            run()
+            self.assertEqual(calls(tmp / "calls.log"), 1)
+            (tmp / "inputs.json").write_text('{"changed": true}', encoding="utf-8")
+            run()
+            run("--refresh")
+            self.assertEqual(calls(tmp / "calls.log"), 3)
+            self.assertEqual((tmp / "out.jsonl").read_text(encoding="utf-8"), '{"x": 1}\n')
+
+            # Least recently used entries go first once the cache exceeds its size.
+            cache = ResponseCache(tmp / "lru", max_bytes=100)
+            for i, key in enumerate(("aa1", "bb2", "cc3")):
+                cache.put(key, "0123456789")
+                os.utime(cache.path(key), (1000 + i, 1000 + i))
+            self.assertIsNotNone(cache.get("aa1"))
+            cache.max_bytes = 25
+            cache.evict()
+            self.assertEqual(sorted(p.stem for p in (tmp / "lru").glob("*/*.jsonl")), ["aa1", "cc3"])
+
+            # Writes keep a running size: the directory is scanned once, and again only to evict.
+            cache = ResponseCache(tmp / "batch", max_bytes=45)
+            scans = 0
+            entries = cache.entries
+
+            def counting_entries() -> list:
+                nonlocal scans
+                scans += 1
+                return entries()
+
+            cache.entries = counting_entries  # type: ignore[method-assign]
+            cache.put_many({f"k{i:02d}": "0123456789" for i in range(4)})
+            cache.put("k01", "01234")
+            self.assertEqual((scans, cache.total_bytes()), (1, 35))
+            cache.put_many({"k10": "0123456789", "k11": "0123456789"})
+            self.assertEqual(scans, 2)
+            self.assertLessEqual(cache.total_bytes(), 40)
+            self.assertEqual(cache.total_bytes(), sum(p.stat().st_size for p in (tmp / "batch").glob("*/*.jsonl")))
+
+    def test_bad_stream_aborts_shard_early(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            write_fake_codex(tmp)
+            item = {"work_slug": "w", "work_urn": WORK_URN, "passage_urn": f"{WORK_URN}:1.1", "token_start": 0, "token_end": 5}
+            (tmp / "manifest.json").write_text(json.dumps({"manifest_version": 1, "items": [item]}), encoding="utf-8")
+            start = time.monotonic()
+            proc = subprocess.run(
+                [
+                    "python3",
+                    str(SCRIPTS / "codex_open_coding.py"),
+                    *("--manifest", str(tmp / "manifest.json"), "--out-dir", str(tmp / "oc"), "--no-cache", "--annotators", "A"),
+                    *("--codex-bin", str(tmp / "codex"), "--retries", "0", "--min-lines", "5"),
+                ],
+                cwd=str(REPO_ROOT),
+                capture_output=True,
+                text=True,
+                env={**os.environ, "FAKE_CODEX_LOG": str(tmp / "calls.log"), "FAKE_CODEX_STREAM_BAD": "1"},
+            )
+            elapsed = time.monotonic() - start
+            quarantined = read_rows(tmp / "oc" / "shards" / "A" / "shard_0000.quarantine.jsonl")
+
+        self.assertNotEqual(proc.returncode, 0)
+        self.assertIn("aborted early: 5 of 5 lines rejected", proc.stderr)
+        self.assertLess(elapsed, 30)
+        self.assertIn("not in scope", quarantined[0]["error"])
+
+    def test_exec_quarantines_and_repairs_lines_against_token_index(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            write_fake_codex(tmp)
+            passage = f"{WORK_URN}:1.1"
+            idx = {"work_slug": "w", "work_urn": WORK_URN, "tokens": ["ὕδωρ", "καὶ", "μέλι"], "passages": [{"passage_urn": passage, "token_start": 0, "token_end": 3}]}
+            (tmp / "idx.json").write_text(json.dumps(idx), encoding="utf-8")
+            (tmp / "prompt.md").write_text("Annotate.\n", encoding="utf-8")
+            reply = [
+                {"passage_urn": passage, "token_start": 0, "token_end": 0, "surface": "x", "certainty": "medium"},
+                {"passage_urn": passage, "token_start": 2, "token_end": 9},
+                "not json",
+                {"passage_urn": passage, "token_start": 2, "token_end": 3, "annotator_id": "B"},
+            ]
+            text = "".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in reply)
+            env = {**os.environ, "FAKE_CODEX_LOG": str(tmp / "calls.log"), "FAKE_CODEX_REPLY": text, "PATH": f"{tmp}:{os.environ['PATH']}"}
+            cmd = [
+                "python3",
+                str(SCRIPTS / "codex_exec_jsonl.py"),
+                *("--prompt", str(tmp / "prompt.md"), "--out", str(tmp / "out.jsonl"), "--no-cache"),
+                *("--token-index", str(tmp / "idx.json"), "--annotator-id", "A"),
+            ]
+            proc = subprocess.run([*cmd, "--max-error-rate", "0.5"], cwd=str(REPO_ROOT), env=env, capture_output=True, text=True)
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            self.assertIn("WARN: 2 of 4 lines quarantined", proc.stdout)
+            rows = read_rows(tmp / "out.jsonl")
+            quarantined = read_rows(tmp / "out.jsonl.quarantine.jsonl")
+
+            proc = subprocess.run(cmd, cwd=str(REPO_ROOT), env=env, capture_output=True, text=True)
+            self.assertIn("Codex output rejected: 2 of 4 lines rejected", proc.stderr)
+
+        self.assertEqual([q["line_no"] for q in quarantined], [2, 3])
+        self.assertEqual([(r["token_start"], r["token_end"], r["annotator_id"]) for r in rows], [(0, 1, "A"), (2, 3, "B")])
+        self.assertEqual((rows[0]["surface"], rows[0]["certainty"], rows[0]["work_slug"]), ("ὕδωρ", "med", "w"))
+        self.assertIn("FIXED_TOKEN_END", rows[0]["notes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
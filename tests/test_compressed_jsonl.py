@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import gzip
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import ner_ontology_utils as utils  # noqa: E402
+
+
+ROWS = [{"surface": "φαρμάκων", "token_start": i, "token_end": i + 1} for i in range(2000)]
+
+
+class CompressedJsonlTest(unittest.TestCase):
+    def test_gzip_roundtrip_is_deterministic(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            utils.write_jsonl(tmp / "plain.jsonl", ROWS)
+            utils.write_jsonl(tmp / "a.jsonl.gz", ROWS)
+            utils.write_jsonl(tmp / "b.jsonl.gz", ROWS)
+
+            self.assertEqual((tmp / "a.jsonl.gz").read_bytes(), (tmp / "b.jsonl.gz").read_bytes())
+            self.assertEqual(gzip.decompress((tmp / "a.jsonl.gz").read_bytes()), (tmp / "plain.jsonl").read_bytes())
+            self.assertEqual(list(utils.iter_jsonl(tmp / "a.jsonl.gz")), ROWS)
+
+            # Reads sniff content, not the suffix.
+            (tmp / "mislabelled.jsonl").write_bytes((tmp / "a.jsonl.gz").read_bytes())
+            self.assertEqual(list(utils.iter_jsonl(tmp / "mislabelled.jsonl")), ROWS)
+
+    def test_lines_split_across_blocks(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "rows.jsonl"
+            path.write_bytes(b"".join(utils.json_dumps(r).encode("utf-8") + b"\r\n\n" for r in ROWS))
+            old = utils.IO_BLOCK_SIZE
+            utils.IO_BLOCK_SIZE = 7
+            try:
+                self.assertEqual(list(utils.iter_jsonl(path)), ROWS)
+            finally:
+                utils.IO_BLOCK_SIZE = old
+
+    @unittest.skipUnless(utils.zstandard is not None, "zstandard not installed")
+    def test_zstd_roundtrip(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "rows.jsonl.zst"
+            utils.write_jsonl(path, ROWS)
+            self.assertEqual(path.read_bytes()[:4], utils.ZSTD_MAGIC)
+            self.assertEqual(list(utils.iter_jsonl(path)), ROWS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import csv
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+sys.path.insert(0, str(SCRIPTS))
+from dedup_entities import np  # noqa: E402
+
+ENTITY_HEADER = "entity_id\tmvo_type\tpreferred_label\tpreferred_label_norm\tnotes\n"
+LEXICON_HEADER = "entity_id\tpreferred_label\tvariant\tvariant_norm\tnotes\n"
+
+
+def read_tsv(path: Path) -> list[dict[str, str]]:
+    with path.open("r", encoding="utf-8") as f:
+        return list(csv.DictReader(f, delimiter="\t"))
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class DedupEntitiesTest(unittest.TestCase):
+    def test_propose_then_apply_rewrites_linked_files_and_registries(self) -> None:
+        entities = [
+            ("ent_stachys", "στάχυς", "σταχυς"),
+            ("ent_nardou_stachys", "Νάρδου στάχυς", "ναρδου σταχυς"),
+            ("ent_stachyos", "στάχυος", "σταχυος"),
+            ("ent_meli", "μέλι", "μελι"),
+        ]
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "entities").mkdir()
+            (tmp / "lexicons").mkdir()
+            (tmp / "entities" / "materials.tsv").write_text(
+                ENTITY_HEADER + "".join(f"{e}\tMATERIAL\t{label}\t{norm}\t\n" for e, label, norm in entities), encoding="utf-8"
+            )
+            (tmp / "lexicons" / "materials.tsv").write_text(
+                LEXICON_HEADER + "".join(f"{e}\t{label}\t{label}\t{norm}\t\n" for e, label, norm in entities), encoding="utf-8"
+            )
+            linked = [{"mention_id": f"m{i}", "entity_id": e} for i, e in enumerate(["ent_stachys", "ent_stachys", "ent_stachyos", "ent_nardou_stachys", "ent_meli"])]
+            (tmp / "linked.jsonl").write_text("".join(json.dumps(r) + "\n" for r in linked), encoding="utf-8")
+            queue = [{"group_id": "g", "row": {"mention_id": "m9", "entity_id": "ent_stachyos"}}]
+            (tmp / "queue.jsonl").write_text("".join(json.dumps(r) + "\n" for r in queue), encoding="utf-8")
+
+            def run(*args: str) -> None:
+                subprocess.run(["python3", str(SCRIPTS / "dedup_entities.py"), *args], cwd=str(REPO_ROOT), check=True, capture_output=True)
+
+            run("propose", "--entities", str(tmp / "entities"), "--linked", str(tmp / "linked.jsonl"), "--out", str(tmp / "proposals.jsonl"))
+            proposals = [json.loads(x) for x in (tmp / "proposals.jsonl").read_text(encoding="utf-8").splitlines()]
+            pairs = {(p["keep_entity_id"], p["merge_entity_id"]): p for p in proposals}
+            self.assertEqual(set(pairs), {("ent_stachys", "ent_stachyos"), ("ent_stachys", "ent_nardou_stachys"), ("ent_stachyos", "ent_nardou_stachys")})
+            self.assertIn("shared_stem", pairs[("ent_stachys", "ent_nardou_stachys")]["reasons"])
+
+            # The curator keeps the full name apart but merges the inflected form.
+            for p in proposals:
+                p["decision"] = "merge" if p["merge_entity_id"] == "ent_stachyos" else "reject"
+            (tmp / "proposals.jsonl").write_text("".join(json.dumps(p, ensure_ascii=False) + "\n" for p in proposals), encoding="utf-8")
+            run(
+                "apply",
+                *("--proposals", str(tmp / "proposals.jsonl"), "--entities", str(tmp / "entities"), "--lexicons", str(tmp / "lexicons")),
+                *("--linked", str(tmp / "linked.jsonl"), str(tmp / "queue.jsonl")),
+            )
+
+            rows = [json.loads(x) for x in (tmp / "linked.jsonl").read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([r["entity_id"] for r in rows], ["ent_stachys", "ent_stachys", "ent_stachys", "ent_nardou_stachys", "ent_meli"])
+            self.assertEqual(json.loads((tmp / "queue.jsonl").read_text(encoding="utf-8"))["row"]["entity_id"], "ent_stachys")
+            self.assertEqual([r["entity_id"] for r in read_tsv(tmp / "entities" / "materials.tsv")], ["ent_stachys", "ent_nardou_stachys", "ent_meli"])
+            lex = {(r["entity_id"], r["variant_norm"]) for r in read_tsv(tmp / "lexicons" / "materials.tsv")}
+            self.assertIn(("ent_stachys", "σταχυος"), lex)
+            ledger = [json.loads(x) for x in (tmp / "entities" / "merges.jsonl").read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([(m["entity_id"], m["merged_into"]) for m in ledger], [("ent_stachyos", "ent_stachys")])
+
+    def test_merge_survives_incremental_bootstrap_and_lexicon_rebuild(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            entities = tmp / "entities"
+            lexicons = tmp / "lexicons"
+
+            def write_gold(surfaces: list[str]) -> None:
+                rows = [{"surface": s, "provisional_type": "MATERIAL"} for s in surfaces]
+                (tmp / "gold.jsonl").write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+
+            def run(script: str, *args: str) -> None:
+                subprocess.run(["python3", str(SCRIPTS / script), *args], cwd=str(REPO_ROOT), check=True, capture_output=True)
+
+            def bootstrap() -> None:
+                run(
+                    "bootstrap_entities_from_gold.py",
+                    *("--gold", str(tmp / "gold.jsonl"), "--out-dir", str(entities)),
+                    *("--incremental", "--lexicons", str(lexicons), "--changes", str(tmp / "changes.json")),
+                )
+
+            write_gold(["στάχυς", "στάχυς", "στάχυος"])
+            run("bootstrap_entities_from_gold.py", "--gold", str(tmp / "gold.jsonl"), "--out-dir", str(entities))
+            run("build_lexicons.py", "--entities", str(entities), "--out-dir", str(lexicons))
+            ids = {r["preferred_label_norm"]: r["entity_id"] for r in read_tsv(entities / "materials.tsv")}
+            proposal = {"keep_entity_id": ids["σταχυς"], "keep_label": "στάχυς", "merge_entity_id": ids["σταχυος"], "merge_label": "στάχυος", "decision": "merge"}
+            (tmp / "proposals.jsonl").write_text(json.dumps(proposal, ensure_ascii=False) + "\n", encoding="utf-8")
+            run("dedup_entities.py", "apply", "--proposals", str(tmp / "proposals.jsonl"), "--entities", str(entities), "--lexicons", str(lexicons))
+
+            # A new gold entity changes materials.tsv, so its lexicon is rebuilt from the registry.
+            write_gold(["στάχυς", "στάχυς", "στάχυος", "μέλι"])
+            bootstrap()
+            run("build_lexicons.py", "--entities", str(entities), "--out-dir", str(lexicons), "--changes", str(tmp / "changes.json"))
+            bootstrap()
+
+            self.assertEqual(sorted(r["preferred_label_norm"] for r in read_tsv(entities / "materials.tsv")), ["μελι", "σταχυς"])
+            self.assertEqual(json.loads((tmp / "changes.json").read_text(encoding="utf-8"))["changed_files"], [])
+            lex = {(r["entity_id"], r["variant_norm"]) for r in read_tsv(lexicons / "materials.tsv")}
+            self.assertIn((ids["σταχυς"], "σταχυος"), lex)
+            self.assertNotIn(ids["σταχυος"], {e for e, _ in lex})
+
+
+if __name__ == "__main__":
+    unittest.main()
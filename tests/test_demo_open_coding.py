@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+sys.path.insert(0, str(SCRIPTS))
+from demo_open_coding import STEM_FAMILIES, classify_token, stem_families  # noqa: E402
+
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+
+
+class DemoOpenCodingTest(unittest.TestCase):
+    def test_stem_regex_matches_substring_scan(self) -> None:
+        types = ["θερμαινειν", "ψυχροτητα", "δραχμας", "υδωρ", "αγγειον", "ζεσαι", "πυρεθρου", "και", "", "μελιτος"]
+        for tn in types:
+            with self.subTest(tn=tn):
+                expected = {name for name, stems in STEM_FAMILIES.items() if any(s in tn for s in stems)}
+                self.assertEqual(stem_families(tn), expected)
+
+        self.assertEqual(classify_token("θερμαινειν", "θερμαινειν", "A"), ("ACTION", "high", ""))
+        self.assertEqual(classify_token("ψυχρότητα", "ψυχροτητα", "B"), ("QUALITY", "high", ""))
+        self.assertEqual(classify_token("3", "3", "A"), ("MEASURE", "med", ""))
+
+    def test_codes_every_passage_of_a_token_index(self) -> None:
+        tokens = ["ὕδωρ", "καὶ", "μέλι", "θερμόν", "δέ", "τι"]
+        idx = {
+            "work_slug": "w",
+            "work_urn": WORK_URN,
+            "tokens": tokens,
+            "tokens_norm": ["υδωρ", "και", "μελι", "θερμον", "δε", "τι"],
+            "passages": [
+                {"passage_urn": f"{WORK_URN}:1.1", "token_start": 0, "token_end": 4},
+                {"passage_urn": f"{WORK_URN}:1.2", "token_start": 4, "token_end": 6},
+            ],
+        }
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "w.json").write_text(json.dumps(idx), encoding="utf-8")
+            subprocess.run(
+                [
+                    "python3",
+                    str(SCRIPTS / "demo_open_coding.py"),
+                    *("--token-index", str(tmp / "w.json"), "--annotator-id", "A"),
+                    *("--max-mentions-per-passage", "0", "--out", str(tmp / "out.jsonl")),
+                ],
+                cwd=str(REPO_ROOT),
+                check=True,
+            )
+            rows = [json.loads(x) for x in (tmp / "out.jsonl").read_text(encoding="utf-8").splitlines()]
+
+        # Both triggers in 1.1 (no per-passage cap); 1.2 has none and falls back to its first token.
+        self.assertEqual([(r["token_start"], r["provisional_type"]) for r in rows], [(0, "MATERIAL"), (3, "QUALITY"), (4, "MATERIAL")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+LEXICON_HEADER = "entity_id\tpreferred_label\tvariant\tvariant_norm\tnotes\n"
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+
+
+class ExpandLexiconVariantsTest(unittest.TestCase):
+    def test_expands_compiles_and_tags_inflected_forms(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "lex").mkdir()
+            (tmp / "lex" / "materials.tsv").write_text(
+                LEXICON_HEADER
+                + "ent_pharmakon\tφάρμακον\tφάρμακον\tφαρμακον\t\n"
+                + "ent_oxos\tὄξος\tὄξος\tοξος\t\n"
+                + "ent_elaion\tἔλαιον\tἔλαιον\tελαιον\t\n"
+                + "ent_elaia\tἐλαία\tἐλαία\tελαια\t\n"
+                + "ent_stachys\tστάχυς\tστάχυς\tσταχυς\t\n"
+                + "ent_sperma\tσπέρμα\tσπέρμα\tσπερμα\t\n",
+                encoding="utf-8",
+            )
+            (tmp / "lex" / "properties.tsv").write_text(LEXICON_HEADER + "ent_oxous\tὀξοῦς\tὀξοῦς\tοξους\t\n", encoding="utf-8")
+            (tmp / "lex" / "places.tsv").write_text(LEXICON_HEADER + "ent_stachyos\tΣτάχυος\tΣτάχυος\tσταχυος\t\n", encoding="utf-8")
+            gold = [{"entity_id": "ent_oxos", "surface": "ὄξει", "mvo_type": "MATERIAL"}]
+            (tmp / "gold.jsonl").write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in gold), encoding="utf-8")
+
+            cmd = [
+                "python3",
+                str(SCRIPTS / "expand_lexicon_variants.py"),
+                *("--lexicons", str(tmp / "lex"), "--gold", str(tmp / "gold.jsonl")),
+                *("--out-dir", str(tmp / "expanded"), "--phrase-index", str(tmp / "expanded" / "phrase_index.json")),
+            ]
+            subprocess.run(cmd, cwd=str(REPO_ROOT), check=True, capture_output=True)
+            phrases = json.loads((tmp / "expanded" / "phrase_index.json").read_text(encoding="utf-8"))["phrases"]
+            collisions = {(c["kind"], c["variant_norm"]): c for c in map(json.loads, (tmp / "expanded" / "collisions.jsonl").read_text(encoding="utf-8").splitlines())}
+
+            self.assertEqual(phrases["φαρμακου"], [["ent_pharmakon", "MATERIAL"]])
+            self.assertEqual(phrases["του φαρμακου"], [["ent_pharmakon", "MATERIAL"]])
+            self.assertEqual(phrases["φαρμακ"], [["ent_pharmakon", "MATERIAL"]])  # elided φάρμακ’
+            self.assertEqual(phrases["οξει"], [["ent_oxos", "MATERIAL"]])  # observed in gold
+            # ὄξος generates οξους, which another type attests: the attested variant wins.
+            self.assertEqual(phrases["οξους"], [["ent_oxous", "PROPERTY"]])
+            # ἔλαιον and ἐλαία both generate ελαιων: dropped and reported; ελαια stays attested.
+            self.assertNotIn("ελαιων", phrases)
+            self.assertEqual(collisions[("generated", "ελαιων")]["entity_ids"], ["ent_elaia", "ent_elaion"])
+            # στάχυς (MATERIAL) generates σταχυος, which a PLACE attests, and vice versa.
+            shadowed = collisions[("generated_vs_attested", "σταχυος")]
+            self.assertEqual((shadowed["entity_ids"], shadowed["mvo_types"]), (["ent_stachyos", "ent_stachys"], ["MATERIAL", "PLACE"]))
+            self.assertEqual(collisions[("generated_vs_attested", "σταχυς")]["generated_entity_ids"], ["ent_stachyos"])
+            # Articles follow the slot of the form; elision only applies to the listed slots.
+            self.assertEqual(collisions[("generated", "του σταχυος")]["entity_ids"], ["ent_stachyos", "ent_stachys"])
+            self.assertIn(("generated", "τους σταχυας"), collisions)
+            self.assertEqual(phrases["του σπερματος"], [["ent_sperma", "MATERIAL"]])
+            self.assertEqual(phrases["τα σπερματα"], [["ent_sperma", "MATERIAL"]])
+            for bad in ("ο σταχυος", "της σταχυας", "ο σπερματος", "σπερμ", "σπερματ", "σπερμας"):
+                self.assertNotIn(bad, phrases)
+            self.assertEqual(phrases["ελαια"], [["ent_elaia", "MATERIAL"]])
+            self.assertIn("materials.tsv", {p.name for p in (tmp / "expanded").glob("*.tsv")})
+
+            rerun = subprocess.run(cmd, cwd=str(REPO_ROOT), check=True, capture_output=True, text=True)
+            self.assertIn("cached", rerun.stdout)
+
+            idx = {
+                "work_slug": "w",
+                "work_urn": WORK_URN,
+                "tokens": ["τοῦ", "φαρμάκου", "καὶ", "φάρμακα"],
+                "tokens_norm": ["του", "φαρμακου", "και", "φαρμακα"],
+                "passages": [{"passage_urn": f"{WORK_URN}:1.1", "token_start": 0, "token_end": 4}],
+            }
+            (tmp / "w.json").write_text(json.dumps(idx, ensure_ascii=False), encoding="utf-8")
+            subprocess.run(
+                [
+                    "python3",
+                    str(SCRIPTS / "tag_with_lexicons.py"),
+                    *("--token-index", str(tmp / "w.json"), "--phrase-index", str(tmp / "expanded" / "phrase_index.json")),
+                    *("--out", str(tmp / "auto.jsonl"), "--report", str(tmp / "report.md")),
+                ],
+                cwd=str(REPO_ROOT),
+                check=True,
+                capture_output=True,
+            )
+            rows = [json.loads(x) for x in (tmp / "auto.jsonl").read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual([(r["token_start"], r["token_end"], r["entity_id"]) for r in rows], [(0, 2, "ent_pharmakon"), (3, 4, "ent_pharmakon")])
+
+
+if __name__ == "__main__":
+    unittest.main()
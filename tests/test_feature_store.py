@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+sys.path.insert(0, str(SCRIPTS))
+from feature_store import FeatureStore, np  # noqa: E402
+from sequence_tagger import type_features  # noqa: E402
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class FeatureStoreTest(unittest.TestCase):
+    def test_rows_match_type_features_and_gather_by_type_id(self) -> None:
+        store = FeatureStore.empty()
+        self.assertEqual(store.extend(["υδωρ", "και", "υδωρ"]), 2)
+        self.assertEqual(store.extend(["και", "μελι"]), 1)
+        self.assertEqual(store.vocab, ["και", "υδωρ", "μελι"])
+
+        for i, t in enumerate(store.vocab):
+            row = store.indices[store.indptr[i] : store.indptr[i + 1]]
+            self.assertEqual({store.features[j] for j in row}, set(type_features(t)))
+
+        ids = store.ids_for(["μελι", "ξενον", "και", "μελι"])
+        self.assertEqual(ids.tolist(), [2, -1, 0, 2])
+        indptr, indices = store.gather(ids)
+        self.assertEqual(len(indptr), 5)
+        self.assertEqual(indptr[2] - indptr[1], 0)
+        self.assertEqual(indices[indptr[0] : indptr[1]].tolist(), indices[indptr[3] : indptr[4]].tolist())
+        self.assertEqual(indices[indptr[2] : indptr[3]].tolist(), store.indices[store.indptr[0] : store.indptr[1]].tolist())
+
+    def test_rebuild_only_adds_new_types(self) -> None:
+        def index(slug: str, norm: list[str]) -> dict:
+            return {"work_slug": slug, "tokens": norm, "tokens_norm": norm, "passages": []}
+
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "a.json").write_text(json.dumps(index("a", ["υδωρ", "και"])), encoding="utf-8")
+            (tmp / "b.json").write_text(json.dumps(index("b", ["και", "μελι"])), encoding="utf-8")
+            store_path = tmp / "types.npz"
+
+            def run(*paths: str) -> str:
+                cmd = ["python3", str(SCRIPTS / "feature_store.py"), "--store", str(store_path), "--type-ids-dir", str(tmp / "ids"), "--token-index", *paths]
+                return subprocess.run(cmd, cwd=str(REPO_ROOT), check=True, capture_output=True, text=True).stdout
+
+            self.assertIn("2 new types", run(str(tmp / "a.json")))
+            mtime = store_path.stat().st_mtime_ns
+            self.assertIn("unchanged", run(str(tmp / "a.json")))
+            self.assertEqual(store_path.stat().st_mtime_ns, mtime)
+
+            self.assertIn("1 new types", run(str(tmp / "a.json"), str(tmp / "b.json")))
+            store = FeatureStore.load(store_path)
+            self.assertEqual(store.vocab, ["και", "υδωρ", "μελι"])
+            self.assertEqual(np.load(tmp / "ids" / "a.npy").tolist(), [1, 0])
+            self.assertEqual(np.load(tmp / "ids" / "b.npy").tolist(), [0, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+
+class HydrateEvidenceWindowsTest(unittest.TestCase):
+    def test_resolves_top_level_and_nested_refs(self) -> None:
+        tokens = [f"t{i}" for i in range(20)]
+        rows = [
+            {"work_slug": "w", "token_start": 3, "token_end": 4, "evidence_window_ref": [0, 9]},
+            {"work_slug": "w", "a": {"token_start": 5, "evidence_window_ref": [18, 25]}, "b": None, "evidence_window_ref": [2, 4]},
+            {"work_slug": "w", "evidence_window": ["x"]},
+        ]
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "w.json").write_text(json.dumps({"work_slug": "w", "tokens": tokens}), encoding="utf-8")
+            (tmp / "in.jsonl").write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+            subprocess.check_call(
+                [
+                    "python3",
+                    str(SCRIPTS / "hydrate_evidence_windows.py"),
+                    "--in",
+                    str(tmp / "in.jsonl"),
+                    "--token-index",
+                    str(tmp),
+                    "--out",
+                    str(tmp / "out.jsonl"),
+                ],
+                cwd=str(REPO_ROOT),
+            )
+            out = [json.loads(line) for line in (tmp / "out.jsonl").read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual(out[0]["evidence_window"], tokens[0:9])
+        self.assertNotIn("evidence_window_ref", out[0])
+        self.assertEqual(out[1]["evidence_window"], ["t2", "t3"])
+        self.assertEqual(out[1]["a"]["evidence_window"], ["t18", "t19"])
+        self.assertIsNone(out[1]["b"])
+        self.assertEqual(out[2], rows[2])
+
+
+if __name__ == "__main__":
+    unittest.main()
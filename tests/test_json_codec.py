@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import ner_ontology_utils as utils  # noqa: E402
+
+
+GOLDEN = REPO_ROOT / "tests" / "fixtures" / "json" / "golden_rows.jsonl"
+
+# Must serialize to exactly the lines in GOLDEN (stdlib json.dumps, sort_keys, ensure_ascii=False, compact).
+ROWS = [
+    {"surface": "φαρμάκων", "surface_norm": "φαρμακων", "token_start": 3, "token_end": 4, "certainty": "med", "evidence_window": ["Τὰς", "τῶν", "ἁπλῶν"]},
+    {"surface": "ᾅδου", "notes": "quote \" backslash \\ slash / tab \t nl \n ctrl \x1f del \x7f ls  ", "relations": []},
+    {"z": {"b": None, "a": [True, False, {}]}, "certainty": 0.75, "int": -12, "zero": 0.0},
+    {"exp_pos": 1e16, "exp_neg": 1e-07, "huge": 2**70, "b": None},
+    {"Ω": 1, "a": 2, "É": 3, "ά": 4, "": 5},
+]
+
+
+def available_codecs() -> list[str]:
+    return [name for name in utils.JSON_CODECS if name != "orjson" or utils.orjson is not None]
+
+
+class JsonCodecTest(unittest.TestCase):
+    def test_backends_match_golden_bytes(self) -> None:
+        golden = GOLDEN.read_bytes().splitlines()
+        for name in available_codecs():
+            codec = utils.get_json_codec(name)
+            with self.subTest(codec=name):
+                self.assertEqual([codec.dumps(r) for r in ROWS], golden)
+                self.assertEqual([codec.loads(line) for line in golden], ROWS)
+
+    def test_only_divergent_floats_fall_back_to_stdlib(self) -> None:
+        # Hex ids and nulls are encoded identically; only exponent/non-finite floats differ.
+        self.assertFalse(utils._has_divergent_float({"entity_id": "ent_material_1e5a0e7", "b": None, "x": [0.75, 1e15, -0.0]}))
+        for value in (1e16, 1e-07, float("nan"), float("inf")):
+            with self.subTest(value=value):
+                self.assertTrue(utils._has_divergent_float({"a": [{"b": value}]}))
+
+    def test_parallel_decoder_preserves_rows_and_order(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            path = Path(td) / "rows.jsonl.gz"
+            rows = [{"i": i, "surface": "ὕδωρ" * (i % 7)} for i in range(5000)]
+            utils.write_jsonl(path, rows)
+            blocks = list(utils.map_jsonl_blocks(path, len, workers=2, block_size=4096))
+            self.assertGreater(len(blocks), 1)
+            self.assertEqual(sum(blocks), len(rows))
+            self.assertEqual(list(utils.iter_jsonl_parallel(path, workers=2)), rows)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+
+def gold_row(mention_id: str, ts: int, surface: str, surface_norm: str, ptype: str) -> dict[str, object]:
+    return {
+        "mention_id": mention_id,
+        "work_urn": "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1",
+        "work_slug": "w",
+        "passage_urn": "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1:1.1.1",
+        "token_start": ts,
+        "token_end": ts + 1,
+        "surface": surface,
+        "surface_norm": surface_norm,
+        "provisional_type": ptype,
+        "certainty": "high",
+        "annotator_id": "ADJUDICATOR_MERGE",
+        "timestamp": "2000-01-01T00:00:00Z",
+    }
+
+
+class LinkOverlayTest(unittest.TestCase):
+    def test_overlay_compacts_to_full_linked_file(self) -> None:
+        rows = [
+            gold_row("g_2", 5, "ὕδωρ", "υδωρ", "MATERIAL"),
+            gold_row("g_1", 1, "μέλι", "μελι", "MATERIAL"),
+            gold_row("g_3", 9, "θερμός", "θερμος", "QUALITY"),
+        ]
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            lex = tmp / "lexicons"
+            lex.mkdir()
+            (lex / "materials.tsv").write_text(
+                "entity_id\tpreferred_label\tvariant\tvariant_norm\tnotes\n"
+                "ent_material_a\tὕδωρ\tὕδωρ\tυδωρ\t\n"
+                "ent_material_b\tμέλι\tμέλι\tμελι\t\n",
+                encoding="utf-8",
+            )
+            gold = tmp / "gold.jsonl"
+            gold.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+
+            def link(fmt: str, out: Path) -> None:
+                subprocess.check_call(
+                    [
+                        "python3",
+                        str(SCRIPTS / "link_mentions.py"),
+                        "--in",
+                        str(gold),
+                        "--lexicons",
+                        str(lex),
+                        "--out",
+                        str(out),
+                        "--unlinked",
+                        str(tmp / "unlinked.jsonl"),
+                        "--format",
+                        fmt,
+                    ],
+                    cwd=str(REPO_ROOT),
+                )
+
+            link("full", tmp / "full.jsonl")
+            link("overlay", tmp / "overlay.jsonl")
+            subprocess.check_call(
+                [
+                    "python3",
+                    str(SCRIPTS / "compact_link_overlay.py"),
+                    "--base",
+                    str(gold),
+                    "--overlay",
+                    str(tmp / "overlay.jsonl"),
+                    "--out",
+                    str(tmp / "compacted.jsonl"),
+                ],
+                cwd=str(REPO_ROOT),
+            )
+
+            overlay = [json.loads(line) for line in (tmp / "overlay.jsonl").read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([r["mention_id"] for r in overlay], ["g_1", "g_2"])
+            self.assertEqual(set(overlay[0]), {"mention_id", "mvo_type", "entity_id", "link_method", "link_confidence"})
+            self.assertEqual((tmp / "compacted.jsonl").read_bytes(), (tmp / "full.jsonl").read_bytes())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+
+def mention(ts: int, te: int, **extra: object) -> dict[str, object]:
+    row: dict[str, object] = {
+        "work_urn": "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1",
+        "work_slug": "w",
+        "passage_urn": "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1:1.1.1",
+        "token_start": ts,
+        "token_end": te,
+        "mvo_type": "MATERIAL",
+        "certainty": "med",
+        "link_confidence": "med",
+    }
+    row.update(extra)
+    return row
+
+
+class MakeReviewQueueTest(unittest.TestCase):
+    def run_queue(self, rows: list[dict[str, object]], *extra_args: str) -> list[dict[str, object]]:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "idx.json").write_text(json.dumps({"tokens": [f"t{i}" for i in range(40)]}), encoding="utf-8")
+            (tmp / "auto.jsonl").write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+            subprocess.check_call(
+                [
+                    "python3",
+                    str(SCRIPTS / "make_review_queue.py"),
+                    "--in",
+                    str(tmp / "auto.jsonl"),
+                    "--token-index",
+                    str(tmp / "idx.json"),
+                    "--out",
+                    str(tmp / "queue.jsonl"),
+                    *extra_args,
+                ],
+                cwd=str(REPO_ROOT),
+            )
+            text = (tmp / "queue.jsonl").read_text(encoding="utf-8")
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def test_groups_overlaps_beyond_immediate_neighbours(self) -> None:
+        # [0,10) covers [2,4) and partially overlaps [8,12); [4,6) only touches the long span.
+        rows = [mention(0, 10), mention(2, 4), mention(4, 6), mention(8, 12), mention(8, 12, mvo_type="PROCESS"), mention(20, 21)]
+        queue = self.run_queue(rows)
+
+        spans = [(q["row"]["token_start"], q["row"]["token_end"]) for q in queue]
+        self.assertNotIn((20, 21), spans)
+        self.assertEqual(len(queue), 5)
+        self.assertEqual(len({q["group_id"] for q in queue}), 1)
+        by_span = {(q["row"]["token_start"], q["row"]["token_end"]): set(q["reason"]) for q in queue}
+        self.assertIn("NESTED", by_span[(2, 4)])
+        self.assertIn("NESTED", by_span[(4, 6)])
+        self.assertEqual({"DUPLICATE_SPAN", "OVERLAP"}, by_span[(8, 12)])
+
+    def test_every_pairwise_relation_is_labelled(self) -> None:
+        # (1,8) covers (2,6) and partially overlaps (5,10): it carries both reasons.
+        queue = self.run_queue([mention(1, 8), mention(2, 6), mention(5, 10)])
+        by_span = {(q["row"]["token_start"], q["row"]["token_end"]): (q["reason"], q["priority"]) for q in queue}
+        self.assertEqual(by_span[(1, 8)], (["OVERLAP", "NESTED"], 5))
+        self.assertEqual(by_span[(2, 6)], (["OVERLAP", "NESTED"], 5))
+        self.assertEqual(by_span[(5, 10)], (["OVERLAP"], 3))
+
+    def test_top_k_keeps_whole_groups(self) -> None:
+        rows = [mention(0, 2), mention(1, 3), mention(5, 6, certainty="low", notes="x"), mention(9, 10, certainty="low", notes="y")]
+        queue = self.run_queue(rows, "--top-k", "1")
+        self.assertEqual([(q["row"]["token_start"], q["row"]["token_end"]) for q in queue], [(0, 2), (1, 3)])
+
+        queue = self.run_queue(rows, "--top-k", "2")
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue[-1]["row"]["token_start"], 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
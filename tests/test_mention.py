@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+import ner_ontology_utils as utils  # noqa: E402
+
+
+ROW = {
+    "mention_id": "m_000000000001",
+    "work_urn": "urn:cts:greekLit:tlg0057.tlg075.1st1K-grc1",
+    "passage_urn": "urn:cts:greekLit:tlg0057.tlg075.1st1K-grc1:1.1.1",
+    "work_slug": "galen_smt",
+    "token_start": 3,
+    "token_end": 4,
+    "surface": "φαρμάκων",
+    "surface_norm": "φαρμακων",
+    "provisional_type": "SUBSTANCE",
+    "certainty": "med",
+    "annotator_id": "A",
+    "notes": None,
+    "evidence_window": ["Τὰς", "τῶν"],
+}
+
+
+class MentionTest(unittest.TestCase):
+    def test_round_trip_keeps_unknown_keys_and_explicit_nulls(self) -> None:
+        m = utils.Mention.from_json(utils.json_dumps(ROW))
+        self.assertEqual(m.to_dict(), ROW)
+        self.assertEqual(m.to_json(), utils.json_dumps_bytes(ROW))
+        self.assertEqual(m.extra, {"evidence_window": ["Τὰς", "τῶν"]})
+        self.assertIn("notes", m)
+        self.assertNotIn("entity_id", m)
+        with self.assertRaises(KeyError):
+            m["entity_id"]
+
+    def test_offsets_are_ints_and_shared_strings_interned(self) -> None:
+        a = utils.Mention.from_dict({**ROW, "token_start": "3"})
+        b = utils.Mention.from_dict(utils.json_loads(utils.json_dumps(ROW)))
+        self.assertEqual(a.token_start, 3)
+        self.assertIs(a.passage_urn, b.passage_urn)
+        self.assertIs(a.provisional_type, b.provisional_type)
+        self.assertFalse(hasattr(a, "__dict__"))
+
+    def test_copy_is_independent(self) -> None:
+        m = utils.Mention.from_dict(ROW)
+        c = m.copy()
+        c.entity_id = "ent_x"
+        c.extra["evidence_window"] = []
+        self.assertIsNone(m.entity_id)
+        self.assertEqual(m, utils.Mention.from_dict(ROW))
+        self.assertEqual(c.to_dict()["entity_id"], "ent_x")
+
+
+if __name__ == "__main__":
+    unittest.main()
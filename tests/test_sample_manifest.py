@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+
+sys.path.insert(0, str(SCRIPTS))
+from ner_ontology_utils import passage_table_path, read_passage_table, write_passage_table  # noqa: E402
+
+
+def token_index() -> dict[str, object]:
+    tokens = [f"τ{i}" for i in range(12)]
+    return {
+        "work_slug": "w",
+        "work_urn": WORK_URN,
+        "tokens": tokens,
+        "tokens_norm": [t.upper() for t in tokens],
+        "passages": [
+            {"passage_ref": f"{b}.1", "passage_urn": f"{WORK_URN}:{b}.1", "token_start": 4 * (b - 1), "token_end": 4 * b}
+            for b in (1, 2, 3)
+        ],
+    }
+
+
+class SampleManifestTest(unittest.TestCase):
+    def run_script(self, name: str, *args: str) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(["python3", str(SCRIPTS / name), *args], cwd=str(REPO_ROOT), capture_output=True, text=True)
+
+    def test_compact_manifest_hydrates_to_full_manifest(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            idx_path = tmp / "w.json"
+            idx_path.write_text(json.dumps(token_index()), encoding="utf-8")
+            common = ["--token-index", str(idx_path), "--n-passages", "2", "--seed", "3"]
+            self.run_script("make_sample_manifest.py", *common, "--out", str(tmp / "full.json")).check_returncode()
+            self.run_script("make_sample_manifest.py", *common, "--compact", "--out", str(tmp / "compact.json")).check_returncode()
+
+            compact = json.loads((tmp / "compact.json").read_text(encoding="utf-8"))
+            self.assertEqual(compact["manifest_format"], "compact")
+            self.assertNotIn("tokens", compact["items"][0])
+
+            self.run_script("hydrate_manifest.py", "--manifest", str(tmp / "compact.json"), "--out", str(tmp / "hydrated.json")).check_returncode()
+            self.assertEqual((tmp / "hydrated.json").read_bytes(), (tmp / "full.json").read_bytes())
+
+            urn = compact["items"][-1]["passage_urn"]
+            self.run_script(
+                "hydrate_manifest.py", "--manifest", str(tmp / "compact.json"), "--passage-urn", urn, "--out-jsonl", str(tmp / "one.jsonl")
+            ).check_returncode()
+            items = [json.loads(x) for x in (tmp / "one.jsonl").read_text(encoding="utf-8").splitlines()]
+            self.assertEqual([it["passage_urn"] for it in items], [urn])
+            ts = items[0]["token_start"]
+            self.assertEqual(items[0]["tokens_with_offsets"][0], f"{ts}:τ{ts}")
+
+            # Hydrating against a different token index than the one recorded is refused.
+            changed = token_index()
+            changed["tokens"] = ["x"] * 12
+            idx_path.write_text(json.dumps(changed), encoding="utf-8")
+            proc = self.run_script("hydrate_manifest.py", "--manifest", str(tmp / "compact.json"), "--out", str(tmp / "stale.json"))
+            self.assertNotEqual(proc.returncode, 0)
+            self.assertIn("sha256 mismatch", proc.stderr)
+
+    def test_reservoir_strategy_is_seeded_and_covers_strata(self) -> None:
+        # 3 books x 2 length bands (2 and 6 tokens), 5 passages each.
+        passages = []
+        tokens: list[str] = []
+        for b in (1, 2, 3):
+            for size in (2, 6):
+                for i in range(5):
+                    ref = f"{b}.{size}.{i}"
+                    passages.append({"passage_ref": ref, "passage_urn": f"{WORK_URN}:{ref}", "token_start": len(tokens), "token_end": len(tokens) + size})
+                    tokens.extend(f"t{len(tokens) + j}" for j in range(size))
+        idx = {"work_slug": "w", "work_urn": WORK_URN, "tokens": tokens, "tokens_norm": tokens}
+
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            manifests = []
+            for order_seed in (0, 1):
+                shuffled = passages[:]
+                random.Random(order_seed).shuffle(shuffled)
+                index = tmp / "idx" / "w.json"
+                index.parent.mkdir(exist_ok=True)
+                index.write_text(json.dumps({**idx, "passages": shuffled}, sort_keys=True), encoding="utf-8")
+                # A stale sidecar (written for the previous index) is ignored.
+                self.assertEqual(read_passage_table(index)["passages"], shuffled)
+                # The sidecar is used while it matches the index; directory globs skip it.
+                write_passage_table(index, {"work_slug": "w", "work_urn": WORK_URN, "passages": passages[:1]})
+                self.assertEqual(passage_table_path(index).name, "w.passages.json")
+                self.assertEqual(read_passage_table(index)["passages"], passages[:1])
+                write_passage_table(index, {"work_slug": "w", "work_urn": WORK_URN, "passages": shuffled})
+                out = tmp / f"m{order_seed}.json"
+                self.run_script(
+                    "make_sample_manifest.py",
+                    *("--token-index", str(tmp / "idx"), "--n-passages", "6", "--seed", "7"),
+                    *("--strategy", "reservoir", "--length-bands", "4", "--out", str(out)),
+                ).check_returncode()
+                manifests.append(out.read_bytes())
+            items = json.loads(manifests[0])["items"]
+
+        # Passage order in the token index does not change the draw.
+        self.assertEqual(manifests[0], manifests[1])
+        strata = {(it["passage_ref"].split(".")[0], it["token_end"] - it["token_start"]) for it in items}
+        self.assertEqual(len(items), 6)
+        self.assertEqual(len(strata), 6)
+        self.assertEqual(items[0]["tokens"], tokens[items[0]["token_start"] : items[0]["token_end"]])
+
+    def test_coverage_strategy_follows_tagger_passage_stats(self) -> None:
+        texts = {
+            "1.1": "μελι μελι θερμος",
+            "1.2": "υδωρ μελι",
+            "1.3": "θερμος ψυχρος θερμος ψυχρος μελι",
+            "1.4": "ψυχρος και και",
+        }
+        tokens: list[str] = []
+        passages = []
+        for ref, text in texts.items():
+            words = text.split()
+            passages.append({"passage_ref": ref, "passage_urn": f"{WORK_URN}:{ref}", "token_start": len(tokens), "token_end": len(tokens) + len(words)})
+            tokens.extend(words)
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "w.json").write_text(
+                json.dumps({"work_slug": "w", "work_urn": WORK_URN, "tokens": tokens, "tokens_norm": tokens, "passages": passages}), encoding="utf-8"
+            )
+            lex = tmp / "lexicons"
+            lex.mkdir()
+            header = "entity_id\tpreferred_label\tvariant\tvariant_norm\tnotes\n"
+            (lex / "materials.tsv").write_text(header + "ent_m\tμελι\tμελι\tμελι\t\nent_u\tυδωρ\tυδωρ\tυδωρ\t\n", encoding="utf-8")
+            (lex / "tools.tsv").write_text(header + "ent_t\tυδωρ\tυδωρ\tυδωρ\t\n", encoding="utf-8")
+            self.run_script(
+                "tag_with_lexicons.py",
+                *("--token-index", str(tmp / "w.json"), "--lexicons", str(lex), "--out", str(tmp / "auto.jsonl")),
+                *("--report", str(tmp / "cov.md"), "--passage-stats", str(tmp / "stats.jsonl"), "--min-type-freq", "2"),
+            ).check_returncode()
+            stats = {json.loads(x)["passage_urn"].rsplit(":", 1)[1]: json.loads(x) for x in (tmp / "stats.jsonl").read_text(encoding="utf-8").splitlines()}
+
+            picked = {}
+            for signal in ("density", "untagged_types", "ambiguous"):
+                out = tmp / f"{signal}.json"
+                self.run_script(
+                    "make_sample_manifest.py",
+                    *("--token-index", str(tmp / "w.json"), "--n-passages", "1", "--compact", "--out", str(out)),
+                    *("--strategy", "coverage", "--passage-stats", str(tmp / "stats.jsonl"), "--coverage-signal", signal),
+                ).check_returncode()
+                picked[signal] = [it["passage_ref"] for it in json.loads(out.read_text(encoding="utf-8"))["items"]]
+
+        self.assertEqual((stats["1.2"]["ambiguous_skipped"], stats["1.2"]["tagged_tokens"]), (1, 1))
+        self.assertEqual([stats[r]["frequent_untagged_types"] for r in texts], [1, 0, 2, 1])
+        self.assertEqual(picked, {"density": ["1.4"], "untagged_types": ["1.3"], "ambiguous": ["1.2"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
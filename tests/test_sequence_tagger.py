@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+sys.path.insert(0, str(SCRIPTS))
+from sequence_tagger import bio_tags, tag_spans  # noqa: E402
+
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+
+
+class SequenceTaggerTest(unittest.TestCase):
+    def test_bio_round_trip(self) -> None:
+        tags = bio_tags(6, [(1, 3, "MATERIAL"), (2, 4, "PLACE"), (4, 5, "QUALITY")])
+        self.assertEqual(tags, ["O", "B-MATERIAL", "I-MATERIAL", "O", "B-QUALITY", "O"])
+        self.assertEqual(tag_spans(tags), [(1, 3, "MATERIAL"), (4, 5, "QUALITY")])
+        self.assertEqual(tag_spans(["I-PLACE", "I-PLACE", "B-PLACE", "I-MATERIAL"]), [(0, 2, "PLACE"), (2, 3, "PLACE"), (3, 4, "MATERIAL")])
+
+    def test_train_and_tag_unseen_passage(self) -> None:
+        # Training passages mark μελι as MATERIAL and θερμον as QUALITY; the last passage has no gold.
+        sentences = [
+            ["το", "μελι", "εστι", "θερμον"],
+            ["και", "μελι", "και", "υδωρ"],
+            ["θερμον", "δε", "το", "μελι"],
+            ["ουτος", "δε", "θερμον", "μελι"],
+        ]
+        tokens: list[str] = []
+        passages = []
+        gold = []
+        for i, words in enumerate(sentences, start=1):
+            lo = len(tokens)
+            urn = f"{WORK_URN}:1.{i}"
+            passages.append({"passage_urn": urn, "token_start": lo, "token_end": lo + len(words)})
+            tokens.extend(words)
+            if i == len(sentences):
+                continue
+            for j, w in enumerate(words):
+                label = {"μελι": "MATERIAL", "θερμον": "QUALITY"}.get(w)
+                if label:
+                    gold.append({"work_slug": "w", "passage_urn": urn, "token_start": lo + j, "token_end": lo + j + 1, "provisional_type": label})
+        idx = {"work_slug": "w", "work_urn": WORK_URN, "tokens": tokens, "tokens_norm": tokens, "passages": passages}
+
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "w.json").write_text(json.dumps(idx), encoding="utf-8")
+            (tmp / "gold.jsonl").write_text("".join(json.dumps(r) + "\n" for r in gold), encoding="utf-8")
+            run = ["python3", str(SCRIPTS / "sequence_tagger.py")]
+            subprocess.run(
+                [*run, "train", "--gold", str(tmp / "gold.jsonl"), "--token-index", str(tmp / "w.json"), "--model", str(tmp / "m.json")],
+                cwd=str(REPO_ROOT),
+                check=True,
+                capture_output=True,
+            )
+            subprocess.run(
+                [*run, "tag", "--model", str(tmp / "m.json"), "--token-index", str(tmp / "w.json"), "--passage-urn", f"{WORK_URN}:1.4"]
+                + ["--annotator-id", "TAGGER", "--out", str(tmp / "out.jsonl")],
+                cwd=str(REPO_ROOT),
+                check=True,
+                capture_output=True,
+            )
+            rows = [json.loads(x) for x in (tmp / "out.jsonl").read_text(encoding="utf-8").splitlines()]
+
+        self.assertEqual([(r["surface"], r["provisional_type"]) for r in rows], [("θερμον", "QUALITY"), ("μελι", "MATERIAL")])
+        self.assertEqual({r["annotator_id"] for r in rows}, {"TAGGER"})
+        self.assertTrue(all(r["mention_id"].startswith("m_") for r in rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import span_arrays  # noqa: E402
+
+
+P1 = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1:1.1"
+P2 = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1:1.2"
+PASSAGES = [
+    {"passage_urn": P1, "token_start": 0, "token_end": 10},
+    {"passage_urn": P2, "token_start": 10, "token_end": 20},
+]
+
+
+def mention(passage_urn: str, ts: int, te: int, ptype: str | None = "MATERIAL") -> dict[str, object]:
+    return {"passage_urn": passage_urn, "token_start": ts, "token_end": te, "provisional_type": ptype}
+
+
+@unittest.skipIf(span_arrays.np is None, "numpy not installed")
+class SpanArraysTest(unittest.TestCase):
+    def test_bounds_dedup_and_groups(self) -> None:
+        rows = [
+            mention(P2, 12, 14),
+            mention(P1, 2, 4),
+            mention(P1, 8, 11),  # crosses into P2
+            mention(P2, 12, 14),
+            mention(P2, 12, 14, "PLACE"),
+            mention(P1, 12, 13),  # inside P2's range
+            mention(P2, 15, 15, None),  # empty span
+        ]
+        table = span_arrays.from_rows(rows)
+        self.assertEqual(span_arrays.check_bounds(table, PASSAGES).tolist(), [True, True, False, True, True, False, False])
+        self.assertEqual(span_arrays.dedup(table).spans["line"].tolist(), [0, 1, 2, 4, 5, 6])
+        self.assertEqual(span_arrays.dedup(table, by_type=False).spans["line"].tolist(), [0, 1, 2, 5, 6])
+        groups = [(p, table.spans["line"][idx].tolist()) for p, idx in span_arrays.passage_groups(table)]
+        self.assertEqual(groups, [(P1, [1, 2, 5]), (P2, [0, 3, 4, 6])])
+        self.assertEqual(list(span_arrays.to_rows(table.take([6])))[0], {**rows[6], "line": 6})
+
+    def test_overlap_pairs_within_and_across(self) -> None:
+        a = span_arrays.from_rows([mention(P1, 0, 4), mention(P1, 2, 6), mention(P1, 6, 8), mention(P2, 10, 12)])
+        i, j, score = span_arrays.overlap_pairs(a)
+        self.assertEqual(list(zip(i.tolist(), j.tolist())), [(0, 1)])
+        self.assertAlmostEqual(float(score[0]), 2 / 6)
+
+        b = span_arrays.from_rows([mention(P2, 10, 12, "PLACE"), mention(P1, 1, 3)])
+        i, j, score = span_arrays.overlap_pairs(a, b)
+        self.assertEqual(sorted(zip(i.tolist(), j.tolist(), score.tolist())), [(0, 1, 0.5), (1, 1, 0.2), (3, 0, 1.0)])
+
+    def test_cross_pairs_match_brute_force_in_dense_passage(self) -> None:
+        # Many disjoint spans per passage (plus a few long ones): only nearby b spans are candidates.
+        a_rows = [mention(P1, 3 * k, 3 * k + 2) for k in range(300)] + [mention(P2, 7, 40), mention(P2, 0, 1)]
+        b_rows = [mention(P1, 3 * k + 1, 3 * k + 3) for k in range(300)] + [mention(P1, 100, 160), mention(P2, 5, 9), mention(P2, 30, 30)]
+        i, j, _ = span_arrays.overlap_pairs(span_arrays.from_rows(a_rows), span_arrays.from_rows(b_rows))
+        expected = [
+            (x, y)
+            for x, ra in enumerate(a_rows)
+            for y, rb in enumerate(b_rows)
+            if ra["passage_urn"] == rb["passage_urn"] and rb["token_start"] < ra["token_end"] and rb["token_end"] > ra["token_start"]
+        ]
+        self.assertEqual(sorted(zip(i.tolist(), j.tolist())), expected)
+
+    def test_cli_round_trips_full_rows(self) -> None:
+        rows = [{**mention(P1, 2, 4), "surface": "x"}, {**mention(P1, 2, 4), "surface": "x"}, {**mention(P2, 9, 12), "notes": "n"}]
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            (tmp / "in.jsonl").write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+            (tmp / "idx.json").write_text(json.dumps({"passages": PASSAGES}), encoding="utf-8")
+            for cmd, extra, out in [
+                ("dedup", [], "dedup.jsonl"),
+                ("check-bounds", ["--token-index", str(tmp / "idx.json")], "bad.jsonl"),
+            ]:
+                subprocess.check_call(
+                    ["python3", str(SCRIPTS / "span_arrays.py"), cmd, "--in", str(tmp / "in.jsonl"), "--out", str(tmp / out), *extra],
+                    cwd=str(REPO_ROOT),
+                    stdout=subprocess.DEVNULL,
+                )
+            dedup = [json.loads(x) for x in (tmp / "dedup.jsonl").read_text(encoding="utf-8").splitlines()]
+            bad = [json.loads(x) for x in (tmp / "bad.jsonl").read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(dedup, [rows[0], rows[2]])
+        self.assertEqual(bad, [rows[2]])
+
+
+if __name__ == "__main__":
+    unittest.main()
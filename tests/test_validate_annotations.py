@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCRIPTS = REPO_ROOT / "scripts"
+
+WORK_URN = "urn:cts:greekLit:tlg0000.tlg000.1st1K-grc1"
+PASSAGE = WORK_URN + ":1.1"
+
+
+def mention(ts: int, te: int, surface: str) -> dict[str, object]:
+    return {
+        "work_urn": WORK_URN,
+        "passage_urn": PASSAGE,
+        "work_slug": "w",
+        "token_start": ts,
+        "token_end": te,
+        "surface": surface,
+        "surface_norm": surface,
+        "provisional_type": "MATERIAL",
+        "certainty": "med",
+        "annotator_id": "A",
+        "timestamp": "2000-01-01T00:00:00Z",
+    }
+
+
+class ValidateAnnotationsTest(unittest.TestCase):
+    def run_validator(self, tmp: Path, *ann: str, extra: tuple[str, ...] = ()) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            [
+                "python3",
+                str(SCRIPTS / "validate_annotations.py"),
+                "--mvo",
+                str(REPO_ROOT / "data" / "ontology" / "mvo.yaml"),
+                "--relations",
+                str(REPO_ROOT / "data" / "ontology" / "relations.yaml"),
+                "--token-index",
+                str(tmp / "idx.json"),
+                "--ann",
+                *ann,
+                *extra,
+            ],
+            cwd=str(REPO_ROOT),
+            capture_output=True,
+            text=True,
+        )
+
+    def test_many_files_capped_errors_and_summary(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            idx = {"work_slug": "w", "tokens": ["a", "b", "c", "d"], "passages": [{"passage_urn": PASSAGE, "token_start": 0, "token_end": 4}]}
+            (tmp / "idx.json").write_text(json.dumps(idx), encoding="utf-8")
+            (tmp / "ok_1.jsonl").write_text(json.dumps(mention(0, 1, "a")) + "\n", encoding="utf-8")
+            (tmp / "ok_2.jsonl").write_text(json.dumps(mention(1, 3, "b c")) + "\n", encoding="utf-8")
+            bad = [mention(3, 9, "d"), mention(2, 2, "c"), mention(0, 1, "a")]
+            (tmp / "bad.jsonl").write_text("".join(json.dumps(r) + "\n" for r in bad), encoding="utf-8")
+
+            proc = self.run_validator(tmp, str(tmp / "ok_*.jsonl"), extra=("--workers", "2"))
+            self.assertEqual(proc.returncode, 0, proc.stderr)
+            self.assertIn("OK (2 files, 2 rows)", proc.stdout)
+
+            proc = self.run_validator(
+                tmp,
+                str(tmp / "ok_1.jsonl"),
+                str(tmp / "bad.jsonl"),
+                extra=("--max-errors", "2", "--summary-json", str(tmp / "summary.json")),
+            )
+            self.assertNotEqual(proc.returncode, 0)
+            self.assertIn(f"{tmp / 'bad.jsonl'}: line 1: token span out of bounds", proc.stderr)
+            self.assertIn("1 more errors", proc.stderr)
+            summary = json.loads((tmp / "summary.json").read_text(encoding="utf-8"))
+
+        self.assertFalse(summary["ok"])
+        self.assertEqual(summary["total_rows"], 4)
+        self.assertEqual([(f["rows"], f["error_count"], len(f["errors"])) for f in summary["files"]], [(1, 0, 0), (3, 3, 2)])
+
+    def test_guideline_rules_share_the_pass_and_report_rule_stats(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            idx = {"work_slug": "w", "tokens": ["a", "b"], "passages": [{"passage_urn": PASSAGE, "token_start": 0, "token_end": 2}]}
+            (tmp / "idx.json").write_text(json.dumps(idx), encoding="utf-8")
+            rows = [{**mention(0, 1, "a"), "certainty": "low"}, {**mention(1, 2, "b"), "surface_norm": "x", "relations": [{"rel": "part_of"}]}]
+            (tmp / "ann.jsonl").write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+
+            proc = self.run_validator(tmp, str(tmp / "ann.jsonl"), extra=("--guidelines-phase", "open_coding", "--summary-json", str(tmp / "s.json")))
+            self.assertNotEqual(proc.returncode, 0)
+            self.assertIn("WARN:\n- line 1: certainty=low but notes missing/empty", proc.stdout)
+            self.assertIn("line 2: surface_norm mismatch", proc.stderr)
+            rules = json.loads((tmp / "s.json").read_text(encoding="utf-8"))["rules"]
+
+            proc = self.run_validator(tmp, str(tmp / "ann.jsonl"), extra=("--guidelines-phase", "open_coding", "--strict-guidelines"))
+            self.assertIn("line 1: certainty=low but notes missing/empty", proc.stderr)
+
+        # surface_norm runs once per row even with the guideline rules enabled.
+        self.assertEqual(rules["surface_norm"]["hits"], 1)
+        self.assertEqual((rules["guidelines.low_certainty_notes"]["hits"], rules["guidelines.low_certainty_notes"]["level"]), (1, "warning"))
+        self.assertEqual(rules["guidelines.relations_present"]["hits"], 1)
+        self.assertGreaterEqual(rules["bounds.passage"]["seconds"], 0.0)
+
+    def test_provisional_type_messages_keep_each_validator_wording(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            idx = {"work_slug": "w", "tokens": ["a", "b"], "passages": [{"passage_urn": PASSAGE, "token_start": 0, "token_end": 2}]}
+            (tmp / "idx.json").write_text(json.dumps(idx), encoding="utf-8")
+            rows = [{**mention(0, 1, "a"), "provisional_type": "X"}, {k: v for k, v in mention(1, 2, "b").items() if k != "provisional_type"}]
+            (tmp / "ann.jsonl").write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+
+            schema = self.run_validator(tmp, str(tmp / "ann.jsonl")).stderr
+            guidelines = subprocess.run(
+                ["python3", str(SCRIPTS / "validate_guidelines.py"), "--jsonl", str(tmp / "ann.jsonl")],
+                cwd=str(REPO_ROOT),
+                capture_output=True,
+                text=True,
+            ).stderr
+
+        self.assertIn("line 1: illegal provisional_type: X", schema)
+        self.assertIn("ann.jsonl:1: illegal provisional_type='X'", guidelines)
+        self.assertIn("ann.jsonl:2: illegal provisional_type=''", guidelines)
+
+    def test_ledger_skips_unchanged_files(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            tmp = Path(td)
+            idx = {"work_slug": "w", "tokens": ["a", "b"], "passages": [{"passage_urn": PASSAGE, "token_start": 0, "token_end": 2}]}
+            (tmp / "idx.json").write_text(json.dumps(idx), encoding="utf-8")
+            (tmp / "ok.jsonl").write_text(json.dumps(mention(0, 1, "a")) + "\n", encoding="utf-8")
+            (tmp / "bad.jsonl").write_text(json.dumps(mention(1, 5, "b")) + "\n", encoding="utf-8")
+            ledger = ("--ledger", str(tmp / "validation" / "ledger.json"))
+
+            self.assertIn("OK (1 validated, 0 unchanged)", self.run_validator(tmp, str(tmp / "ok.jsonl"), extra=ledger).stdout)
+            self.assertIn("OK (0 validated, 1 unchanged)", self.run_validator(tmp, str(tmp / "ok.jsonl"), extra=ledger).stdout)
+
+            # A cached failure keeps failing; a changed file is re-validated.
+            for _ in range(2):
+                proc = self.run_validator(tmp, str(tmp / "ok.jsonl"), str(tmp / "bad.jsonl"), extra=ledger)
+                self.assertIn("token span out of bounds", proc.stderr)
+            (tmp / "ok.jsonl").write_text(json.dumps(mention(1, 2, "b")) + "\n", encoding="utf-8")
+            proc = self.run_validator(tmp, str(tmp / "ok.jsonl"), extra=(*ledger, "--summary-json", str(tmp / "s.json")))
+            self.assertIn("OK (1 validated, 0 unchanged)", proc.stdout)
+            self.assertEqual(json.loads((tmp / "s.json").read_text(encoding="utf-8"))["files"][0]["ledger_status"], "changed")
+
+            entries = json.loads((tmp / "validation" / "ledger.json").read_text(encoding="utf-8"))["entries"]
+        self.assertEqual(sorted(entries), [str(tmp / "bad.jsonl"), str(tmp / "ok.jsonl")])
+        self.assertEqual(entries[str(tmp / "bad.jsonl")]["result"]["error_count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()